@@ -0,0 +1,37 @@
+"""Benchmark of History.fromFile with a cold and a warm history cache.
+
+    python -m benchmarks.bench_cache --rows 1000000
+"""
+import argparse
+import os
+import tempfile
+from pathlib import Path
+
+from benchmarks.common import report, scaled_export, timer
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["TASTYWORKS_TAXES_CACHE_DIR"] = tmp
+        from tastyworksTaxes.history import History
+
+        export = Path(tmp) / "export.csv"
+        scaled_export(args.rows).to_csv(export, index=False)
+        History.fromFile(export)  # warm up the FX table
+
+        results = {}
+        with timer(results, "no cache"):
+            History.fromFile(export)
+        with timer(results, "cold cache (parse + write)"):
+            History.fromFile(export, use_cache=True)
+        with timer(results, "warm cache (bulk load)"):
+            History.fromFile(export, use_cache=True)
+        report("History.fromFile", args.rows, results)
+
+
+if __name__ == "__main__":
+    main()
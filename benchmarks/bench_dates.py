@@ -0,0 +1,61 @@
+"""Benchmark of History._parse_dates against per-row strptime and zone conversion.
+
+Real exports have close to one distinct timestamp per row, so the timestamps
+are drawn at random over six years with UTC, Berlin and New York offsets
+instead of tiling the bundled export.
+
+    python -m benchmarks.bench_dates --rows 1000000
+"""
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_transform import BERLIN
+from benchmarks.common import report, timer
+from tastyworksTaxes.history import History
+
+
+def random_timestamps(rows: int) -> pd.Series:
+    rng = np.random.default_rng(0)
+    utc = pd.Timestamp("2018-01-01", tz="UTC") + pd.to_timedelta(rng.integers(0, 6 * 365 * 86400, rows), unit="s")
+    zones = np.array(["UTC", "Europe/Berlin", "America/New_York"])[rng.integers(0, 3, rows)]
+    text = np.empty(rows, dtype=object)
+    for zone in np.unique(zones):
+        mask = zones == zone
+        text[mask] = pd.Series(utc[mask]).dt.tz_convert(zone).dt.strftime("%Y-%m-%dT%H:%M:%S%z").to_numpy()
+    return pd.Series(text, dtype=object)
+
+
+def rowwise_parse(series: pd.Series) -> pd.Series:
+    return series.apply(
+        lambda s: datetime.strptime(s, "%Y-%m-%dT%H:%M:%S%z").astimezone(BERLIN).replace(tzinfo=None)
+    ).astype("datetime64[us]")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    dates = random_timestamps(args.rows)
+    expirations = pd.Series(
+        pd.Timestamp("2018-01-19") + pd.to_timedelta(7 * (np.arange(args.rows) % 400), unit="D")
+    ).dt.strftime("%m/%d/%y").astype(object)
+
+    results = {}
+    with timer(results, "row-wise strptime"):
+        expected = rowwise_parse(dates)
+    with timer(results, "vectorized"):
+        actual = History._parse_dates(dates)
+    with timer(results, "expiration dates"):
+        History._parse_expirations(expirations)
+    report("Timestamp parsing", args.rows, results)
+
+    pd.testing.assert_series_equal(actual, expected, check_exact=True)
+    print("  outputs identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Benchmark of the dispatch loop of Tasty.processTransactionHistory.
+
+The old loop sorted the frame again and built a Series per row with iterrows;
+the new one skips the sort for chronological frames and reads plain tuples.
+Both loops are timed with handlers that only count, so the numbers show the
+cost of the loop itself. A full run on a smaller export checks that both
+give the same closed trades and year values.
+
+    python -m benchmarks.bench_dispatch --rows 100000 1000000
+"""
+import argparse
+
+import pandas as pd
+
+from benchmarks.common import report, synthetic_export, timer
+from tastyworksTaxes.constants import TransactionCode
+from tastyworksTaxes.history import History
+from tastyworksTaxes.tasty import Tasty
+from tastyworksTaxes.transaction import Transaction
+
+
+def iterrows_loop(tasty: Tasty, history: pd.DataFrame) -> None:
+    """The loop as it was before the tuple fast path"""
+    chronological_history = history.sort_values(by="Date/Time", ascending=True, kind="stable")
+    for _, row in chronological_history.iterrows():
+        transaction_code = row.loc["Transaction Code"]
+        if transaction_code == TransactionCode.MONEY_MOVEMENT.value:
+            tasty.moneyMovement(row)
+        elif transaction_code in {TransactionCode.TRADE.value, TransactionCode.RECEIVE_DELIVER.value}:
+            tasty.position_manager.add_position(Transaction(row))
+
+
+class Counter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, row):
+        self.count += 1
+
+
+def counting_tasty() -> Tasty:
+    tasty = Tasty()
+    tasty.moneyMovement = Counter()
+    tasty.position_manager.add_position = Counter()
+    return tasty
+
+
+def load(rows: int) -> History:
+    df = History._load_supported_schema(synthetic_export(rows))
+    return History(df.sort_values("Date/Time", kind="stable").reset_index(drop=True))
+
+
+def amounts(values) -> dict:
+    return {name: (money.usd, money.eur) for name, money in vars(values).items()}
+
+
+def check_identical(rows: int) -> None:
+    history = load(rows)
+    history.addEuroConversion()
+    history._applySchema()
+
+    old = Tasty()
+    old.history = history
+    iterrows_loop(old, history)
+    new = Tasty()
+    new.history = history
+    new.processTransactionHistory()
+
+    assert new.position_manager.closed_trades == old.position_manager.closed_trades
+    assert new.yearValues.keys() == old.yearValues.keys()
+    for year, values in old.yearValues.items():
+        assert amounts(new.yearValues[year]) == amounts(values), year
+    print(f"  full run on {rows:,} rows: closed trades and year values identical")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--check-rows", type=int, default=5_000)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        history = load(rows)
+        history._applySchema()
+        results = {}
+        old = counting_tasty()
+        with timer(results, "sort + iterrows"):
+            iterrows_loop(old, history)
+        new = counting_tasty()
+        with timer(results, "tuples, sort skipped"):
+            new.processTransactionHistory(history)
+        report("Dispatch loop", rows, results)
+        assert (new.moneyMovement.count, new.position_manager.add_position.count) == \
+            (old.moneyMovement.count, old.position_manager.add_position.count)
+
+    check_identical(args.check_rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Benchmark of the fixed point engine against the float path.
+
+Runs Tasty.run once with float amounts and once with fixed point, reports
+both timings and the largest difference of any value. The fixed point
+values must lie on the 1/100 cent grid and runTotals must give exactly the
+same ones.
+
+    python -m benchmarks.bench_fixed_point --rows 100000
+"""
+import argparse
+
+from benchmarks.bench_dispatch import amounts
+from benchmarks.bench_pipeline import prepared, tasty_for
+from benchmarks.common import report, timer
+from tastyworksTaxes.fixed_point import SCALE
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000])
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        history = prepared(rows)
+        results = {}
+        values = {}
+        for name, fixed in (("float", False), ("fixed point", True)):
+            with timer(results, name):
+                values[name] = tasty_for(history, fixed).run()
+        totals = tasty_for(history, fixed_point=True).runTotals()
+
+        difference = 0.0
+        for year, year_values in values["fixed point"].items():
+            fixed, floats = amounts(year_values), amounts(values["float"][year])
+            assert amounts(totals[year]) == fixed, year
+            for name, pair in fixed.items():
+                assert all(round(amount * SCALE) / SCALE == amount for amount in pair), (year, name)
+                difference = max(difference, *(abs(a - b) for a, b in zip(pair, floats[name])))
+        report("Float vs fixed point amounts", rows, results)
+        print(f"  largest difference of a value: {difference:.6f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Startup and lookup cost of the compiled rate table against CurrencyConverter.
+
+    python -m benchmarks.bench_fx --rows 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from currency_converter import CurrencyConverter
+
+from tastyworksTaxes.fx_rates import RateTable, _cache_path, _ecb_source, compile_ecb_table, ecb_rate_table
+
+
+def seconds(fn, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    source = _ecb_source()
+    ecb_rate_table()  # make sure the cache exists
+    startup = {
+        "CurrencyConverter()": seconds(lambda: CurrencyConverter(
+            fallback_on_missing_rate=True, fallback_on_wrong_date=True))[0],
+        "compile table (cold cache)": seconds(lambda: compile_ecb_table(source))[0],
+        "memory-map table (warm)": seconds(lambda: RateTable.load(_cache_path(source)), repeat=100)[0],
+    }
+    print("Startup")
+    for name, value in startup.items():
+        print(f"  {name:<30}{value * 1000:>10.2f} ms")
+
+    rng = np.random.default_rng(0)
+    dates = pd.Series(pd.Timestamp("2018-01-01") + pd.to_timedelta(rng.integers(0, 2500 * 86400, args.rows), unit="s"))
+    amounts = rng.normal(0, 1000, args.rows)
+    converter = CurrencyConverter(fallback_on_missing_rate=True, fallback_on_wrong_date=True)
+    sample = min(args.rows, 100_000)
+    per_row, _ = seconds(lambda: [converter.convert(a, "USD", "EUR", date=d)
+                                  for a, d in zip(amounts[:sample], dates.iloc[:sample])])
+    table = ecb_rate_table()
+    vectorized, _ = seconds(lambda: amounts / table.lookup(dates))
+
+    print(f"Lookup ({args.rows:,} conversions)")
+    print(f"  {'CurrencyConverter.convert':<30}{per_row * args.rows / sample:>10.3f} s (extrapolated from {sample:,})")
+    print(f"  {'RateTable.lookup':<30}{vectorized:>10.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Benchmark of IncrementalRun.correct against a full recompute.
+
+One trade amount early in a synthetic export is corrected. The incremental
+run replays only the FIFO chain of that symbol and books again only the
+years whose closed trades changed; the full recompute runs everything.
+Both must give identical values and closed trades.
+
+    python -m benchmarks.bench_incremental --rows 100000
+"""
+import argparse
+
+from benchmarks.bench_dispatch import amounts
+from benchmarks.bench_pipeline import prepared, tasty_for
+from benchmarks.common import report, timer
+from tastyworksTaxes.constants import Fields, TransactionCode
+from tastyworksTaxes.history import History
+from tastyworksTaxes.incremental import IncrementalRun
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000])
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        history = prepared(rows)
+        incremental = IncrementalRun(history)
+        results = {}
+        with timer(results, "initial run"):
+            incremental.run()
+
+        corrected = History(history.copy())
+        row = corrected.index[corrected[Fields.TRANSACTION_CODE.value] == TransactionCode.TRADE.value][0]
+        corrected.loc[row, [Fields.AMOUNT.value, Fields.AMOUNT_EURO.value]] += 1.0
+        full = tasty_for(corrected)
+        with timer(results, "full recompute"):
+            expected = full.run()
+        with timer(results, "incremental correction"):
+            years = incremental.correct(corrected)
+
+        assert incremental.closed_trades == full.position_manager.closed_trades
+        for year in expected:
+            assert amounts(incremental.yearValues[year]) == amounts(expected[year]), year
+        report("Full vs incremental recompute", rows, results)
+        print(f"  years booked again: {sorted(years)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Memory of a loaded History before and after applying the compact schema.
+
+"Before" keeps every text column, including all descriptions, as object dtype.
+
+    python -m benchmarks.bench_memory --rows 1000000
+"""
+import argparse
+
+from benchmarks.common import scaled_export
+from tastyworksTaxes.history import CATEGORY_COLUMNS, History
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    raw = scaled_export(args.rows)
+    wide = History(History._load_supported_schema(raw))
+    wide.sort_values("Date/Time", inplace=True, kind="stable")
+    wide.reset_index(drop=True, inplace=True)
+    wide.addEuroConversion()
+    compact = History(wide.copy())
+    compact._applySchema()
+    for column in CATEGORY_COLUMNS:
+        wide[column] = wide[column].astype(object)
+
+    before = wide.memory_usage(deep=True, index=False)
+    after = compact.memory_usage(deep=True, index=False)
+    print(f"History memory_usage(deep=True) ({args.rows:,} rows)")
+    print(f"  {'column':<22}{'before MiB':>12}{'after MiB':>12}")
+    for column in wide.columns:
+        print(f"  {column:<22}{before[column] / 2**20:>12.1f}{after[column] / 2**20:>12.1f}")
+    print(f"  {'total':<22}{before.sum() / 2**20:>12.1f}{after.sum() / 2**20:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Benchmark of the partitioned FIFO of Tasty.processPositions.
+
+The position rows of a synthetic export with many independent symbols are
+fed to one PositionManager in order and, split into groups of symbols that
+never share lots, to one PositionManager per worker process. Both must give
+identical closed trades.
+
+    python -m benchmarks.bench_partition --rows 100000 --workers 2 4
+"""
+import argparse
+
+from benchmarks.bench_pipeline import prepared, tasty_for
+from benchmarks.common import report, timer
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000])
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4])
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        history = prepared(rows)
+        positions = tasty_for(history)._positionRows(history)
+        results = {}
+        sequential = tasty_for(history)
+        with timer(results, "sequential"):
+            sequential.processPositions(positions)
+        for workers in args.workers:
+            partitioned = tasty_for(history)
+            with timer(results, f"partitioned, {workers} workers"):
+                partitioned.processPositions(positions, workers=workers)
+            assert partitioned.position_manager.closed_trades == sequential.position_manager.closed_trades
+        report("Sequential vs partitioned FIFO", len(positions), results)
+
+
+if __name__ == "__main__":
+    main()
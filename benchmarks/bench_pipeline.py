@@ -0,0 +1,61 @@
+"""Benchmark of Tasty.runPipeline against the sequential Tasty.run.
+
+The money movements and the positions of a synthetic export are processed
+one after the other, and with the positions in two processes while the
+money movements are booked alongside. The stage timings show how much of
+the money movement work is hidden behind the position processing, and
+what the process hand-off costs.
+
+    python -m benchmarks.bench_pipeline --rows 100000
+"""
+import argparse
+
+from benchmarks.bench_dispatch import amounts, load
+from benchmarks.common import report, timer
+from tastyworksTaxes.tasty import Tasty
+
+
+def prepared(rows: int):
+    history = load(rows)
+    history.addEuroConversion()
+    history._applySchema()
+    history.addDerivedColumns()
+    return history
+
+
+def tasty_for(history, fixed_point=False) -> Tasty:
+    tasty = Tasty(fixed_point=fixed_point)
+    tasty.history = history
+    return tasty
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000])
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        history = prepared(rows)
+        results = {}
+        sequential = tasty_for(history)
+        with timer(results, "run"):
+            expected = sequential.run()
+        stages = {}
+        for workers in (1, 2):
+            pipeline = tasty_for(history)
+            with timer(results, f"runPipeline, {workers} worker(s)"):
+                result = pipeline.runPipeline(workers=workers)
+            assert pipeline.position_manager.closed_trades == sequential.position_manager.closed_trades
+            for year in expected:
+                assert amounts(result[year]) == amounts(expected[year]), year
+            stages[workers] = pipeline.timings
+        report("Sequential vs pipelined run", rows, results)
+        for workers, timings in stages.items():
+            overlap = timings["money movements"] + timings["positions"] - timings["concurrent"]
+            print(f"  stages with {workers} worker(s): "
+                  + ", ".join(f"{name} {seconds:.3f} s" for name, seconds in timings.items())
+                  + f", overlap {overlap:.3f} s")
+
+
+if __name__ == "__main__":
+    main()
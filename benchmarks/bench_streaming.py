@@ -0,0 +1,46 @@
+"""Peak memory and run time of Tasty.run against Tasty.runStreaming.
+
+    python -m benchmarks.bench_streaming --rows 50000
+"""
+import argparse
+import logging
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from benchmarks.common import write_synthetic_export
+from tastyworksTaxes.tasty import Tasty
+
+
+def measure(run):
+    tracemalloc.start()
+    start = time.perf_counter()
+    run()
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--symbols", type=int, default=200)
+    parser.add_argument("--chunk-size", type=int, default=50_000)
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_synthetic_export(args.rows, Path(tmp) / "synthetic.csv", args.symbols)
+        print(f"Tasty run ({args.rows:,} rows, {args.symbols} symbols)")
+        for name, run in [
+            ("in memory", lambda: Tasty(path).run()),
+            ("streaming", lambda: Tasty().runStreaming(path, chunksize=args.chunk_size)),
+        ]:
+            seconds, peak = measure(run)
+            print(f"  {name:<12}{seconds:>10.2f} s{peak / 2**20:>12.1f} MiB peak")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Benchmark of Tasty.runTotals against Tasty.run.
+
+run() keeps every closed trade and computes the statistics afterwards;
+runTotals() folds each FIFO match into its year as it happens and builds no
+TradeResult. Both must give identical values. Each is then run once more
+under tracemalloc for its peak memory, which the timings leave out.
+
+    python -m benchmarks.bench_totals --rows 100000
+"""
+import argparse
+import tracemalloc
+
+from benchmarks.bench_dispatch import amounts
+from benchmarks.bench_pipeline import prepared, tasty_for
+from benchmarks.common import report, timer
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000])
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        history = prepared(rows)
+        results = {}
+        peaks = {}
+        values = {}
+        for name in ("run", "runTotals"):
+            with timer(results, name):
+                values[name] = getattr(tasty_for(history), name)()
+            tracemalloc.start()
+            getattr(tasty_for(history), name)()
+            peaks[name] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        for year in values["run"]:
+            assert amounts(values["runTotals"][year]) == amounts(values["run"][year]), year
+        report("Closed trades kept vs totals only", rows, results)
+        print("  peak traced memory: " + ", ".join(f"{name} {peak / 2**20:.1f} MiB" for name, peak in peaks.items()))
+
+
+if __name__ == "__main__":
+    main()
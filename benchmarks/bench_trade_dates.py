@@ -0,0 +1,48 @@
+"""Benchmark of the year bucketing and the CSV export of closed trades.
+
+The closed trades of the bundled export are repeated up to the requested
+count, so the dates have whatever type TradeResult carries.
+`Tasty.getYearlyTrades` groups them by tax year and `write_closed_trades`
+writes the closed trades CSV.
+
+    python -m benchmarks.bench_trade_dates --trades 1000000
+"""
+import argparse
+import os
+import tempfile
+
+from benchmarks.common import EXPORT, report, timer
+from tastyworksTaxes.main import write_closed_trades
+from tastyworksTaxes.tasty import Tasty
+
+
+def synthetic_trades(count: int) -> list:
+    tasty = Tasty(str(EXPORT))
+    tasty.processTransactionHistory()
+    trades = tasty.position_manager.closed_trades
+    return (trades * -(-count // len(trades)))[:count]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trades", type=int, nargs="+", default=[1_000_000])
+    args = parser.parse_args()
+
+    for count in args.trades:
+        tasty = Tasty()
+        tasty.position_manager.closed_trades = synthetic_trades(count)
+        results = {}
+        with timer(results, "getYearlyTrades"):
+            tasty.getYearlyTrades()
+        fd, path = tempfile.mkstemp(suffix=".csv")
+        os.close(fd)
+        try:
+            with timer(results, "write_closed_trades"):
+                write_closed_trades(tasty.position_manager.closed_trades, path)
+        finally:
+            os.unlink(path)
+        report("Closed trades by year and as CSV", count, results)
+
+
+if __name__ == "__main__":
+    main()
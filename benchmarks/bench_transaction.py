@@ -0,0 +1,79 @@
+"""Memory and time per transaction of Transaction against TransactionRecord.
+
+Builds every position row of a synthetic export as both types, measures the
+memory the objects hold with tracemalloc, and times building them, the
+getters PositionManager calls, and a full FIFO run over the rows.
+
+    python -m benchmarks.bench_transaction --rows 100000
+"""
+import argparse
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.bench_dispatch import load
+from benchmarks.common import report, timer
+from tastyworksTaxes.position_manager import PositionManager
+from tastyworksTaxes.transaction import Transaction, TransactionRecord
+
+
+def build(kind, rows, columns):
+    if kind is Transaction:
+        return [Transaction(values, index=columns) for values in rows]
+    return [TransactionRecord(values, columns) for values in rows]
+
+
+def call_getters(transactions) -> None:
+    for t in transactions:
+        t.getSymbol()
+        t.getType()
+        t.getQuantity()
+        t.getValue()
+        t.getFees()
+        t.getExpiry()
+        t.getStrike()
+
+
+def held_bytes(kind, rows, columns) -> int:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    transactions = build(kind, rows, columns)
+    held = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del transactions
+    return held
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    history = load(args.rows)
+    history.addEuroConversion()
+    history._applySchema()
+    history = history[history["Transaction Code"] == "Trade"]
+    columns = pd.Index(history.columns)
+    rows = list(history.itertuples(index=False, name=None))
+
+    managers = {}
+    for kind in (Transaction, TransactionRecord):
+        results = {}
+        with timer(results, "build"):
+            transactions = build(kind, rows, columns)
+        with timer(results, "getters"):
+            call_getters(transactions)
+        manager = PositionManager()
+        with timer(results, "PositionManager"):
+            for t in transactions:
+                manager.add_position(t)
+        managers[kind] = manager
+        report(kind.__name__, len(rows), results)
+        print(f"  {'memory per transaction':<28}{held_bytes(kind, rows[:20_000], columns) / min(len(rows), 20_000):>10,.0f} B")
+
+    assert managers[Transaction].closed_trades == managers[TransactionRecord].closed_trades
+    print("  closed trades identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Benchmark of History._transform against the former row-wise parsers.
+
+    python -m benchmarks.bench_transform --rows 1000000
+"""
+import argparse
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+
+from benchmarks.common import report, scaled_export, timer
+from tastyworksTaxes.history import History, TAX_TIMEZONE
+
+BERLIN = ZoneInfo(TAX_TIMEZONE)
+
+
+def rowwise_transform(df: pd.DataFrame) -> pd.DataFrame:
+    """The per-row implementation History._transform replaced, kept as reference.
+
+    Dates are converted to Berlin time like History._parse_dates does now.
+    """
+    internal_df = pd.DataFrame()
+
+    def parse_date(date_str):
+        if pd.isna(date_str):
+            return pd.NaT
+        try:
+            dt = datetime.strptime(date_str, '%Y-%m-%dT%H:%M:%S%z')
+            return dt.astimezone(BERLIN).replace(tzinfo=None)
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Failed to parse date '{date_str}': {e}")
+
+    internal_df['Date/Time'] = df['Date'].apply(parse_date)
+    internal_df['Transaction Code'] = df['Type']
+    internal_df['Transaction Subcode'] = df['Sub Type']
+    internal_df['Symbol'] = df['Symbol'].apply(
+        lambda x: str(x).split()[0] if pd.notna(x) and x != '' else '')
+
+    def extract_buy_sell(row):
+        sub_type = str(row.get('Sub Type', ''))
+        action = str(row.get('Action', ''))
+        if 'Buy' in sub_type:
+            return 'Buy'
+        elif 'Sell' in sub_type:
+            return 'Sell'
+        elif 'BUY' in action:
+            return 'Buy'
+        elif 'SELL' in action:
+            return 'Sell'
+        return ''
+
+    internal_df['Buy/Sell'] = df.apply(extract_buy_sell, axis=1)
+    internal_df['Open/Close'] = df['Action'].apply(
+        lambda x: str(x).split('_TO_')[-1].capitalize() if pd.notna(x) and '_TO_' in str(x) else '')
+    internal_df['Quantity'] = df['Quantity'] if 'Quantity' in df else 0
+    internal_df['Expiration Date'] = pd.to_datetime(
+        df['Expiration Date'], format='%m/%d/%y', errors='coerce')
+
+    def parse_strike(strike):
+        if pd.isna(strike) or strike == '':
+            return 0.0
+        try:
+            return float(strike)
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Failed to parse strike '{strike}': {e}")
+
+    internal_df['Strike'] = df['Strike Price'].apply(parse_strike) if 'Strike Price' in df else 0.0
+
+    def format_call_put(cp):
+        if pd.notna(cp) and cp not in ('', '--'):
+            return str(cp)[0]
+        return ''
+
+    internal_df['Call/Put'] = df['Call or Put'].apply(format_call_put) if 'Call or Put' in df else ''
+
+    def parse_price(row):
+        price = row.get('Average Price', None)
+        if pd.isna(price) or price == '--' or price == 0 or price == '':
+            return 0.0
+        try:
+            price_float = float(str(price).replace(',', ''))
+            symbol = row.get('Symbol', '')
+            is_option = len(str(symbol).split()) > 1
+            if is_option:
+                return price_float / 100
+            else:
+                return price_float
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Failed to parse price '{price}' for symbol '{row.get('Symbol', '')}': {e}")
+
+    if 'Average Price' in df.columns:
+        internal_df['Price'] = df.apply(parse_price, axis=1)
+    else:
+        internal_df['Price'] = 0.0
+
+    def calc_fees(row):
+        commissions = row.get('Commissions', 0)
+        fees = row.get('Fees', 0)
+        try:
+            comm_val = abs(float(str(commissions).replace(',', ''))) if commissions != '--' and pd.notna(commissions) else 0
+            fees_val = abs(float(str(fees).replace(',', ''))) if fees != '--' and pd.notna(fees) else 0
+            return comm_val + fees_val
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Failed to parse fees - commissions: '{commissions}', fees: '{fees}': {e}")
+
+    if 'Commissions' in df.columns:
+        internal_df['Fees'] = df.apply(calc_fees, axis=1)
+    else:
+        internal_df['Fees'] = df['Fees'].apply(
+            lambda x: abs(float(str(x).replace(',', ''))) if pd.notna(x) and x != '--' and x != 0 else 0.0)
+
+    def parse_amount(amount):
+        if pd.isna(amount):
+            return 0.0
+        try:
+            return float(str(amount).replace(',', ''))
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Failed to parse amount '{amount}': {e}")
+
+    internal_df['Amount'] = df['Value'].apply(parse_amount)
+    internal_df['Description'] = df['Description']
+
+    return internal_df
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--skip-rowwise", action="store_true",
+                        help="only time the vectorized transform")
+    args = parser.parse_args()
+
+    df = scaled_export(args.rows)
+    results = {}
+    if not args.skip_rowwise:
+        with timer(results, "row-wise (before)"):
+            expected = rowwise_transform(df)
+    with timer(results, "vectorized (after)"):
+        actual = History._transform(df)
+    report("History._transform", args.rows, results)
+
+    if not args.skip_rowwise:
+        pd.testing.assert_frame_equal(actual, expected, check_exact=True)
+        print("  outputs identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Shared helpers for the benchmark scripts.
+
+The benchmarks scale the bundled TastyTrade export up to the requested row
+count by tiling it, so they run without any private data.
+"""
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+ROOT = Path(__file__).resolve().parent.parent
+EXPORT = ROOT / "test" / "tastytrade_transactions_history_180201_to_240817.csv"
+
+
+def load_export() -> pd.DataFrame:
+    return pd.read_csv(EXPORT)
+
+
+def scaled_export(rows: int) -> pd.DataFrame:
+    """Returns the bundled export tiled up to `rows` raw rows."""
+    df = load_export()
+    repeats = -(-rows // len(df))
+    return pd.concat([df] * repeats, ignore_index=True).iloc[:rows].reset_index(drop=True)
+
+
+@contextmanager
+def timer(results: dict, name: str):
+    start = time.perf_counter()
+    yield
+    results[name] = time.perf_counter() - start
+
+
+def report(title: str, rows: int, results: dict) -> None:
+    print(f"{title} ({rows:,} rows)")
+    for name, seconds in results.items():
+        rate = rows / seconds if seconds else float("inf")
+        print(f"  {name:<28}{seconds:>10.3f} s{rate:>16,.0f} rows/s")
+
+
+def synthetic_export(rows: int, symbols: int = 200, start: str = "2018-02-01") -> pd.DataFrame:
+    """Builds a valid TastyTrade export of `rows` rows, newest first like the real one.
+
+    Symbols take turns; each symbol alternates between opening and closing a
+    position, so at most `symbols` lots are open at any time. Every tenth
+    row is a credit interest money movement. Half the symbols are options.
+    """
+    import numpy as np
+
+    t = np.arange(rows)
+    dates = pd.Timestamp(start) + pd.to_timedelta(t * 3, unit="min")
+    money = t % 10 == 0
+    trade_number = np.cumsum(~money) - 1
+    symbol_id = trade_number % symbols
+    opening = (trade_number // symbols) % 2 == 0
+    is_option = symbol_id % 2 == 1
+    quantity = 1 + symbol_id % 5
+    roots = np.array([f"S{i:04d}" for i in range(symbols)], dtype=object)
+    root = roots[symbol_id]
+    option_symbol = root + "  301231C00100000"
+
+    df = pd.DataFrame({
+        "Date": dates.strftime("%Y-%m-%dT%H:%M:%S+0000"),
+        "Type": np.where(money, "Money Movement", "Trade"),
+        "Sub Type": np.where(money, "Credit Interest",
+                             np.where(opening, "Buy to Open", "Sell to Close")),
+        "Action": np.where(money, "", np.where(opening, "BUY_TO_OPEN", "SELL_TO_CLOSE")),
+        "Symbol": np.where(money, "", np.where(is_option, option_symbol, root)),
+        "Instrument Type": np.where(money, "", np.where(is_option, "Equity Option", "Equity")),
+        "Description": np.where(money, "INTEREST ON CREDIT BALANCE", "synthetic trade"),
+        "Value": np.where(money, 0.03, np.where(opening, -100.0, 110.0) * quantity),
+        "Quantity": np.where(money, 0, quantity),
+        "Average Price": np.where(money, "", np.where(opening, "-100.00", "110.00")),
+        "Commissions": np.where(money, "--", "-1.00"),
+        "Fees": np.where(money, 0.0, 0.14),
+        "Multiplier": np.where(is_option & ~money, 100.0, np.nan),
+        "Root Symbol": np.where(money, "", root),
+        "Underlying Symbol": np.where(money, "", root),
+        "Expiration Date": np.where(is_option & ~money, "12/31/30", ""),
+        "Strike Price": np.where(is_option & ~money, 100.0, np.nan),
+        "Call or Put": np.where(is_option & ~money, "CALL", ""),
+        "Order #": 123456,
+        "Currency": "USD",
+    })
+    df = df.replace("", np.nan)
+    return df.iloc[::-1].reset_index(drop=True)
+
+
+def write_synthetic_export(rows: int, path: Path, symbols: int = 200) -> Path:
+    synthetic_export(rows, symbols).to_csv(path, index=False)
+    return path
@@ -1,29 +1,168 @@
+"""Classification of symbols into the asset classes of ASSET_DEFINITIONS.
+
+The symbol sets of ASSET_DEFINITIONS and the rows of a reference file
+(asset_classes.csv, symbol, category and optionally ISIN) are compiled once
+into a symbol index and an ISIN index. A compiled reference file is cached
+in the cache directory, keyed by its contents, so a list of thousands of
+funds is parsed only when it changes. Callable rules such as the crypto
+pair check are only asked about symbols the index does not know, once per
+symbol.
+"""
+import hashlib
+import io
+import json
 import logging
-from tastyworksTaxes.position import PositionType
+import os
+import tempfile
+import zipfile
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
 from tastyworksTaxes.asset_definitions import ASSET_DEFINITIONS
+from tastyworksTaxes.cache import cache_dir, file_digest, prune
+from tastyworksTaxes.position import PositionType
 
 logger = logging.getLogger(__name__)
 
+ASSET_CLASSES_FILE = Path(__file__).parent.parent / "asset_classes.csv"
+INDEX_VERSION = 1
+CACHED_INDEXES = 4
+
+
+def _builtin_index() -> dict:
+    rules = ASSET_DEFINITIONS.get(PositionType.stock, {})
+    return {symbol: category for category, definition in rules.items()
+            if isinstance(definition['symbols'], set) for symbol in sorted(definition['symbols'])}
+
+
+def read_reference(path) -> pd.DataFrame:
+    """The rows of a reference file: symbol, category and an optional isin column.
+
+    Lines starting with # are comments. Raises ValueError for missing
+    columns and categories that ASSET_DEFINITIONS does not define.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        lines = [line for line in f if line.strip() and not line.strip().startswith("#")]
+    df = pd.read_csv(io.StringIO(''.join(lines)), dtype=str, keep_default_na=False)
+    df.columns = df.columns.str.strip().str.lower()
+    missing = {'symbol', 'category'} - set(df.columns)
+    if missing:
+        raise ValueError(f"{path} needs the columns 'symbol' and 'category', missing: {sorted(missing)}")
+    if 'isin' not in df.columns:
+        df['isin'] = ''
+    df = df[['symbol', 'category', 'isin']].apply(lambda column: column.str.strip())
+    unknown = sorted(set(df['category']) - set(ASSET_DEFINITIONS.get(PositionType.stock, {})))
+    if unknown:
+        raise ValueError(f"{path} has unknown categories {unknown}")
+    return df
+
+
+def compile_index(path=None) -> tuple[dict, dict]:
+    """The symbol and ISIN indexes; rows of the reference file take precedence over the built-in sets"""
+    symbols = _builtin_index()
+    isins = {}
+    if path is not None:
+        df = read_reference(path)
+        symbols.update(zip(df['symbol'], df['category']))
+        with_isin = df[df['isin'] != '']
+        isins.update(zip(with_isin['isin'], with_isin['category']))
+    return symbols, isins
+
+
+def _index_cache_path(path) -> Path:
+    key = '|'.join([file_digest(path), json.dumps(_builtin_index(), sort_keys=True), str(INDEX_VERSION)])
+    return cache_dir() / f"asset-index-{hashlib.sha256(key.encode()).hexdigest()[:16]}.npz"
+
+
+def _save_index(symbols: dict, isins: dict, path: Path) -> None:
+    categories = sorted(set(symbols.values()) | set(isins.values()))
+    codes = {category: code for code, category in enumerate(categories)}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, categories=np.array(categories, dtype=str),
+                     symbols=np.array(list(symbols), dtype=str),
+                     symbol_codes=np.array([codes[c] for c in symbols.values()], dtype=np.int16),
+                     isins=np.array(list(isins), dtype=str),
+                     isin_codes=np.array([codes[c] for c in isins.values()], dtype=np.int16))
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _load_index(path: Path) -> tuple[dict, dict]:
+    try:
+        with np.load(path, allow_pickle=False) as arrays:
+            categories = arrays['categories'].tolist()
+            return ({symbol: categories[code] for symbol, code in
+                     zip(arrays['symbols'].tolist(), arrays['symbol_codes'].tolist())},
+                    {isin: categories[code] for isin, code in
+                     zip(arrays['isins'].tolist(), arrays['isin_codes'].tolist())})
+    except (zipfile.BadZipFile, KeyError, EOFError, IndexError) as e:
+        raise ValueError(f"{path} is not a compiled asset index: {e}")
+
+
+@lru_cache(maxsize=None)
+def _cached_index(path: str, cache_path: Path) -> tuple[dict, dict]:
+    if cache_path.exists():
+        try:
+            return _load_index(cache_path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable asset index cache {cache_path}: {e}")
+    index = compile_index(path)
+    try:
+        _save_index(*index, cache_path)
+        prune('asset-index-*.npz', CACHED_INDEXES)
+    except OSError as e:
+        logger.debug(f"Could not write asset index cache {cache_path}: {e}")
+    return index
+
+
+def load_index(path=None) -> tuple[dict, dict]:
+    """compile_index, read from the cache if the reference file was compiled before"""
+    if path is None or not Path(path).exists():
+        return compile_index()
+    return _cached_index(str(path), _index_cache_path(path))
+
+
 class AssetClassifier:
-    def __init__(self):
+    def __init__(self, reference_file=ASSET_CLASSES_FILE):
         self._definitions = ASSET_DEFINITIONS
-        logger.debug("AssetClassifier initialized")
+        self._index, self._isin_index = load_index(reference_file)
+        self._rules = [(category, definition['symbols'])
+                       for category, definition in self._definitions.get(PositionType.stock, {}).items()
+                       if callable(definition['symbols'])]
+        self._rule_memo = {}
+        logger.debug(f"AssetClassifier initialized with {len(self._index)} symbols")
 
     def classify(self, symbol: str, position_type: PositionType) -> str:
         if position_type != PositionType.stock:
             return position_type.name.upper()
+        category = self._index.get(symbol)
+        return category if category is not None else self._classify_by_rules(symbol)
+
+    def classify_isin(self, isin: str) -> str:
+        return self._isin_index.get(isin, 'INDIVIDUAL_STOCK')
+
+    def classify_many(self, symbols) -> np.ndarray:
+        """Categories of many stock symbols, looking up each distinct symbol once"""
+        codes, uniques = pd.factorize(pd.Series(symbols, dtype=object))
+        categories = pd.Series(uniques, dtype=object).map(self._index).to_numpy(dtype=object)
+        unknown = pd.isna(categories)
+        categories[unknown] = [self._classify_by_rules(symbol) for symbol in uniques[unknown]]
+        return categories[codes]
 
-        rules = self._definitions.get(PositionType.stock, {})
-        for category, definition in rules.items():
-            checker = definition['symbols']
-            if callable(checker):
-                if checker(symbol):
-                    return category
-            elif isinstance(checker, set):
-                if symbol in checker:
-                    return category
-        
-        return 'INDIVIDUAL_STOCK'
+    def _classify_by_rules(self, symbol: str) -> str:
+        category = self._rule_memo.get(symbol)
+        if category is None:
+            category = next((category for category, rule in self._rules if rule(symbol)), 'INDIVIDUAL_STOCK')
+            self._rule_memo[symbol] = category
+        return category
 
     def get_tax_category(self, classification: str) -> str:
         for def_type in self._definitions.values():
@@ -36,20 +175,15 @@ class AssetClassifier:
             if classification in def_type:
                 return def_type[classification]['properties'].get('teilfreistellung_pct', 0)
         return 0
-    
+
     def get_all_symbols_by_type(self, asset_type: str) -> set:
-        rules = self._definitions.get(PositionType.stock, {})
-        if asset_type in rules:
-            checker = rules[asset_type]['symbols']
-            if isinstance(checker, set):
-                return checker
-        return set()
-    
+        return {symbol for symbol, category in self._index.items() if category == asset_type}
+
     def check_unsupported_assets(self, symbols: list) -> None:
         for symbol in symbols:
             classification = self.classify(symbol, PositionType.stock)
             tax_category = self.get_tax_category(classification)
-            
+
             if tax_category == 'SO':
                 logger.warning(f"UNSUPPORTED TAX CATEGORY: Symbol '{symbol}' ({classification}) belongs in 'Anlage SO'. "
                              f"This program does not handle this. You must calculate it manually.")
@@ -59,4 +193,4 @@ class AssetClassifier:
             elif classification in ['MIXED_FUND_ETF', 'REAL_ESTATE_ETF']:
                 exemption_pct = self.get_exemption_percentage(classification)
                 logger.warning(f"Special fund type detected: '{symbol}' ({classification}) has {exemption_pct}% Teilfreistellung "
-                             f"but automatic calculation is not fully implemented.")
\ No newline at end of file
+                             f"but automatic calculation is not fully implemented.")
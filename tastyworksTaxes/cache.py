@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import tempfile
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+def cache_dir() -> Path:
+    """Directory for derived data that can be rebuilt at any time.
+
+    TASTYWORKS_TAXES_CACHE_DIR overrides the default under XDG_CACHE_HOME.
+    """
+    override = os.environ.get("TASTYWORKS_TAXES_CACHE_DIR")
+    if override:
+        return Path(override)
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "tastyworksTaxes"
+
+
+def file_digest(path, block_size: int = 1 << 20) -> str:
+    """Hash of the file contents, independent of its name and timestamps"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        while block := f.read(block_size):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def save_frame(df: pd.DataFrame, path) -> None:
+    """Stores a frame column by column as plain numpy arrays in an .npz file.
+
+    Numbers are stored as they are, datetimes as int64 ticks and text and
+    categoricals as int32 codes into a table of unique values, so loading never unpickles
+    anything. Raises TypeError for columns holding anything but text.
+    The file is written atomically.
+    """
+    arrays = {}
+    columns = []
+    for i, column in enumerate(df.columns):
+        series = df[column]
+        dtype = str(series.dtype)
+        if series.dtype.kind in 'biuf':
+            arrays[f'{i}'] = series.to_numpy()
+        elif series.dtype.kind == 'M':
+            arrays[f'{i}'] = series.to_numpy().view(np.int64)
+        elif isinstance(series.dtype, pd.CategoricalDtype):
+            uniques = series.cat.categories
+            if not all(isinstance(value, str) for value in uniques):
+                raise TypeError(f"Column '{column}' has categories that are not text")
+            arrays[f'{i}'] = series.cat.codes.to_numpy().astype(np.int32)
+            arrays[f'{i}_text'] = np.array(uniques, dtype=str) if len(uniques) else np.array([], dtype='U1')
+            dtype = 'category'
+        elif pd.api.types.is_string_dtype(series.dtype):
+            codes, uniques = pd.factorize(series)
+            if not all(isinstance(value, str) for value in uniques):
+                raise TypeError(f"Column '{column}' holds values that are not text")
+            arrays[f'{i}'] = codes.astype(np.int32)
+            arrays[f'{i}_text'] = np.array(uniques, dtype=str) if len(uniques) else np.array([], dtype='U1')
+        else:
+            raise TypeError(f"Column '{column}' has unsupported dtype {dtype}")
+        columns.append([column, dtype])
+    arrays['columns'] = np.array(json.dumps(columns))
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def load_frame(path) -> pd.DataFrame:
+    """Reads a frame written by save_frame with the original dtypes.
+
+    Raises ValueError if the file is damaged or was not written by save_frame.
+    """
+    try:
+        with np.load(path, allow_pickle=False) as arrays:
+            data = {}
+            for i, (column, dtype) in enumerate(json.loads(str(arrays['columns']))):
+                values = arrays[f'{i}']
+                if dtype.startswith('datetime64'):
+                    data[column] = pd.Series(values.view(dtype))
+                elif dtype == 'category':
+                    categories = pd.Index(arrays[f'{i}_text'].astype(object), dtype='str')
+                    data[column] = pd.Series(pd.Categorical.from_codes(values, categories))
+                elif f'{i}_text' in arrays:
+                    text = pd.Index(arrays[f'{i}_text'].astype(object), dtype=dtype)
+                    data[column] = pd.Series(text.take(values, allow_fill=True, fill_value=np.nan))
+                else:
+                    data[column] = pd.Series(values, dtype=dtype)
+    except (zipfile.BadZipFile, KeyError, EOFError) as e:
+        raise ValueError(f"{path} is not a cached frame: {e}")
+    return pd.DataFrame(data)
+
+
+def prune(pattern: str, keep: int) -> None:
+    """Deletes all but the `keep` most recently used cache files matching `pattern`"""
+    entries = sorted(cache_dir().glob(pattern), key=lambda p: p.stat().st_mtime, reverse=True)
+    for entry in entries[keep:]:
+        entry.unlink(missing_ok=True)
+
+
+def clear(pattern: str = '*') -> int:
+    """Deletes the cache files matching `pattern` and returns how many there were"""
+    removed = 0
+    for entry in cache_dir().glob(pattern):
+        if entry.is_file():
+            entry.unlink(missing_ok=True)
+            removed += 1
+    return removed
@@ -0,0 +1,161 @@
+"""Year-end snapshots of the engine state, so a later run only processes new rows.
+
+A checkpoint holds the open lots in FIFO order, a symbol change lot still
+waiting for its open leg, the instrument table and the finished per-year
+values, and whether the lot amounts are fixed point units. It also records
+how many chronological input rows were consumed and a checksum over them;
+rows of a later input up to the checkpoint year must match both before the
+run may resume.
+"""
+import gzip
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from tastyworksTaxes.constants import Fields
+from tastyworksTaxes.history import DERIVED_COLUMNS
+from tastyworksTaxes.instruments import InstrumentKey
+from tastyworksTaxes.money import Money
+from tastyworksTaxes.position import PositionType
+from tastyworksTaxes.position_lot import PositionLot
+from tastyworksTaxes.values import Values
+
+CHECKPOINT_VERSION = 1
+_ROW_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+def row_hashes(history: pd.DataFrame) -> np.ndarray:
+    """64-bit hash of each input row, independent of how pandas typed the columns.
+
+    Derived columns are left out; euro amounts are included, so a different
+    exchange rate policy gives different hashes.
+    """
+    columns = [column for column in history.columns
+               if column not in DERIVED_COLUMNS and column != Fields.INSTRUMENT_ID.value]
+    normalized = pd.DataFrame({
+        column: history[column].dt.as_unit('us').astype('int64') if history[column].dtype.kind == 'M'
+        else history[column].astype(object) if history[column].dtype.kind not in 'biuf'
+        else history[column]
+        for column in columns
+    })
+    return pd.util.hash_pandas_object(normalized, index=False).to_numpy()
+
+
+def rows_checksum(history: pd.DataFrame, start: int = 0, checksum: int = 0) -> int:
+    """Order dependent 64-bit checksum of the row_hashes of a chronological frame.
+
+    The rows continue a sequence of `start` rows with checksum `checksum`, so
+    consuming an export in several steps gives the checksum of consuming it
+    at once.
+    """
+    positions = np.arange(start, start + len(history), dtype=np.uint64)
+    mixed = pd.util.hash_array(row_hashes(history) ^ (positions * _ROW_MIX))
+    return (checksum + int(mixed.sum(dtype=np.uint64))) % 2**64
+
+
+def _timestamp(value):
+    return None if value is None or pd.isna(value) else pd.Timestamp(value).isoformat()
+
+
+def _amount(value):
+    """Fixed point units stay integers"""
+    return value if isinstance(value, int) else float(value)
+
+
+def _lot_to_dict(lot: PositionLot) -> dict:
+    return {
+        'symbol': lot.symbol,
+        'position_type': lot.position_type.value,
+        'quantity': lot.quantity.item() if isinstance(lot.quantity, np.generic) else lot.quantity,
+        'amount_usd': _amount(lot.amount_usd),
+        'amount_eur': _amount(lot.amount_eur),
+        'fees_usd': _amount(lot.fees_usd),
+        'fees_eur': _amount(lot.fees_eur),
+        'date': _timestamp(lot.date),
+        'strike': None if lot.strike is None else float(lot.strike),
+        'expiry': _timestamp(lot.expiry),
+        'call_put': lot.call_put,
+        'instrument_id': None if lot.instrument_id is None else int(lot.instrument_id),
+    }
+
+
+def _lot_from_dict(data: dict) -> PositionLot:
+    return PositionLot(**{
+        **data,
+        'position_type': PositionType(data['position_type']),
+        'date': pd.Timestamp(data['date']),
+        'expiry': None if data['expiry'] is None else pd.Timestamp(data['expiry']),
+    })
+
+
+def _key_to_list(key: InstrumentKey) -> list:
+    return [key.symbol, key.position_type.value, None if key.strike is None else float(key.strike),
+            _timestamp(key.expiry), key.call_put]
+
+
+def _key_from_list(data: list) -> InstrumentKey:
+    symbol, position_type, strike, expiry, call_put = data
+    return InstrumentKey(symbol, PositionType(position_type), strike,
+                         None if expiry is None else pd.Timestamp(expiry), call_put)
+
+
+def _values_to_dict(values: Values) -> dict:
+    return {name: [money.usd, money.eur] for name, money in vars(values).items()}
+
+
+def _values_from_dict(data: dict, fixed: bool = False) -> Values:
+    return Values(**{name: Money(usd=usd, eur=eur, fixed=fixed) for name, (usd, eur) in data.items()})
+
+
+def save(path, year: int, rows: int, checksum: int, position_manager, year_values: dict) -> None:
+    """Writes the state after `year` as gzipped JSON, atomically"""
+    pending = getattr(position_manager, '_pending_symbol_change_lot', None)
+    state = {
+        'version': CHECKPOINT_VERSION,
+        'year': year,
+        'rows': rows,
+        'checksum': f'{checksum:016x}',
+        'fixed_point': position_manager.fixed_point,
+        'instruments': [_key_to_list(position_manager.instruments[i])
+                        for i in range(len(position_manager.instruments))],
+        'open_lots': [_lot_to_dict(lot) for lots in position_manager.open_lots.values() for lot in lots],
+        'pending_lot': None if pending is None else _lot_to_dict(pending),
+        'values': {str(key): _values_to_dict(values) for key, values in year_values.items()},
+    }
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f, gzip.GzipFile(fileobj=f, mode='wb', mtime=0) as g:
+            g.write(json.dumps(state, separators=(',', ':')).encode('utf-8'))
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def load(path) -> dict:
+    """Reads a checkpoint written by save; the lots, keys and values are rebuilt as objects.
+
+    Raises ValueError if the file is damaged or of another version.
+    """
+    try:
+        with gzip.open(path, 'rb') as f:
+            state = json.loads(f.read().decode('utf-8'))
+    except (OSError, EOFError, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"{path} is not a checkpoint: {e}")
+    if state.get('version') != CHECKPOINT_VERSION:
+        raise ValueError(f"{path} is a checkpoint of version {state.get('version')}, "
+                         f"expected version {CHECKPOINT_VERSION}")
+    state['checksum'] = int(state['checksum'], 16)
+    state.setdefault('fixed_point', False)
+    state['instruments'] = [_key_from_list(key) for key in state['instruments']]
+    state['open_lots'] = [_lot_from_dict(lot) for lot in state['open_lots']]
+    if state['pending_lot'] is not None:
+        state['pending_lot'] = _lot_from_dict(state['pending_lot'])
+    state['values'] = {int(key): _values_from_dict(values, state['fixed_point']) for key, values in state['values'].items()}
+    return state
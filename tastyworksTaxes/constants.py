@@ -36,6 +36,11 @@ class Fields(Enum):
     DATE_TIME = "Date/Time"
     BUY_SELL = "Buy/Sell"
     DESCRIPTION = "Description"
+    POSITION_TYPE = "Position Type"
+    SIGNED_QUANTITY = "Signed Quantity"
+    IS_CLOSING = "Is Closing"
+    INSTRUMENT_KEY = "Instrument Key"
+    INSTRUMENT_ID = "Instrument Id"
 
 class MoneyMovementType(Enum):
     TRANSFER = "Transfer"
@@ -58,6 +63,15 @@ CLOSING_SUBCODES = {
 
 VALID_OPTION_TYPES = {"P", "C"}
 
+# Subcodes of Trade and Receive Deliver rows the position manager can process
+POSITION_SUBCODES = CLOSING_SUBCODES | {
+    TransactionSubcode.BUY_TO_OPEN.value,
+    TransactionSubcode.SELL_TO_OPEN.value,
+    TransactionSubcode.REVERSE_SPLIT.value,
+    TransactionSubcode.SYMBOL_CHANGE.value,
+    TransactionSubcode.STOCK_MERGER.value,
+}
+
 VALID_TRANSACTION_CODES = {
     TransactionCode.TRADE.value,
     TransactionCode.RECEIVE_DELIVER.value,
@@ -1,14 +1,19 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field, fields
+from typing import NamedTuple
+import pandas as pd
 from tastyworksTaxes.constants import TransactionSubcode, Fields
+from tastyworksTaxes.fixed_point import allocate, from_units, to_units
 from tastyworksTaxes.position import PositionType
 from tastyworksTaxes.position_lot import PositionLot
 
 @dataclass
 class TradeResult:
+    """One closed trade. Dates are timestamps, given as text they are parsed;
+    `tax_year` is the year of the closing date"""
     symbol: str
     position_type: PositionType
-    opening_date: str
-    closing_date: str
+    opening_date: pd.Timestamp
+    closing_date: pd.Timestamp
     quantity: float
     profit_usd: float
     profit_eur: float
@@ -16,43 +21,139 @@ class TradeResult:
     fees_eur: float
     worthless_expiry: bool
     strike: float = None
-    expiry: str = None
+    expiry: pd.Timestamp = None
+    instrument_id: int = field(default=None, compare=False)
+    tax_year: int = field(default=None, compare=False)
+
+    def __post_init__(self):
+        if isinstance(self.opening_date, str):
+            self.opening_date = pd.Timestamp(self.opening_date)
+        if isinstance(self.closing_date, str):
+            self.closing_date = pd.Timestamp(self.closing_date)
+        if isinstance(self.expiry, str):
+            self.expiry = pd.Timestamp(self.expiry)
+        if self.tax_year is None:
+            self.tax_year = self.closing_date.year
+
+
+CLOSED_TRADE_COLUMNS = [f.name for f in fields(TradeResult) if f.name != 'tax_year']
+
+
+def closed_trades_frame(trades) -> pd.DataFrame:
+    """The rows of the closed trades csv; the dates are formatted as text only here"""
+    df = pd.DataFrame({column: [getattr(trade, column) for trade in trades] for column in CLOSED_TRADE_COLUMNS})
+    for column, date_format in [('opening_date', '%Y-%m-%d %H:%M:%S'), ('closing_date', '%Y-%m-%d %H:%M:%S'),
+                                ('expiry', '%Y-%m-%d')]:
+        df[column] = pd.to_datetime(df[column]).dt.strftime(date_format)
+    return df
+
+class TradeMatch(NamedTuple):
+    """The amounts of one FIFO match, all an aggregator reads of a closed trade"""
+    symbol: str
+    position_type: PositionType
+    quantity: float
+    profit_usd: float
+    profit_eur: float
+    fees_usd: float
+    fees_eur: float
+    worthless_expiry: bool
+    tax_year: int
+
 
 class FifoProcessor:
     @staticmethod
-    def create_trade_result(opening_lot, closing_transaction, consumed_quantity, consumed_values, opening_was_long: bool):
-        closing_amounts = FifoProcessor._calculate_closing_amounts(closing_transaction, consumed_quantity)
+    def create_trade_result(opening_lot, closing_transaction, consumed_quantity, consumed_values, opening_was_long: bool,
+                            closed_quantity=0, fixed_point=False):
+        match = FifoProcessor.create_match(closing_transaction, consumed_quantity, consumed_values, opening_was_long,
+                                           closed_quantity, fixed_point)
+        return FifoProcessor.trade_result(match, opening_lot, closing_transaction)
+
+    @staticmethod
+    def create_match(closing_transaction, consumed_quantity, consumed_values, opening_was_long: bool,
+                     closed_quantity=0, fixed_point=False) -> TradeMatch:
+        """The match of `consumed_quantity` of a lot with the closing transaction.
 
-        signed_quantity = consumed_quantity if opening_was_long else -consumed_quantity
-        
-        trade_result = TradeResult(
+        `closed_quantity` is how much of the transaction earlier lots already
+        closed; with `fixed_point` the consumed values are units and the unit
+        sums are converted to floats here.
+        """
+        closing_amounts = FifoProcessor._calculate_closing_amounts(closing_transaction, consumed_quantity,
+                                                                   closed_quantity, fixed_point)
+        amounts = (consumed_values[Fields.AMOUNT.value] + closing_amounts['amount_usd'],
+                   consumed_values[Fields.AMOUNT_EURO.value] + closing_amounts['amount_eur'],
+                   consumed_values[Fields.FEES.value] + closing_amounts['fees_usd'],
+                   consumed_values[Fields.FEES_EURO.value] + closing_amounts['fees_eur'])
+        if fixed_point:
+            amounts = tuple(from_units(amount) for amount in amounts)
+        profit_usd, profit_eur, fees_usd, fees_eur = amounts
+
+        return TradeMatch(
             symbol=closing_transaction.getSymbol(),
             position_type=closing_transaction.getType(),
-            opening_date=opening_lot.date.strftime('%Y-%m-%d %H:%M:%S'),
-            closing_date=closing_transaction.getDateTime(),
-            quantity=signed_quantity,
-            profit_usd=consumed_values[Fields.AMOUNT.value] + closing_amounts['amount_usd'],
-            profit_eur=consumed_values[Fields.AMOUNT_EURO.value] + closing_amounts['amount_eur'],
-            fees_usd=consumed_values[Fields.FEES.value] + closing_amounts['fees_usd'],
-            fees_eur=consumed_values[Fields.FEES_EURO.value] + closing_amounts['fees_eur'],
+            quantity=consumed_quantity if opening_was_long else -consumed_quantity,
+            profit_usd=profit_usd,
+            profit_eur=profit_eur,
+            fees_usd=fees_usd,
+            fees_eur=fees_eur,
             worthless_expiry=(
                 closing_transaction[Fields.TRANSACTION_SUBCODE.value] == TransactionSubcode.EXPIRATION.value
                 and opening_was_long
             ),
-            strike=closing_transaction.getStrike() if closing_transaction.getType() != PositionType.stock else None,
-            expiry=closing_transaction.getExpiry().strftime('%Y-%m-%d') if closing_transaction.getType() != PositionType.stock else None
+            tax_year=closing_transaction[Fields.DATE_TIME.value].year,
         )
-        
-        return trade_result
-    
+
     @staticmethod
-    def _calculate_closing_amounts(transaction, quantity):
+    def trade_result(match: TradeMatch, opening_lot, closing_transaction) -> TradeResult:
+        """The full closed trade of a match: adds the dates, the strike and the expiry"""
+        position_type = match.position_type
+        return TradeResult(
+            symbol=match.symbol,
+            position_type=position_type,
+            opening_date=opening_lot.date,
+            closing_date=closing_transaction[Fields.DATE_TIME.value],
+            quantity=match.quantity,
+            profit_usd=match.profit_usd,
+            profit_eur=match.profit_eur,
+            fees_usd=match.fees_usd,
+            fees_eur=match.fees_eur,
+            worthless_expiry=match.worthless_expiry,
+            strike=closing_transaction.getStrike() if position_type != PositionType.stock else None,
+            expiry=closing_transaction.getExpiry() if position_type != PositionType.stock else None,
+            instrument_id=opening_lot.instrument_id,
+            tax_year=match.tax_year,
+        )
+
+    @staticmethod
+    def _calculate_closing_amounts(transaction, quantity, closed_quantity=0, fixed_point=False):
+        """The share of `quantity` in the amounts of a closing transaction.
+
+        With fixed point each share is the rounded cumulative share up to
+        `closed_quantity + quantity` minus the one up to `closed_quantity`, so
+        the shares of all matches add up to the transaction's amounts exactly.
+        """
         closing_qty_abs = abs(transaction.getQuantity())
+        value = transaction.getValue()
+        fees = transaction.getFees()
+        if fixed_point:
+            if closing_qty_abs == 0:
+                return dict.fromkeys(['amount_usd', 'amount_eur', 'fees_usd', 'fees_eur'], 0)
+
+            def share(amount):
+                units = to_units(amount)
+                return (allocate(units, closed_quantity + quantity, closing_qty_abs)
+                        - allocate(units, closed_quantity, closing_qty_abs))
+
+            return {
+                'amount_usd': share(value.usd),
+                'amount_eur': share(value.eur),
+                'fees_usd': share(fees.usd),
+                'fees_eur': share(fees.eur)
+            }
+
         percentage = quantity / closing_qty_abs if closing_qty_abs > 0 else 0
-        
         return {
-            'amount_usd': transaction.getValue().usd * percentage,
-            'amount_eur': transaction.getValue().eur * percentage,
-            'fees_usd': transaction.getFees().usd * percentage,
-            'fees_eur': transaction.getFees().eur * percentage
+            'amount_usd': value.usd * percentage,
+            'amount_eur': value.eur * percentage,
+            'fees_usd': fees.usd * percentage,
+            'fees_eur': fees.eur * percentage
         }
\ No newline at end of file
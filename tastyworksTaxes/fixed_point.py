@@ -0,0 +1,68 @@
+"""Exact fixed-point amounts: integers of hundredths of a cent.
+
+With fixed point on, the amounts and fees of the open lots are quantized to
+units of 1/SCALE when a position is opened and stay integers from then on.
+Partial fills are allocated with allocate, which rounds half to even, and
+the remainder stays with the lot or the closing transaction, so no unit is
+ever lost or created. Per-year sums run over int64 arrays.
+
+The mode belongs to a run, not to the process: Tasty(fixed_point=True)
+hands it to its PositionManager, which passes it on to the lots and to
+FifoProcessor, and to the TradeStore or aggregator that books the trades.
+The float path is the default, and both can run side by side on the same
+export.
+
+Closed trades, TradeMatch and Money carry floats, the exact units divided
+by SCALE; to_units gives back the same units for any amount of less than
+10**11. Money booked with fixed point is marked `fixed` and adds and
+subtracts through units, so the values stay on the 1/SCALE grid.
+"""
+from fractions import Fraction
+
+import numpy as np
+
+SCALE = 10_000
+
+def to_units(amount) -> int:
+    """Nearest number of units of an amount, ties to even"""
+    return round(float(amount) * SCALE)
+
+
+def to_units_array(amounts) -> np.ndarray:
+    """to_units of an amount vector, as int64"""
+    return np.rint(np.asarray(amounts, dtype=float) * SCALE).astype(np.int64)
+
+
+def from_units(units) -> float:
+    return units / SCALE
+
+
+def _round_half_even(numerator, denominator):
+    quotient, remainder = divmod(numerator, denominator)
+    return quotient + ((2 * remainder > denominator) | ((2 * remainder == denominator) & (quotient % 2 == 1)))
+
+
+def allocate(units: int, part, whole) -> int:
+    """The share `part / whole` of `units`, rounded half to even.
+
+    Integral quantities are divided as integers, fractional ones as the exact
+    fraction of their float value, so the result never depends on float
+    rounding. Allocating `whole` of `whole` gives back `units`.
+    """
+    if part == whole:
+        return units
+    if not part:
+        return 0
+    if float(part).is_integer() and float(whole).is_integer():
+        numerator, denominator = units * int(part), int(whole)
+    else:
+        ratio = Fraction(part) / Fraction(whole)
+        numerator, denominator = units * ratio.numerator, ratio.denominator
+    if denominator < 0:
+        numerator, denominator = -numerator, -denominator
+    return int(_round_half_even(numerator, denominator))
+
+
+def allocate_array(units: np.ndarray, part, whole: int) -> np.ndarray:
+    """allocate of an int64 vector with integer shares, e.g. a percentage of 100"""
+    return _round_half_even(units * np.asarray(part, dtype=np.int64), whole)
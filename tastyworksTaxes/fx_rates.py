@@ -0,0 +1,237 @@
+"""Day-indexed USD/EUR rate tables and the conversion policies built on them.
+
+Parsing the ECB history with CurrencyConverter takes most of a second, so the
+USD column is compiled once into a flat float64 array indexed by day ordinal
+and cached on disk. Later runs memory-map the file; a lookup is an array index.
+
+Monthly averages (as published by the BMF) and firm-supplied rate files are
+read from local CSV files into the same kind of table, so every policy
+converts a whole column with one vectorized lookup.
+"""
+import hashlib
+import importlib.util
+import logging
+import os
+import struct
+import tempfile
+from datetime import date
+from functools import lru_cache
+from importlib import metadata
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from tastyworksTaxes.cache import cache_dir, file_digest
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+FX_POLICIES = ('ecb', 'bmf-monthly', 'csv')
+_HEADER = struct.Struct('<8sqq')  # magic, ordinal of the first day, number of days
+_MAGIC = b'TWTRATE1'
+_EPOCH_ORDINAL = 719163  # date(1970, 1, 1).toordinal()
+
+
+class RateTable:
+    """USD per EUR for every calendar day between two bounds.
+
+    Dates outside the bounds use the first or last rate, like
+    CurrencyConverter(fallback_on_wrong_date=True).
+    """
+
+    def __init__(self, first_ordinal: int, rates: np.ndarray):
+        self.first_ordinal = first_ordinal
+        self.rates = rates
+
+    @classmethod
+    def load(cls, path) -> "RateTable":
+        with open(path, 'rb') as f:
+            magic, first_ordinal, count = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a compiled rate table")
+        rates = np.memmap(path, dtype='<f8', mode='r', offset=_HEADER.size, shape=(count,))
+        return cls(first_ordinal, rates)
+
+    def save(self, path) -> None:
+        """Writes the table atomically, so concurrent runs never see a partial file"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, self.first_ordinal, len(self.rates)))
+            f.write(np.asarray(self.rates, dtype='<f8').tobytes())
+        os.replace(tmp, path)
+
+    @staticmethod
+    def day_ordinals(dates) -> np.ndarray:
+        values = pd.Series(dates)
+        if not pd.api.types.is_datetime64_dtype(values.dtype):
+            # datetime.date objects and strings
+            values = pd.to_datetime(values.astype(object))
+        days = values.to_numpy(dtype='datetime64[D]')
+        return days.astype(np.int64) + _EPOCH_ORDINAL
+
+    def lookup(self, dates) -> np.ndarray:
+        index = np.clip(self.day_ordinals(dates) - self.first_ordinal, 0, len(self.rates) - 1)
+        return np.asarray(self.rates[index], dtype=float)
+
+
+def _ecb_source() -> Path:
+    """The ECB history bundled with currency_converter, located without importing it"""
+    package = importlib.util.find_spec('currency_converter')
+    return Path(package.submodule_search_locations[0]) / 'eurofxref-hist.zip'
+
+
+def compile_ecb_table(source: Path) -> RateTable:
+    """Resolves every day between the ECB bounds with the same fallbacks as before.
+
+    Weekends and holidays are linearly interpolated by CurrencyConverter.
+    """
+    from currency_converter import CurrencyConverter
+
+    converter = CurrencyConverter(str(source), fallback_on_missing_rate=True, fallback_on_wrong_date=True)
+    first, last = converter.bounds['USD']
+    ordinals = range(first.toordinal(), last.toordinal() + 1)
+    rates = np.array([converter.convert(1, 'EUR', 'USD', date=first.fromordinal(o)) for o in ordinals],
+                     dtype=float)
+    return RateTable(first.toordinal(), rates)
+
+
+def _cache_path(source: Path) -> Path:
+    stat = source.stat()
+    key = '|'.join([str(source.resolve()), str(stat.st_size), str(stat.st_mtime_ns),
+                    metadata.version('CurrencyConverter'), str(FORMAT_VERSION)])
+    return cache_dir() / f"ecb-usd-{hashlib.sha256(key.encode()).hexdigest()[:16]}.bin"
+
+
+@lru_cache(maxsize=None)
+def ecb_rate_table() -> RateTable:
+    """The daily ECB table, compiled on first use and memory-mapped afterwards"""
+    source = _ecb_source()
+    path = _cache_path(source)
+    if path.exists():
+        try:
+            return RateTable.load(path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable rate cache {path}: {e}")
+
+    table = compile_ecb_table(source)
+    try:
+        table.save(path)
+    except OSError as e:
+        logger.debug(f"Could not write rate cache {path}: {e}")
+    return table
+
+
+def _table_from_points(ordinals: np.ndarray, rates: np.ndarray, last_ordinal: int, path) -> RateTable:
+    """Expands published rates to every day, each rate holding until the next one"""
+    if len(ordinals) == 0:
+        raise ValueError(f"{path} contains no rates")
+    order = np.argsort(ordinals, kind='stable')
+    ordinals, rates = ordinals[order], rates[order]
+    if (np.diff(ordinals) == 0).any():
+        duplicate = ordinals[1:][np.diff(ordinals) == 0][0]
+        raise ValueError(f"{path} lists the rate for {date.fromordinal(int(duplicate))} twice")
+    if not (np.isfinite(rates) & (rates > 0)).all():
+        raise ValueError(f"{path} contains rates that are not positive numbers")
+
+    first = int(ordinals[0])
+    published = np.full(last_ordinal - first + 1, -1, dtype=np.int64)
+    published[ordinals - first] = np.arange(len(rates))
+    return RateTable(first, rates[np.maximum.accumulate(published)])
+
+
+def _read_rate_csv(path, key: str) -> pd.DataFrame:
+    df = pd.read_csv(path, dtype={key: str})
+    df.columns = df.columns.str.strip().str.lower()
+    missing = {key, 'usd_per_eur'} - set(df.columns)
+    if missing:
+        raise ValueError(f"{path} needs the columns '{key}' and 'usd_per_eur', missing: {sorted(missing)}")
+    df['usd_per_eur'] = pd.to_numeric(df['usd_per_eur'], errors='coerce')
+    return df
+
+
+def load_daily_csv(path) -> RateTable:
+    """Rates from a CSV with `date` (YYYY-MM-DD) and `usd_per_eur` columns.
+
+    Days without an entry use the most recent earlier rate.
+    """
+    df = _read_rate_csv(path, 'date')
+    try:
+        days = pd.to_datetime(df['date'], format='%Y-%m-%d').to_numpy(dtype='datetime64[D]')
+    except ValueError as e:
+        raise ValueError(f"{path}: {e}")
+    ordinals = days.astype(np.int64) + _EPOCH_ORDINAL
+    return _table_from_points(ordinals, df['usd_per_eur'].to_numpy(dtype=float), int(ordinals.max()), path)
+
+
+def load_monthly_csv(path) -> RateTable:
+    """Monthly average rates from a CSV with `month` (YYYY-MM) and `usd_per_eur` columns.
+
+    Every day of a month uses that month's rate.
+    """
+    df = _read_rate_csv(path, 'month')
+    try:
+        months = pd.to_datetime(df['month'], format='%Y-%m').to_numpy(dtype='datetime64[M]')
+    except ValueError as e:
+        raise ValueError(f"{path}: {e}")
+    ordinals = months.astype('datetime64[D]').astype(np.int64) + _EPOCH_ORDINAL
+    last_ordinal = (months.max() + 1).astype('datetime64[D]').astype(np.int64) + _EPOCH_ORDINAL - 1
+    return _table_from_points(ordinals, df['usd_per_eur'].to_numpy(dtype=float), int(last_ordinal), path)
+
+
+class FxProvider:
+    """A USD to EUR conversion policy, chosen per run.
+
+    `ecb` uses the bundled daily ECB reference rates, `bmf-monthly` a CSV of
+    monthly averages and `csv` a CSV of daily rates. The rate table is loaded
+    on first use and left out when pickling, so worker processes load their own.
+    """
+
+    def __init__(self, policy: str = 'ecb', path=None):
+        if policy not in FX_POLICIES:
+            raise ValueError(f"Unknown FX policy '{policy}', expected one of {', '.join(FX_POLICIES)}")
+        if policy == 'ecb' and path is not None:
+            raise ValueError("The ecb policy uses the bundled ECB rates and takes no rate file")
+        if policy != 'ecb' and path is None:
+            raise ValueError(f"The {policy} policy needs a rate file")
+        self.policy = policy
+        self.path = Path(path) if path is not None else None
+        self._table = None
+
+    @property
+    def table(self) -> RateTable:
+        if self._table is None:
+            if self.policy == 'ecb':
+                self._table = ecb_rate_table()
+            elif self.policy == 'bmf-monthly':
+                self._table = load_monthly_csv(self.path)
+            else:
+                self._table = load_daily_csv(self.path)
+        return self._table
+
+    def usd_per_eur(self, dates) -> np.ndarray:
+        return self.table.lookup(dates)
+
+    def convert(self, amounts, dates) -> np.ndarray:
+        """USD to EUR for one row of amounts per date.
+
+        `amounts` may be a vector or a 2-D block (e.g. the Amount and Fees
+        columns), so several columns share one rate lookup.
+        """
+        amounts = np.asarray(amounts, dtype=float)
+        rates = self.usd_per_eur(dates)
+        return amounts / rates.reshape((-1,) + (1,) * (amounts.ndim - 1))
+
+    def fingerprint(self) -> str:
+        """Identifies the policy and the exact rates it uses, for cache keys"""
+        if self.policy == 'ecb':
+            return f"ecb:{_cache_path(_ecb_source()).stem}"
+        return f"{self.policy}:{file_digest(self.path)}"
+
+    def __getstate__(self):
+        return {**self.__dict__, '_table': None}
+
+    def __repr__(self):
+        return f"FxProvider({self.policy!r}" + (f", {str(self.path)!r})" if self.path else ")")
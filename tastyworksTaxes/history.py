@@ -1,6 +1,38 @@
+import glob
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
-from datetime import datetime
-from tastyworksTaxes.money import convert_usd_to_eur
+from datetime import datetime, timezone
+from pathlib import Path
+from tastyworksTaxes import cache
+from tastyworksTaxes.constants import CLOSING_SUBCODES
+from tastyworksTaxes.money import fx_provider as current_fx_provider
+from tastyworksTaxes.transaction import QUANTITY_SIGNS
+from tastyworksTaxes.validation import ValidationReport, check_history
+
+logger = logging.getLogger(__name__)
+
+# Columns identifying one export row; rows with equal values in several files are overlaps
+DEDUP_COLUMNS = ['Date', 'Order #', 'Symbol', 'Action', 'Quantity', 'Value']
+INTERNAL_DEDUP_COLUMNS = ['Date/Time', 'Symbol', 'Buy/Sell', 'Open/Close', 'Quantity', 'Amount']
+# Declared schema of a loaded History: these text columns are categoricals,
+# Quantity stays integer where the export allows and all money columns are float64
+CATEGORY_COLUMNS = ['Transaction Code', 'Transaction Subcode', 'Symbol', 'Buy/Sell', 'Open/Close',
+                    'Call/Put', 'Description']
+# Description is only read for these transaction codes; it is dropped for the others
+DESCRIBED_CODES = ['Money Movement', 'Receive Deliver']
+# Columns added by addDerivedColumns for the FIFO engine
+DERIVED_COLUMNS = ['Position Type', 'Signed Quantity', 'Is Closing', 'Instrument Key']
+# Timestamps of the TastyTrade export are converted to this zone, which decides the tax year
+TAX_TIMEZONE = 'Europe/Berlin'
+# Bump whenever parsing or normalization changes what fromFile returns
+CACHE_SCHEMA_VERSION = 4
+CACHED_HISTORIES = 32
 
 
 class History(pd.DataFrame):
@@ -9,30 +41,312 @@ class History(pd.DataFrame):
         super().__init__(*args, **kwargs)
 
     @classmethod
-    def fromFile(cls, path):
+    def fromFile(cls, path, fx_provider=None, use_cache: bool = False):
+        """Loads one export as a normalized, sorted and converted History.
+
+        Raises ValidationError listing every problem of the export at once.
+        With `use_cache` the result is stored in the cache directory, keyed by
+        the file contents, CACHE_SCHEMA_VERSION and the FX policy, and later
+        loads of the same bytes are a bulk read of that file.
+        """
+        fx_provider = fx_provider or current_fx_provider()
+        cache_path = cls._cachePath(path, fx_provider) if use_cache else None
+        if cache_path is not None and cache_path.exists():
+            try:
+                df = History(cache.load_frame(cache_path))
+                os.utime(cache_path)
+                df._selfTest()
+                return df
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable history cache {cache_path}: {e}")
+
         df_raw = pd.read_csv(path)
-        df = cls._load_supported_schema(df_raw)
+        report = ValidationReport(path)
+        df = cls._load_supported_schema(df_raw, report)
+        report.raiseIfInvalid()
 
-        df = History(df)
-        df.sort_values('Date/Time', inplace=True)
+        df = History(cls._sortNewestFirst(df).drop(columns='_file_row'))
         df.reset_index(drop=True, inplace=True)
-        df.addEuroConversion()
+        df.addEuroConversion(fx_provider)
+        df._applySchema()
+        df.addDerivedColumns()
         df._selfTest()
+
+        if cache_path is not None:
+            try:
+                cache.save_frame(df, cache_path)
+                cache.prune('history-*.npz', CACHED_HISTORIES)
+            except (OSError, TypeError) as e:
+                logger.debug(f"Could not write history cache {cache_path}: {e}")
         return df
 
+    @classmethod
+    def validate(cls, path) -> ValidationReport:
+        """Checks an export in one pass and returns every problem found, without raising"""
+        report = ValidationReport(path)
+        cls._load_supported_schema(pd.read_csv(path), report)
+        return report
+
     @staticmethod
-    def _load_supported_schema(df: pd.DataFrame) -> pd.DataFrame:
-        if History._is_new_format(df):
-            return History._transform(df)
-        if History._is_internal_format(df):
-            return History._normalize_internal(df)
+    def _cachePath(path, fx_provider) -> Path:
+        key = '|'.join([cache.file_digest(path), str(CACHE_SCHEMA_VERSION), pd.__version__,
+                        fx_provider.fingerprint()])
+        return cache.cache_dir() / f"history-{hashlib.sha256(key.encode()).hexdigest()[:32]}.npz"
+
+    @staticmethod
+    def clearCache() -> int:
+        """Deletes every cached History and returns how many there were"""
+        return cache.clear('history-*.npz')
+
+    @classmethod
+    def iterChunks(cls, path, chunksize: int = 50_000, presorted: bool = False, fx_provider=None):
+        """Yields the export as chronologically ordered History chunks.
+
+        Only `chunksize` rows are parsed at a time. With `presorted` the file
+        must already be in ascending time order and chunks are passed through.
+        Otherwise every chunk is sorted and spilled to a temporary run file,
+        and the runs are combined with a k-way merge. Rows with the same
+        timestamp are ordered exactly like fromFile. The whole file is
+        validated before the first chunk is yielded, except with `presorted`,
+        where each chunk is validated as it is read and kept in file order.
+        """
+        reader = pd.read_csv(path, chunksize=chunksize)
+        if presorted:
+            yield from cls._checkedChunks(reader, fx_provider, path)
+            return
+
+        with tempfile.TemporaryDirectory(prefix='tastyworks-runs-') as tmp:
+            runs = []
+            report = ValidationReport(path)
+            first_row = 0
+            for chunk in reader:
+                df = cls._sortNewestFirst(cls._load_supported_schema(chunk, report), first_row)
+                first_row += len(chunk)
+                df.addEuroConversion(fx_provider)
+                df._selfTest()
+                runs.append(cls._writeRun(df, Path(tmp) / f'run-{len(runs)}.pkl'))
+            report.raiseIfInvalid()
+            batch = max(1024, chunksize // max(len(runs), 1))
+            for df in cls._mergeRuns([cls._readRun(run, batch) for run in runs]):
+                df = History(df.drop(columns='_file_row'))
+                df._applySchema()
+                df.addDerivedColumns()
+                yield df
+
+    @classmethod
+    def fromFiles(cls, paths_or_glob, workers: int | None = None, fx_provider=None):
+        """Loads several exports, e.g. the 1000-row files of one account, as one History.
+
+        Accepts a glob pattern or a list of paths and patterns. Files are parsed
+        in a process pool. Rows that appear in more than one file, identified by
+        a hash of DEDUP_COLUMNS, are only kept once; repeated rows within one
+        file (separate fills of one order) are kept. The sorted files are then
+        combined with a k-way merge, ties ordered like fromFile within a
+        file and by file order between files: rows are numbered as if the
+        files were one newest first export with the last file on top.
+        """
+        paths = cls._expandPaths(paths_or_glob)
+        if not paths:
+            raise FileNotFoundError(f"No input files match {paths_or_glob}")
+
+        fx_provider = fx_provider or current_fx_provider()
+        if len(paths) == 1 or workers == 1:
+            frames = [cls._parseFile(path, fx_provider) for path in paths]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                frames = list(pool.map(cls._parseFile, paths, [fx_provider] * len(paths)))
+
+        counts = {}
+        readers = []
+        rows_below = sum(len(df) for df in frames)
+        for path, df in zip(paths, frames):
+            kept = cls._unseenRows(df.pop('_row_key'), counts)
+            logger.info(f"{path}: {len(df)} rows, {int((~kept).sum())} overlapping rows dropped")
+
+            rows_below -= len(df)
+            df['_file_row'] += rows_below
+            readers.append(cls._blocks(df[kept], 65536))
+
+        merged = list(cls._mergeRuns(readers))
+        df = History(pd.concat(merged) if merged else frames[0].iloc[0:0])
+        df = History(df.drop(columns='_file_row'))
+        df.reset_index(drop=True, inplace=True)
+        df._applySchema()
+        df.addDerivedColumns()
+        df._selfTest()
+        return df
+
+    @staticmethod
+    def _unseenRows(keys: pd.Series, counts: dict) -> np.ndarray:
+        """Mask of the rows of one file that no earlier file had, by their row keys.
+
+        A key repeated n times in a file is kept beyond the n-th occurrence only
+        if earlier files had it fewer times. `counts` holds the most occurrences
+        per key seen so far and is updated.
+        """
+        occurrence = keys.groupby(keys).cumcount()
+        kept = occurrence.to_numpy() >= keys.map(counts).fillna(0).to_numpy()
+        for key, count in keys.value_counts().items():
+            counts[key] = max(counts.get(key, 0), count)
+        return kept
+
+    @staticmethod
+    def _blocks(df: pd.DataFrame, size: int):
+        for start in range(0, len(df), size):
+            yield df.iloc[start:start + size]
 
-        raise ValueError(
-            "Unsupported CSV schema. Expected either new TastyTrade export columns "
-            "('Date', 'Type', 'Sub Type', 'Value', ...) or normalized internal columns "
-            "('Date/Time', 'Transaction Code', 'Transaction Subcode', 'Amount', ...). "
-            f"Found columns: {list(df.columns)}"
-        )
+    @staticmethod
+    def _expandPaths(paths_or_glob) -> list:
+        patterns = [paths_or_glob] if isinstance(paths_or_glob, (str, Path)) else list(paths_or_glob)
+        paths = []
+        for pattern in patterns:
+            if glob.has_magic(str(pattern)):
+                paths.extend(Path(p) for p in sorted(glob.glob(str(pattern))))
+            else:
+                paths.append(Path(pattern))
+        return paths
+
+    @classmethod
+    def _parseFile(cls, path, fx_provider) -> pd.DataFrame:
+        """Worker for fromFiles: normalized, sorted and converted, plus a row key hash and the file row"""
+        df_raw = pd.read_csv(path)
+        columns = DEDUP_COLUMNS if cls._is_new_format(df_raw) else INTERNAL_DEDUP_COLUMNS
+        report = ValidationReport(path)
+        df = History(cls._load_supported_schema(df_raw, report))
+        report.raiseIfInvalid()
+        df['_row_key'] = cls._rowKeys(df_raw, columns)
+        df = cls._sortNewestFirst(df)
+        df.addEuroConversion(fx_provider)
+        return df
+
+    @staticmethod
+    def _rowKeys(df: pd.DataFrame, columns: list) -> pd.Series:
+        """64-bit hash of the identifying columns, independent of how pandas typed them"""
+        def canonical(uniques: pd.Series) -> pd.Series:
+            def value(x):
+                if pd.isna(x):
+                    return ''
+                try:
+                    return repr(float(str(x).replace(',', '')))
+                except ValueError:
+                    return str(x).strip()
+            return uniques.map(value)
+
+        normalized = pd.DataFrame({
+            column: History._per_unique(df[column], canonical) if column in df else ''
+            for column in columns
+        }, index=df.index)
+        return pd.util.hash_pandas_object(normalized, index=False)
+
+    @classmethod
+    def _checkedChunks(cls, reader, fx_provider, path):
+        """Passes presorted chunks through; each is validated on its own as it is read"""
+        last = None
+        for chunk in reader:
+            report = ValidationReport(path)
+            df = History(cls._load_supported_schema(chunk, report))
+            report.raiseIfInvalid()
+            dates = pd.to_datetime(df['Date/Time'])
+            if not dates.is_monotonic_increasing or (last is not None and len(df) and dates.iloc[0] < last):
+                raise ValueError(
+                    "Input is not sorted by ascending Date/Time. "
+                    "Run without presorted to merge-sort it on disk.")
+            if len(df):
+                last = dates.iloc[-1]
+            df.addEuroConversion(fx_provider)
+            df._applySchema()
+            df.addDerivedColumns()
+            df._selfTest()
+            yield df
+
+    @staticmethod
+    def _writeRun(df: pd.DataFrame, path: Path) -> Path:
+        with open(path, 'wb') as f:
+            for start in range(0, len(df), 1024):
+                pickle.dump(df.iloc[start:start + 1024], f, protocol=pickle.HIGHEST_PROTOCOL)
+        return path
+
+    @staticmethod
+    def _readRun(path: Path, batch: int):
+        """Yields a spilled run back in frames of roughly `batch` rows."""
+        with open(path, 'rb') as f:
+            pending = []
+            size = 0
+            while True:
+                try:
+                    frame = pickle.load(f)
+                except EOFError:
+                    break
+                pending.append(frame)
+                size += len(frame)
+                if size >= batch:
+                    yield pd.concat(pending)
+                    pending, size = [], 0
+            if pending:
+                yield pd.concat(pending)
+
+    @staticmethod
+    def _sortNewestFirst(df: pd.DataFrame, first_row: int = 0) -> 'History':
+        """Sorts the rows of a newest first export by ascending Date/Time.
+
+        The position of each row in the file, counted from `first_row` for a
+        chunk, is kept in the _file_row column. Rows with the same timestamp
+        are taken in descending _file_row order, i.e. oldest first as well:
+        the Close leg of a symbol change or stock merger, listed below its
+        Open leg, comes first.
+        """
+        df = df.assign(_file_row=np.arange(first_row, first_row + len(df)))
+        return History(df.sort_values(['Date/Time', '_file_row'], ascending=[True, False], kind='stable'))
+
+    @staticmethod
+    def _mergeRuns(readers: list):
+        """Block-wise k-way merge of runs sorted by ascending Date/Time and descending _file_row.
+
+        `readers` yield the frames of each run in order. Each step emits every
+        buffered row that is not after the smallest buffered tail, so memory
+        stays at one frame per run.
+        """
+        buffers = [next(reader, None) for reader in readers]
+
+        def tail(frame):
+            # the last row of a run, as a key that sorts in merge order
+            return frame['Date/Time'].iloc[-1], -frame['_file_row'].iloc[-1]
+
+        while any(buffer is not None for buffer in buffers):
+            active = [i for i, buffer in enumerate(buffers) if buffer is not None]
+            bound_time, bound_key = min(tail(buffers[i]) for i in active)
+            parts = []
+            for i in active:
+                buffer = buffers[i]
+                times = buffer['Date/Time']
+                take = (times < bound_time) | ((times == bound_time) & (buffer['_file_row'] >= -bound_key))
+                parts.append(buffer[take])
+                rest = buffer[~take]
+                buffers[i] = rest if len(rest) else next(readers[i], None)
+            merged = pd.concat(parts).sort_values(['Date/Time', '_file_row'], ascending=[True, False], kind='stable')
+            yield History(merged)
+
+    @staticmethod
+    def _load_supported_schema(df: pd.DataFrame, report=None) -> pd.DataFrame:
+        """Parses either supported export format into the internal schema.
+
+        With a ValidationReport, all parse problems and rule violations of the
+        export are recorded there; the caller decides when to raise.
+        """
+        if History._is_new_format(df):
+            internal_df = History._transform(df, report)
+        elif History._is_internal_format(df):
+            internal_df = History._normalize_internal(df, report)
+        else:
+            raise ValueError(
+                "Unsupported CSV schema. Expected either new TastyTrade export columns "
+                "('Date', 'Type', 'Sub Type', 'Value', ...) or normalized internal columns "
+                "('Date/Time', 'Transaction Code', 'Transaction Subcode', 'Amount', ...). "
+                f"Found columns: {list(df.columns)}"
+            )
+        if report is not None:
+            check_history(internal_df, report)
+        return internal_df
 
     @staticmethod
     def _is_new_format(df: pd.DataFrame) -> bool:
@@ -49,163 +363,367 @@ class History(pd.DataFrame):
         return required.issubset(df.columns)
 
     @staticmethod
-    def _numeric_column(series: pd.Series, column_name: str) -> pd.Series:
+    def _numeric_column(series: pd.Series, column_name: str, report=None) -> pd.Series:
         raw = series.copy()
         text = raw.astype(str).str.strip()
         blank = raw.isna() | text.isin(['', '--', 'nan'])
         cleaned = text.str.replace(',', '', regex=False)
         parsed = pd.to_numeric(cleaned.where(~blank, '0'), errors='coerce')
 
-        invalid = parsed.isna() & ~blank
-        if invalid.any():
-            bad_values = raw.loc[invalid].tolist()
-            raise ValueError(
-                f"Failed to parse numeric values in normalized CSV column "
-                f"'{column_name}': {bad_values}"
-            )
-
+        History._rejectColumn(
+            parsed.isna() & ~blank, raw, column_name,
+            f"Failed to parse numeric values in normalized CSV column '{column_name}'", report)
         return parsed
 
     @staticmethod
-    def _normalize_internal(df: pd.DataFrame) -> pd.DataFrame:
+    def _rejectColumn(invalid: pd.Series, values: pd.Series, column: str, reason: str, report=None) -> None:
+        """Raises listing all invalid values of a column, or records each in `report`"""
+        if not invalid.any():
+            return
+        if report is None:
+            raise ValueError(f"{reason}: {values.loc[invalid].tolist()}")
+        labels = invalid.index[invalid.to_numpy()]
+        report.add(labels, column, values.loc[labels], reason)
+
+    @staticmethod
+    def _normalize_internal(df: pd.DataFrame, report=None) -> pd.DataFrame:
         internal_df = df.copy()
 
         internal_df['Date/Time'] = pd.to_datetime(internal_df['Date/Time'], errors='coerce')
-        if internal_df['Date/Time'].isna().any():
-            bad_values = df.loc[internal_df['Date/Time'].isna(), 'Date/Time'].tolist()
-            raise ValueError(f"Failed to parse Date/Time values in normalized CSV: {bad_values}")
+        History._rejectColumn(internal_df['Date/Time'].isna(), df['Date/Time'], 'Date/Time',
+                              "Failed to parse Date/Time values in normalized CSV", report)
 
         raw_expiration = internal_df['Expiration Date'].copy()
         internal_df['Expiration Date'] = pd.to_datetime(raw_expiration, errors='coerce')
 
         has_option_type = internal_df['Call/Put'].astype(str).str.strip().isin(['C', 'P'])
-        invalid_option_expiry = has_option_type & internal_df['Expiration Date'].isna()
-        if invalid_option_expiry.any():
-            bad_values = raw_expiration.loc[invalid_option_expiry].tolist()
-            raise ValueError(
-                "Failed to parse Expiration Date values for option rows in "
-                f"normalized CSV: {bad_values}"
-            )
+        History._rejectColumn(has_option_type & internal_df['Expiration Date'].isna(), raw_expiration,
+                              'Expiration Date',
+                              "Failed to parse Expiration Date values for option rows in normalized CSV", report)
 
         for column in ['Amount', 'Fees', 'Quantity', 'Strike', 'Price']:
-            internal_df[column] = History._numeric_column(internal_df[column], column)
+            internal_df[column] = History._numeric_column(internal_df[column], column, report)
 
         return internal_df
 
     @staticmethod
-    def _transform(df: pd.DataFrame) -> pd.DataFrame:
-        internal_df = pd.DataFrame()
+    def _per_unique(series: pd.Series, transform) -> pd.Series:
+        """Runs a column transform over the distinct values only and broadcasts it back.
 
-        def parse_date(date_str):
-            if pd.isna(date_str):
-                return pd.NaT
-            try:
-                dt = datetime.strptime(date_str, '%Y-%m-%dT%H:%M:%S%z')
-                return dt.replace(tzinfo=None)
-            except (ValueError, TypeError) as e:
-                raise ValueError(f"Failed to parse date '{date_str}': {e}")
+        Export columns are highly repetitive, so this keeps the string work
+        proportional to the number of distinct values instead of rows.
+        """
+        codes, uniques = pd.factorize(series, use_na_sentinel=False)
+        result = transform(pd.Series(uniques, dtype=object))
+        return pd.Series(np.asarray(result)[codes], index=series.index)
 
-        internal_df['Date/Time'] = df['Date'].apply(parse_date)
-        internal_df['Transaction Code'] = df['Type']
-        internal_df['Transaction Subcode'] = df['Sub Type']
-        internal_df['Symbol'] = df['Symbol'].apply(
-            lambda x: str(x).split()[0] if pd.notna(x) and x != '' else '')
-
-        def extract_buy_sell(row):
-            sub_type = str(row.get('Sub Type', ''))
-            action = str(row.get('Action', ''))
-            if 'Buy' in sub_type:
-                return 'Buy'
-            elif 'Sell' in sub_type:
-                return 'Sell'
-            elif 'BUY' in action:
-                return 'Buy'
-            elif 'SELL' in action:
-                return 'Sell'
-            return ''
-
-        internal_df['Buy/Sell'] = df.apply(extract_buy_sell, axis=1)
-        internal_df['Open/Close'] = df['Action'].apply(
-            lambda x: str(x).split('_TO_')[-1].capitalize() if pd.notna(x) and '_TO_' in str(x) else '')
-        internal_df['Quantity'] = df['Quantity'] if 'Quantity' in df else 0
-        internal_df['Expiration Date'] = pd.to_datetime(
-            df['Expiration Date'], format='%m/%d/%y', errors='coerce')
+    @staticmethod
+    def _text(uniques: pd.Series) -> pd.Series:
+        return uniques.where(uniques.notna(), '').astype(str).astype(object)
 
-        def parse_strike(strike):
-            if pd.isna(strike) or strike == '':
-                return 0.0
+    @staticmethod
+    def _parse_floats(values: pd.Series, blank_values: tuple, strip_commas: bool) -> pd.DataFrame:
+        blank = values.isna() | values.isin(blank_values)
+        text = values.where(~blank, '0').astype(str)
+        if strip_commas:
+            text = text.str.replace(',', '', regex=False)
+        parsed = np.empty(len(text), dtype=float)
+        invalid = np.zeros(len(text), dtype=bool)
+        for i, value in enumerate(text):
             try:
-                return float(strike)
-            except (ValueError, TypeError) as e:
-                raise ValueError(f"Failed to parse strike '{strike}': {e}")
+                parsed[i] = float(value)
+            except (ValueError, TypeError):
+                invalid[i] = True
+        parsed[blank.to_numpy() | invalid] = 0.0
+        return pd.DataFrame({'value': parsed, 'invalid': invalid})
+
+    @staticmethod
+    def _float_column(series: pd.Series, blank_values: tuple = (), strip_commas: bool = True) -> tuple[pd.Series, pd.Series]:
+        """Column-wise equivalent of float(str(x).replace(',', '')).
+
+        Missing values and `blank_values` become 0.0. Returns the parsed values
+        and a mask of the entries float() rejects, so callers can report them
+        the same way the scalar parsers did.
+        """
+        codes, uniques = pd.factorize(series, use_na_sentinel=False)
+        parsed = History._parse_floats(pd.Series(uniques, dtype=object), blank_values, strip_commas)
+        return (pd.Series(parsed['value'].to_numpy()[codes], index=series.index),
+                pd.Series(parsed['invalid'].to_numpy()[codes], index=series.index))
 
-        internal_df['Strike'] = df['Strike Price'].apply(parse_strike) if 'Strike Price' in df else 0.0
+    @staticmethod
+    def _first_invalid(invalid: pd.Series):
+        return invalid.index[invalid.to_numpy().argmax()]
 
-        def format_call_put(cp):
-            if pd.notna(cp) and cp not in ('', '--'):
-                return str(cp)[0]
-            return ''
+    @staticmethod
+    def _reject(invalid: pd.Series, values: pd.Series, column: str, message, report=None) -> None:
+        """Raises for the first invalid row, or records every invalid row in `report`.
 
-        internal_df['Call/Put'] = df['Call or Put'].apply(format_call_put) if 'Call or Put' in df else ''
+        `message(label)` words the error of one row like the scalar parsers did.
+        """
+        if not invalid.any():
+            return
+        if report is None:
+            raise ValueError(message(History._first_invalid(invalid)))
+        labels = invalid.index[invalid.to_numpy()]
+        report.add(labels, column, values.loc[labels], [message(label) for label in labels])
 
-        def parse_price(row):
-            price = row.get('Average Price', None)
-            if pd.isna(price) or price == '--' or price == 0 or price == '':
-                return 0.0
+    @staticmethod
+    def _parse_dates(series: pd.Series, report=None) -> pd.Series:
+        """Parses '%Y-%m-%dT%H:%M:%S%z' timestamps into naive TAX_TIMEZONE wall time.
+
+        Each timestamp's own offset is applied before converting, so an export
+        in UTC and one in local time give the same times, also around New Year.
+        """
+        def parse(uniques: pd.Series) -> pd.Series:
+            missing = uniques.isna()
+            text = np.array(History._text(uniques).tolist(), dtype=str)
+            wall = pd.to_datetime(pd.Series(text.astype('U19'), dtype=object),
+                                  format='%Y-%m-%dT%H:%M:%S', errors='coerce')
+            minutes, valid_offset = History._utc_offsets(text)
+            utc = wall - pd.to_timedelta(minutes, unit='min')
+            fallback = ~missing & (wall.isna() | ~valid_offset)
+            for i in np.flatnonzero(fallback.to_numpy()):
+                try:
+                    dt = datetime.strptime(uniques.iat[i], '%Y-%m-%dT%H:%M:%S%z')
+                except (ValueError, TypeError):
+                    utc.iat[i] = pd.NaT
+                    continue
+                utc.iat[i] = dt.astimezone(timezone.utc).replace(tzinfo=None)
+            local = utc.dt.tz_localize('UTC').dt.tz_convert(TAX_TIMEZONE).dt.tz_localize(None)
+            return local.where(~missing).astype('datetime64[us]')
+
+        def message(label):
+            date_str = series.at[label]
             try:
-                price_float = float(str(price).replace(',', ''))
-                symbol = row.get('Symbol', '')
-                is_option = len(str(symbol).split()) > 1
-                if is_option:
-                    return price_float / 100
-                else:
-                    return price_float
+                datetime.strptime(date_str, '%Y-%m-%dT%H:%M:%S%z')
             except (ValueError, TypeError) as e:
-                raise ValueError(f"Failed to parse price '{price}' for symbol '{row.get('Symbol', '')}': {e}")
+                return f"Failed to parse date '{date_str}': {e}"
+
+        parsed = History._per_unique(series, parse).astype('datetime64[us]')
+        History._reject(parsed.isna() & series.notna(), series, 'Date', message, report)
+        return parsed
+
+    @staticmethod
+    def _utc_offsets(text: np.ndarray) -> tuple:
+        """Offsets in minutes of the 'Z', '+HHMM' or '+HH:MM' suffix after 19 characters.
+
+        Reads the characters as a code point matrix, so no per-string Python
+        work is done. Returns the offsets and a mask of well-formed suffixes.
+        """
+        width = max(text.dtype.itemsize // 4, 26)
+        chars = text.astype(f'U{width}').view(np.uint32).reshape(len(text), width)
+        suffix = chars[:, 19:26].astype(np.int64)
+        digits = suffix - ord('0')
+        is_digit = (digits >= 0) & (digits <= 9)
+
+        def ends_at(column):
+            return ~chars[:, 19 + column:].any(axis=1)
+
+        zulu = (suffix[:, 0] == ord('Z')) & ends_at(1)
+        signed = np.isin(suffix[:, 0], [ord('+'), ord('-')]) & is_digit[:, 1] & is_digit[:, 2]
+        compact = signed & is_digit[:, 3] & is_digit[:, 4] & ends_at(5)
+        colon = signed & (suffix[:, 3] == ord(':')) & is_digit[:, 4] & is_digit[:, 5] & ends_at(6)
+
+        minutes = np.where(compact, digits[:, 3] * 10 + digits[:, 4], digits[:, 4] * 10 + digits[:, 5])
+        offsets = (digits[:, 1] * 10 + digits[:, 2]) * 60 + minutes
+        offsets = np.where(suffix[:, 0] == ord('-'), -offsets, offsets)
+        valid = zulu | compact | colon
+        return np.where(valid & ~zulu, offsets, 0), valid
+
+    @staticmethod
+    def _parse_expirations(series: pd.Series) -> pd.Series:
+        """Parses '%m/%d/%y' expiration dates; anything else becomes NaT"""
+        return History._per_unique(
+            series, lambda uniques: pd.to_datetime(uniques, format='%m/%d/%y', errors='coerce')
+        ).astype('datetime64[us]')
+
+    @staticmethod
+    def _text_column(df: pd.DataFrame, column: str, transform) -> pd.Series:
+        if column not in df:
+            return pd.Series(np.asarray(transform(pd.Series([''], dtype=object)))[0], index=df.index)
+        return History._per_unique(df[column], lambda uniques: transform(History._text(uniques)))
+
+    @staticmethod
+    def _transform(df: pd.DataFrame, report=None) -> pd.DataFrame:
+        """Maps the TastyTrade export columns onto the internal schema.
+
+        All columns are derived with column-level operations over the distinct
+        values of each input column. The decisions and error messages are the
+        same as those of the former per-row parsers. With a ValidationReport,
+        every unparseable value is recorded and left as NaN instead of raising.
+        """
+        internal_df = pd.DataFrame(index=df.index)
+
+        internal_df['Date/Time'] = History._parse_dates(df['Date'], report)
+        internal_df['Transaction Code'] = df['Type']
+        internal_df['Transaction Subcode'] = df['Sub Type']
+        internal_df['Symbol'] = History._text_column(
+            df, 'Symbol', lambda text: text.str.split().str[0].fillna('')).astype(str)
+
+        def side(buy: str, sell: str):
+            return lambda text: np.select(
+                [text.str.contains(buy, regex=False), text.str.contains(sell, regex=False)],
+                ['Buy', 'Sell'], default='')
+
+        sub_type_side = History._text_column(df, 'Sub Type', side('Buy', 'Sell'))
+        action_side = History._text_column(df, 'Action', side('BUY', 'SELL'))
+        internal_df['Buy/Sell'] = sub_type_side.where(sub_type_side != '', action_side).astype(str)
+        internal_df['Open/Close'] = History._text_column(
+            df, 'Action', lambda text: text.str.rsplit('_TO_', n=1).str[-1].str.capitalize().where(
+                text.str.contains('_TO_', regex=False), '')).astype(str)
+        internal_df['Quantity'] = df['Quantity'] if 'Quantity' in df else 0
+        internal_df['Expiration Date'] = History._parse_expirations(df['Expiration Date'])
+
+        if 'Strike Price' in df:
+            def strike_message(label):
+                value = df['Strike Price'].at[label]
+                try:
+                    float(value)
+                except (ValueError, TypeError) as e:
+                    return f"Failed to parse strike '{value}': {e}"
+
+            strike, invalid = History._float_column(df['Strike Price'], ('',), strip_commas=False)
+            History._reject(invalid, df['Strike Price'], 'Strike Price', strike_message, report)
+            internal_df['Strike'] = strike
+        else:
+            internal_df['Strike'] = 0.0
+
+        if 'Call or Put' in df:
+            internal_df['Call/Put'] = History._text_column(
+                df, 'Call or Put', lambda text: text.str[0].where(~text.isin(['', '--']), '')).astype(str)
+        else:
+            internal_df['Call/Put'] = ''
 
         if 'Average Price' in df.columns:
-            internal_df['Price'] = df.apply(parse_price, axis=1)
+            def price_message(label):
+                value = df['Average Price'].at[label]
+                try:
+                    float(str(value).replace(',', ''))
+                except (ValueError, TypeError) as e:
+                    return f"Failed to parse price '{value}' for symbol '{df['Symbol'].at[label]}': {e}"
+
+            price, invalid = History._float_column(df['Average Price'], ('--', '', 0))
+            History._reject(invalid, df['Average Price'], 'Average Price', price_message, report)
+            is_option = History._text_column(
+                df, 'Symbol', lambda text: text.str.split().str.len() > 1).astype(bool)
+            internal_df['Price'] = price.where(~is_option, price / 100)
         else:
             internal_df['Price'] = 0.0
 
-        def calc_fees(row):
-            commissions = row.get('Commissions', 0)
-            fees = row.get('Fees', 0)
-            try:
-                comm_val = abs(float(str(commissions).replace(',', ''))) if commissions != '--' and pd.notna(commissions) else 0
-                fees_val = abs(float(str(fees).replace(',', ''))) if fees != '--' and pd.notna(fees) else 0
-                return comm_val + fees_val
-            except (ValueError, TypeError) as e:
-                raise ValueError(f"Failed to parse fees - commissions: '{commissions}', fees: '{fees}': {e}")
-
         if 'Commissions' in df.columns:
-            internal_df['Fees'] = df.apply(calc_fees, axis=1)
+            raw_commissions = df['Commissions']
+            raw_fees = df['Fees'] if 'Fees' in df.columns else pd.Series(0, index=df.index)
+            def fees_message(label):
+                comm_value, fees_value = raw_commissions.at[label], raw_fees.at[label]
+                try:
+                    for value in (comm_value, fees_value):
+                        if value != '--' and pd.notna(value):
+                            float(str(value).replace(',', ''))
+                except (ValueError, TypeError) as e:
+                    return f"Failed to parse fees - commissions: '{comm_value}', fees: '{fees_value}': {e}"
+
+            commissions, invalid_commissions = History._float_column(raw_commissions, ('--',))
+            fees, invalid_fees = History._float_column(raw_fees, ('--',))
+            if report is None:
+                History._reject(invalid_commissions | invalid_fees, raw_commissions, 'Commissions', fees_message)
+            History._reject(invalid_commissions, raw_commissions, 'Commissions', fees_message, report)
+            History._reject(invalid_fees & ~invalid_commissions, raw_fees, 'Fees', fees_message, report)
+            internal_df['Fees'] = commissions.abs() + fees.abs()
         else:
-            internal_df['Fees'] = df['Fees'].apply(
-                lambda x: abs(float(str(x).replace(',', ''))) if pd.notna(x) and x != '--' and x != 0 else 0.0)
-
-        def parse_amount(amount):
-            if pd.isna(amount):
-                return 0.0
+            def bare_fees_message(label):
+                try:
+                    float(str(df['Fees'].at[label]).replace(',', ''))
+                except (ValueError, TypeError) as e:
+                    return str(e)
+
+            fees, invalid = History._float_column(df['Fees'], ('--', 0))
+            History._reject(invalid, df['Fees'], 'Fees', bare_fees_message, report)
+            internal_df['Fees'] = fees.abs()
+
+        def amount_message(label):
+            value = df['Value'].at[label]
             try:
-                return float(str(amount).replace(',', ''))
+                float(str(value).replace(',', ''))
             except (ValueError, TypeError) as e:
-                raise ValueError(f"Failed to parse amount '{amount}': {e}")
+                return f"Failed to parse amount '{value}': {e}"
 
-        internal_df['Amount'] = df['Value'].apply(parse_amount)
+        amount, invalid = History._float_column(df['Value'])
+        History._reject(invalid, df['Value'], 'Value', amount_message, report)
+        internal_df['Amount'] = amount
         internal_df['Description'] = df['Description']
 
         return internal_df
 
-    def addEuroConversion(self):
+    def addEuroConversion(self, fx_provider=None):
         """ adds a new column called "AmountEuro" and "FeesEuro" to the dataframe
+
+        The exchange rate is resolved once per calendar day and applied to the
+        Amount and Fees columns as vectors. `fx_provider` defaults to the policy
+        of the current run. Calling it again with another provider recomputes
+        both columns from the USD values, without re-reading the export.
         """
+        fx_provider = fx_provider or current_fx_provider()
         self['Date/Time'] = pd.to_datetime(self['Date/Time'])
         self['Expiration Date'] = pd.to_datetime(self['Expiration Date'])
-        self['AmountEuro'] = self.apply(lambda x: convert_usd_to_eur(
-            x['Amount'], x['Date/Time']), axis=1)
-        self['FeesEuro'] = self.apply(lambda x: convert_usd_to_eur(
-            x['Fees'], x['Date/Time']), axis=1)
+        euro = fx_provider.convert(self[['Amount', 'Fees']].astype(float), self['Date/Time'])
+        self['AmountEuro'] = euro[:, 0]
+        self['FeesEuro'] = euro[:, 1]
+
+    def _applySchema(self):
+        """Narrows the columns to the declared schema in place.
+
+        Text columns become categoricals, so each distinct code, side or
+        symbol is stored once. Description is only kept where it is parsed
+        later: money movements are classified by it and corporate actions
+        carry their split ratio in it. Trade descriptions repeat the other
+        columns and make up most of the text, so they are dropped.
+        """
+        self['Description'] = self['Description'].where(self['Transaction Code'].isin(DESCRIBED_CODES))
+        for column in CATEGORY_COLUMNS:
+            self[column] = self[column].astype('category')
+
+    def addDerivedColumns(self):
+        """Adds what the FIFO engine needs to know about each position row as columns.
+
+        Position Type is stock, call or put, Signed Quantity the quantity with the
+        sign of its side and Is Closing whether the row closes lots. Instrument Key
+        is a hash of symbol, type, strike, expiry and call/put, so it is the same
+        for one instrument in every chunk and file. Rows that open or close no
+        position, or cannot be classified, get NaN and key 0; the processing code
+        then derives the values itself and raises its usual errors.
+        """
+        code = self['Transaction Code']
+        subcode = self['Transaction Subcode'].astype(object)
+        is_position = code.isin(['Trade', 'Receive Deliver']).to_numpy()
+
+        symbol = self['Symbol'].astype(object)
+        call_put = self['Call/Put'].astype(object)
+        strike = self['Strike']
+        has_symbol = (symbol.notna() & ~symbol.isin(['', 'nan'])).to_numpy()
+        is_stock = (strike.isna() | (strike == 0.0)).to_numpy()
+        position_type = pd.Series(np.select(
+            [~is_position | ~has_symbol, is_stock, call_put == 'C', call_put == 'P'],
+            [None, 'stock', 'call', 'put'], default=None), index=self.index)
+
+        sign = subcode.map(QUANTITY_SIGNS)
+        corporate_action = subcode.isin(['Reverse Split', 'Symbol Change', 'Stock Merger'])
+        sign = sign.where(~corporate_action, np.where(self['Buy/Sell'] == 'Buy', 1, -1))
+        signed_quantity = np.trunc(sign.astype(float) * self['Quantity']).where(is_position)
+
+        is_option = position_type.isin(['call', 'put'])
+        instrument = pd.DataFrame({
+            'symbol': symbol,
+            'type': position_type,
+            'strike': strike.where(is_option),
+            'expiry': self['Expiration Date'].where(is_option).astype('datetime64[s]'),
+            'call_put': call_put.where(is_option),
+        })
+        key = pd.util.hash_pandas_object(instrument, index=False).to_numpy()
+
+        self['Position Type'] = position_type.astype(pd.CategoricalDtype(['stock', 'call', 'put']))
+        self['Signed Quantity'] = signed_quantity
+        self['Is Closing'] = (subcode.isin(CLOSING_SUBCODES) | (self['Open/Close'] == 'Close')).to_numpy()
+        self['Instrument Key'] = np.where(position_type.notna(), key, np.uint64(0))
 
     def _selfTest(self):
         if "Date/Time" not in self.columns:
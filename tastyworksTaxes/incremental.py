@@ -0,0 +1,203 @@
+"""Recomputing after a correction of the history, limited to what it can reach.
+
+Lots only move between the symbols of one chain, a connected component of
+partition.symbol_components, and the values of a year only depend on its
+money movements and the trades closed in it. IncrementalRun keeps the FIFO
+result of every chain. After a corrected history or corporate actions file,
+it replays the chains whose rows or split ratios changed and books again
+only the years whose money movements or closed trades differ.
+"""
+import copy
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from tastyworksTaxes.checkpoint import row_hashes
+from tastyworksTaxes.constants import Fields, TransactionCode
+from tastyworksTaxes.instruments import InstrumentTable
+from tastyworksTaxes.partition import _run_partition, _symbols, register_positions, symbol_components
+from tastyworksTaxes.position_manager import PositionManager
+from tastyworksTaxes.tasty import Tasty
+from tastyworksTaxes.trade_store import TradeStore
+from tastyworksTaxes.values import Values
+
+
+@dataclass(frozen=True)
+class TradeDependency:
+    """What one closed trade was derived from: the rows of its chain up to its closing year"""
+
+    chain: frozenset
+    opening_year: int
+    closing_year: int
+
+
+@dataclass
+class Chain:
+    """FIFO result of one chain; per trade its closing time, row identity and dependency"""
+
+    trades: list
+    dates: np.ndarray
+    identities: np.ndarray
+    dependencies: list
+    open_lots: dict
+    pending: object = None
+
+    def tradesByYear(self) -> dict:
+        by_year = {}
+        for trade, dependency in zip(self.trades, self.dependencies):
+            by_year.setdefault(dependency.closing_year, []).append(trade)
+        return by_year
+
+
+class IncrementalRun:
+    """Per-year values of a history that can be corrected and recomputed in part.
+
+    run() computes everything; correct() takes the corrected history and
+    returns the years whose values were booked again. Both leave the closed
+    trades, their dependencies and the open lots in the same state a full
+    recompute would. `fixed_point` is passed on to Tasty.
+    """
+
+    def __init__(self, history, fx_provider=None, fixed_point=False):
+        self.history = Tasty._chronological(history)
+        self.tasty = Tasty(fx_provider=fx_provider, fixed_point=fixed_point)
+        self.instruments = InstrumentTable()
+        self.corporate_actions = None
+        self.chains = {}
+        self.money = {}
+        self.yearValues = {}
+        self.closed_trades = []
+        self.dependencies = []
+        self.open_lots = {}
+        self.pending_lot = None
+        self._identities = None
+
+    def run(self) -> dict:
+        self._update(self.history, None, None)
+        return self.yearValues
+
+    def correct(self, history=None) -> set:
+        """Recomputes after a change of rows or of corporate_actions.csv.
+
+        Rows are compared by content, so corrected, added and removed rows
+        are all found. Returns the years that were booked again.
+        """
+        history = self.history if history is None else Tasty._chronological(history)
+        if self._identities is None:
+            return self._update(history, None, None)
+        identities = self._rowIdentities(history)
+        changed = ~np.isin(identities, self._identities)
+        removed = ~np.isin(self._identities, identities)
+        changed_rows = pd.concat([history[changed], self.history[removed]])
+
+        codes = changed_rows[Fields.TRANSACTION_CODE.value]
+        is_position = codes.isin([TransactionCode.TRADE.value, TransactionCode.RECEIVE_DELIVER.value]).to_numpy()
+        symbols = set(_symbols(changed_rows[is_position]))
+        symbols |= self._changedSplitSymbols(PositionManager._load_corporate_actions_config())
+        money_years = set(changed_rows[(codes == TransactionCode.MONEY_MOVEMENT.value).to_numpy()]
+                          [Fields.DATE_TIME.value].dt.year)
+        return self._update(history, symbols, money_years)
+
+    def _changedSplitSymbols(self, corporate_actions: dict) -> set:
+        def entries(config):
+            return {tuple(sorted(split.items())) for split in config.get("reverse_splits", [])}
+        changed = entries(corporate_actions) ^ entries(self.corporate_actions)
+        return {dict(entry)["symbol"] for entry in changed}
+
+    @staticmethod
+    def _rowIdentities(history) -> np.ndarray:
+        """Hash of each row's content and its occurrence among identical rows"""
+        hashes = pd.Series(row_hashes(history))
+        occurrence = hashes.groupby(hashes).cumcount()
+        return pd.util.hash_pandas_object(pd.DataFrame({'row': hashes, 'occurrence': occurrence}),
+                                          index=False).to_numpy()
+
+    def _update(self, history, affected_symbols: set | None, money_years: set | None) -> set:
+        """Replays the chains touching `affected_symbols` and books the years that changed; None is all"""
+        self.corporate_actions = PositionManager._load_corporate_actions_config()
+        identities = self._rowIdentities(history)
+
+        is_position = history[Fields.TRANSACTION_CODE.value].isin([
+            TransactionCode.TRADE.value, TransactionCode.RECEIVE_DELIVER.value]).to_numpy()
+        positions = history[is_position]
+        position_rows = np.flatnonzero(is_position)
+        instrument_ids = register_positions(self.instruments, positions)
+        components = symbol_components(positions)
+        symbols = _symbols(positions)
+        row_components = symbols.map(components).to_numpy()
+        members = {}
+        for symbol, component in components.items():
+            members.setdefault(component, set()).add(symbol)
+
+        chains = {}
+        replayed = set()
+        for component, chain_symbols in members.items():
+            key = frozenset(chain_symbols)
+            if affected_symbols is not None and key in self.chains and not key & affected_symbols:
+                chains[key] = self.chains[key]
+                continue
+            mask = row_components == component
+            trades, open_lots, pending = _run_partition(
+                positions[mask], instrument_ids[mask], position_rows[mask], self.instruments, [], None,
+                self.tasty.fixed_point)
+            dates = np.array([date for date, _, _ in trades], dtype='datetime64[ns]')
+            chains[key] = Chain(
+                [trade for _, _, trade in trades], dates,
+                identities[[row for _, row, _ in trades]],
+                [TradeDependency(key, trade.opening_date.year, trade.tax_year)
+                 for date, _, trade in trades],
+                open_lots, pending)
+            replayed.add(key)
+
+        years = set()
+        if affected_symbols is None:
+            years.update(year for chain in chains.values() for year in chain.tradesByYear())
+        for key in replayed | (set(self.chains) - set(chains)):
+            old = self.chains[key].tradesByYear() if key in self.chains else {}
+            new = chains[key].tradesByYear() if key in chains else {}
+            years.update(year for year in set(old) | set(new) if old.get(year) != new.get(year))
+
+        ordered = list(chains.values())
+        trades = [trade for chain in ordered for trade in chain.trades]
+        dependencies = [dependency for chain in ordered for dependency in chain.dependencies]
+        dates = np.concatenate([chain.dates for chain in ordered] or [np.array([], dtype='datetime64[ns]')])
+        rows = pd.Index(identities).get_indexer(np.concatenate([chain.identities for chain in ordered] or [[]]))
+        order = np.lexsort((rows, dates))
+        self.chains = chains
+        self.history = history
+        self._identities = identities
+        self.closed_trades = [trades[i] for i in order]
+        self.dependencies = [dependencies[i] for i in order]
+        self.open_lots = dict(sorted((instrument, lots) for chain in ordered
+                                     for instrument, lots in chain.open_lots.items()))
+        self.pending_lot = next((chain.pending for chain in ordered if chain.pending is not None), None)
+
+        money_rows = history[history[Fields.TRANSACTION_CODE.value] == TransactionCode.MONEY_MOVEMENT.value]
+        money_dates = money_rows[Fields.DATE_TIME.value].dt.year
+        if money_years is None:
+            money_years = set(money_dates) | set(self.money)
+        money = Tasty(fixed_point=self.tasty.fixed_point)
+        money.moneyMovements(money_rows[money_dates.isin(money_years).to_numpy()])
+        for year in money_years:
+            self.money.pop(year, None)
+        self.money.update(money.yearValues)
+
+        trades_by_year = self._tradesByYear()
+        years |= set(money_years)
+        store = TradeStore([trade for year in years for trade in trades_by_year.get(year, [])],
+                           self.tasty.classifier, fixed_point=self.tasty.fixed_point)
+        for year in years:
+            if year not in self.money and year not in trades_by_year:
+                self.yearValues.pop(year, None)
+                continue
+            values = copy.deepcopy(self.money.get(year)) or Values()
+            self.yearValues[year] = self.tasty._bookYear(values, store, year)
+        self.yearValues = dict(sorted(self.yearValues.items()))
+        return years
+
+    def _tradesByYear(self) -> dict:
+        by_year = {}
+        for trade, dependency in zip(self.closed_trades, self.dependencies):
+            by_year.setdefault(dependency.closing_year, []).append(trade)
+        return by_year
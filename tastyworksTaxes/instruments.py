@@ -0,0 +1,109 @@
+from dataclasses import dataclass
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from tastyworksTaxes.constants import Fields
+from tastyworksTaxes.position import PositionType
+
+INSTRUMENT_COLUMNS = ['instrument_id', 'symbol', 'position_type', 'strike', 'expiry', 'call_put']
+
+
+@dataclass(frozen=True)
+class InstrumentKey:
+    """Immutable key for uniquely identifying an instrument"""
+
+    symbol: str
+    position_type: PositionType
+    strike: float | None = None
+    expiry: datetime | None = None
+    call_put: str | None = None
+
+    @classmethod
+    def fromTransaction(cls, transaction) -> "InstrumentKey":
+        position_type = transaction.getType()
+        if position_type == PositionType.stock:
+            return cls(transaction.getSymbol(), position_type, None, None, None)
+        return cls(
+            transaction.getSymbol(),
+            position_type,
+            transaction.getStrike(),
+            transaction.getExpiry(),
+            transaction[Fields.CALL_PUT.value],
+        )
+
+
+class InstrumentTable:
+    """Master table of the instruments of one run, each with a dense integer id.
+
+    Ids are handed out in order of first appearance, so a chronological run
+    gives the same ids whether the export is processed at once or in chunks.
+    Lots and trades refer to their instrument by id; the details are joined
+    back from `to_frame()`.
+    """
+
+    def __init__(self):
+        self._keys: list[InstrumentKey] = []
+        self._ids: dict[InstrumentKey, int] = {}
+        self._ids_by_hash: dict[int, int] = {}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __getitem__(self, instrument_id: int) -> InstrumentKey:
+        return self._keys[instrument_id]
+
+    def id(self, key: InstrumentKey) -> int:
+        """The id of `key`, adding it to the table if it is new"""
+        instrument_id = self._ids.get(key)
+        if instrument_id is None:
+            instrument_id = self._ids[key] = len(self._keys)
+            self._keys.append(key)
+        return instrument_id
+
+    def register(self, history: pd.DataFrame) -> np.ndarray:
+        """Ids for every row of a History with derived columns, -1 where it is no position.
+
+        Only the first row of each instrument is looked at, so symbols,
+        strikes and expiries are resolved once per instrument, not per row.
+        """
+        hashes = history[Fields.INSTRUMENT_KEY.value]
+        firsts = history[hashes.to_numpy() != 0].drop_duplicates(Fields.INSTRUMENT_KEY.value)
+        symbols = firsts[Fields.SYMBOL.value].astype(object)
+        types = firsts[Fields.POSITION_TYPE.value].astype(object)
+        for instrument_hash, symbol, position_type, strike, expiry, call_put in zip(
+                firsts[Fields.INSTRUMENT_KEY.value], symbols, types, firsts[Fields.STRIKE.value],
+                firsts[Fields.EXPIRATION_DATE.value], firsts[Fields.CALL_PUT.value].astype(object)):
+            if instrument_hash in self._ids_by_hash:
+                continue
+            position_type = PositionType(position_type)
+            if position_type == PositionType.stock:
+                key = InstrumentKey(str(symbol), position_type)
+            else:
+                key = InstrumentKey(str(symbol), position_type, strike, expiry, call_put)
+            self._ids_by_hash[instrument_hash] = self.id(key)
+        return hashes.map(self._ids_by_hash).fillna(-1).to_numpy(dtype=np.int64)
+
+    def idFor(self, transaction) -> int:
+        """The id of the instrument a single transaction trades"""
+        instrument_id = transaction.get(Fields.INSTRUMENT_ID.value)
+        if instrument_id is not None and instrument_id >= 0:
+            return instrument_id
+        instrument_id = self._ids_by_hash.get(transaction.get(Fields.INSTRUMENT_KEY.value))
+        if instrument_id is not None:
+            return instrument_id
+        return self.id(InstrumentKey.fromTransaction(transaction))
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            'instrument_id': np.arange(len(self._keys)),
+            'symbol': [key.symbol for key in self._keys],
+            'position_type': [key.position_type.value for key in self._keys],
+            'strike': pd.Series([key.strike for key in self._keys], dtype=float),
+            'expiry': pd.to_datetime(pd.Series([key.expiry for key in self._keys], dtype=object)),
+            'call_put': [key.call_put for key in self._keys],
+        }, columns=INSTRUMENT_COLUMNS)
+
+    def to_csv(self, path) -> None:
+        self.to_frame().to_csv(path, index=False)
@@ -3,10 +3,17 @@ import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import argparse
+import glob
 import logging
 import pathlib
 
+from tastyworksTaxes.fifo_processor import closed_trades_frame
+from tastyworksTaxes.fx_rates import FX_POLICIES, FxProvider
+from tastyworksTaxes.history import History
+from tastyworksTaxes.money import set_fx_provider
 from tastyworksTaxes.tasty import Tasty
+from tastyworksTaxes.validation import ValidationError
+from tastyworksTaxes.watch import FolderWatcher
 from tastyworksTaxes.printer import Printer
 
 
@@ -29,19 +36,122 @@ logger.setLevel(logging.DEBUG)
 def init_argparse() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser()
     parser.add_argument(
-        "input", help="Input file path to the tastyworks csv export", type=pathlib.Path)
+        "input", nargs="*",
+        help="Input file path(s) or glob pattern(s) of tastyworks csv exports. "
+             "Several exports are merged and rows present in more than one file are counted once",
+        type=pathlib.Path)
     parser.add_argument("-w", "--write-closed-trades", help="optional output path for the closed trades csv",
                         type=pathlib.Path, required=False)
+    parser.add_argument("--write-instruments", type=pathlib.Path, required=False,
+                        help="optional output path for the instrument table; its instrument_id column "
+                             "joins with the closed trades csv")
+    parser.add_argument("--stream", action="store_true",
+                        help="process the export in chunks with memory bounded by the open positions")
+    parser.add_argument("--chunk-size", help="rows per chunk in --stream mode (default: 50000)",
+                        type=int, default=50_000)
+    parser.add_argument("--presorted", action="store_true",
+                        help="in --stream mode, the input is already in ascending time order and is not merge-sorted")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="book the money movements while --workers processes handle the positions, "
+                             "and log the time per stage")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="process groups of symbols that never share lots in this many processes (default: 1)")
+    parser.add_argument("--resume", type=pathlib.Path, required=False,
+                        help="continue from a checkpoint; the input may be the full history or only the newer rows")
+    parser.add_argument("--write-checkpoint", type=pathlib.Path, required=False,
+                        help="save the state after --checkpoint-year to this file, to --resume from later")
+    parser.add_argument("--checkpoint-year", type=int, required=False,
+                        help="last year included in --write-checkpoint")
+    parser.add_argument("--watch", type=pathlib.Path, required=False,
+                        help="keep running and process each new export dropped into this directory")
+    parser.add_argument("--output", type=pathlib.Path, default=pathlib.Path("results"),
+                        help="in --watch mode, directory for the yearly reports and closed trades (default: results)")
+    parser.add_argument("--interval", type=float, default=60.0,
+                        help="in --watch mode, seconds between two looks at the directory (default: 60)")
+    parser.add_argument("--fx-policy", choices=FX_POLICIES, default="ecb",
+                        help="USD to EUR rates: daily ECB reference rates (default), BMF monthly averages "
+                             "or a custom daily rate file; the last two need --fx-rates")
+    parser.add_argument("--fx-rates", help="rate csv for --fx-policy bmf-monthly (month,usd_per_eur) "
+                                           "or csv (date,usd_per_eur)",
+                        type=pathlib.Path, required=False)
+    parser.add_argument("--fixed-point", action="store_true",
+                        help="book amounts and fees as exact integers of 1/100 cent instead of floats")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="neither read nor write the cache of parsed exports")
+    parser.add_argument("--clear-cache", action="store_true",
+                        help="delete all cached parsed exports before running")
+    parser.add_argument("--validation-report", type=pathlib.Path, required=False,
+                        help="if the export has problems, write all of them to this csv (row, column, value, reason)")
     return parser
 
 
+def write_closed_trades(closed_trades, path, append=False) -> None:
+    df = closed_trades_frame(closed_trades)
+    df.to_csv(path, index=False, mode="a" if append else "w", header=not append)
+
+
 def main() -> None:
     parser = init_argparse()
     args = parser.parse_args()
-    if not args.input.exists():
-        raise FileNotFoundError(f"File {args.input} does not exist")
-    t = Tasty(path=args.input)
-    t.run()
+    try:
+        run(parser, args)
+    except ValidationError as e:
+        logging.error(str(e))
+        if args.validation_report:
+            e.report.to_csv(args.validation_report)
+            logging.error(f"Wrote the full validation report to '{args.validation_report}'")
+        sys.exit(1)
+
+
+def run(parser, args) -> None:
+    if bool(args.watch) == bool(args.input):
+        parser.error("pass either input files or --watch <directory>")
+    for path in args.input:
+        if not glob.has_magic(str(path)) and not path.exists():
+            raise FileNotFoundError(f"File {path} does not exist")
+    single_file = len(args.input) == 1 and not glob.has_magic(str(args.input[0]))
+    try:
+        fx_provider = FxProvider(args.fx_policy, args.fx_rates)
+        fx_provider.table  # fail on a bad rate file before parsing the exports
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    set_fx_provider(fx_provider)
+    if args.clear_cache:
+        logging.info(f"Removed {History.clearCache()} cached exports")
+    if args.watch:
+        if not args.watch.is_dir():
+            parser.error(f"{args.watch} is not a directory")
+        try:
+            FolderWatcher(args.watch, args.output, fx_provider, fixed_point=args.fixed_point).run(args.interval)
+        except KeyboardInterrupt:
+            logging.info("Stopped watching")
+        return
+    if bool(args.write_checkpoint) != bool(args.checkpoint_year):
+        parser.error("--write-checkpoint and --checkpoint-year go together")
+    if args.stream:
+        if args.resume or args.write_checkpoint:
+            parser.error("checkpoints are not supported in --stream mode")
+        if not single_file:
+            parser.error("--stream takes a single input file")
+        if args.pipeline:
+            parser.error("--stream and --pipeline cannot be combined")
+        args.input = args.input[0]
+        run_streaming(args)
+        return
+    t = Tasty(path=args.input[0] if single_file else args.input, fx_provider=fx_provider,
+              use_cache=not args.no_cache, fixed_point=args.fixed_point)
+    if args.resume:
+        logging.info(f"Resuming from checkpoint '{args.resume}'")
+        t.resumeFrom(args.resume)
+    if args.write_checkpoint:
+        logging.info(f"Writing the state after {args.checkpoint_year} to: '{args.write_checkpoint}'")
+        t.writeCheckpoint(args.write_checkpoint, args.checkpoint_year)
+    if args.pipeline:
+        t.runPipeline(workers=args.workers)
+    elif args.write_closed_trades:
+        t.run(workers=args.workers)
+    else:
+        t.runTotals(workers=args.workers)
     for year, values in t.yearValues.items():
         print(f"Values for year {year} in Euro:")
         p = Printer(values=values, closed_trades=t.position_manager.closed_trades)
@@ -51,14 +161,41 @@ def main() -> None:
             f"Writing closed trades to: '{args.write_closed_trades}'")
         closed_trades = t.position_manager.closed_trades
         if closed_trades:
-            import pandas as pd
-            from dataclasses import asdict
-            trades_data = [asdict(trade) for trade in closed_trades]
-            df = pd.DataFrame(trades_data)
-            df.to_csv(args.write_closed_trades, index=False)
+            write_closed_trades(closed_trades, args.write_closed_trades)
         else:
             logging.error(
                 "The closed trades list is empty. Not saving to file.")
+    write_instruments(t, args)
+    logging.info("Done")
+
+
+def write_instruments(t, args) -> None:
+    if args.write_instruments:
+        logging.info(f"Writing instruments to: '{args.write_instruments}'")
+        t.position_manager.instruments.to_csv(args.write_instruments)
+
+
+def run_streaming(args) -> None:
+    t = Tasty(fixed_point=args.fixed_point)
+    written = []
+
+    def append_closed_trades(closed_trades):
+        write_closed_trades(closed_trades, args.write_closed_trades, append=bool(written))
+        written.append(len(closed_trades))
+
+    if args.write_closed_trades:
+        logging.info(
+            f"Writing closed trades to: '{args.write_closed_trades}'")
+    t.runStreaming(args.input, chunksize=args.chunk_size, presorted=args.presorted,
+                   trade_sink=append_closed_trades if args.write_closed_trades else None)
+    for year, values in t.yearValues.items():
+        print(f"Values for year {year} in Euro:")
+        p = Printer(values=values, closed_trades=[])
+        print(p.generateDummyReport())
+    if args.write_closed_trades and not written:
+        logging.error(
+            "The closed trades list is empty. Not saving to file.")
+    write_instruments(t, args)
     logging.info("Done")
 
 
@@ -3,21 +3,44 @@ import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import datetime
-from currency_converter import CurrencyConverter
+import numpy as np
+from tastyworksTaxes.fixed_point import from_units, to_units
+from tastyworksTaxes.fx_rates import FxProvider
 
-# Shared currency converter instance
-_converter = CurrencyConverter(fallback_on_missing_rate=True, fallback_on_wrong_date=True)
+_provider = FxProvider('ecb')
+
+def fx_provider() -> FxProvider:
+    """The conversion policy of the current run, daily ECB rates by default"""
+    return _provider
+
+def set_fx_provider(provider: FxProvider) -> None:
+    global _provider
+    _provider = provider
+
+def usd_per_eur(dates) -> np.ndarray:
+    """USD rate for each date under the current policy"""
+    return _provider.usd_per_eur(dates)
+
+def convert_usd_to_eur_many(amounts, dates) -> np.ndarray:
+    """Batched USD to EUR conversion of an amount vector.
+
+    With the ECB policy the results are bit-identical to
+    CurrencyConverter.convert, which computes amount / usd_rate * 1.0 for the
+    EUR reference currency.
+    """
+    return _provider.convert(amounts, dates)
 
 def convert_usd_to_eur(amount: float, date) -> float:
     """Centralized USD to EUR conversion"""
-    return _converter.convert(amount, 'USD', 'EUR', date=date)
+    return float(convert_usd_to_eur_many([amount], [date])[0])
 
 class Money:
-    """replaces eur and usd"""
+    """replaces eur and usd; `fixed` amounts are added as fixed point units"""
     
-    def __init__(self, eur=0.0, usd=0.0, row=None, date=''):
+    def __init__(self, eur=0.0, usd=0.0, row=None, date='', fixed=False):
         self.eur = eur
         self.usd = usd
+        self.fixed = fixed
         self.row = row if row is not None else {}
         self.date = date
 
@@ -35,14 +58,19 @@ class Money:
     def fromUsdToEur(self, date):
         """converts from USD to eur at a certain date"""
         d = datetime.datetime.strptime(date, "%Y-%m-%d").date()
-        self.eur = convert_usd_to_eur(self.usd, d)
+        self.eur = float(convert_usd_to_eur_many([self.usd], [d])[0])
 
     def __repr__(self):
         return str({'eur': self.eur, 'usd': self.usd})
 
     def __add__(self, x):
-        """overloads + operator for Money class"""
+        """overloads + operator for Money class; exact in units if either side is fixed"""
         m = Money()
+        if self.fixed or x.fixed:
+            m.fixed = True
+            m.eur = from_units(to_units(self.eur) + to_units(x.eur))
+            m.usd = from_units(to_units(self.usd) + to_units(x.usd))
+            return m
         m.eur = self.eur + x.eur
         m.usd = self.usd + x.usd
         return m
@@ -50,10 +78,15 @@ class Money:
     def __sub__(self, x):
         """overloads - operator for Money class"""
         m = Money()
+        if self.fixed or x.fixed:
+            m.fixed = True
+            m.eur = from_units(to_units(self.eur) - to_units(x.eur))
+            m.usd = from_units(to_units(self.usd) - to_units(x.usd))
+            return m
         m.eur = self.eur - x.eur
         m.usd = self.usd - x.usd
         return m
     
     def __neg__(self):
         """Returns a new Money instance with negated eur and usd values."""
-        return Money(eur=-self.eur, usd=-self.usd)
+        return Money(eur=-self.eur, usd=-self.usd, fixed=self.fixed)
@@ -0,0 +1,85 @@
+"""Classification of Money Movement rows into the fields of Values.
+
+The subcode decides the field; withdrawals and deposits are refined by their
+description. All rules are column operations, evaluated once per distinct
+description.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+from tastyworksTaxes.constants import Fields, MoneyMovementType
+
+SUBCODE_FIELDS = {
+    MoneyMovementType.TRANSFER.value: "transfer",
+    MoneyMovementType.WITHDRAWAL.value: "withdrawal",
+    MoneyMovementType.BALANCE_ADJUSTMENT.value: "balanceAdjustment",
+    MoneyMovementType.FEE.value: "fee",
+    MoneyMovementType.DEPOSIT.value: "deposit",
+    MoneyMovementType.CREDIT_INTEREST.value: "creditInterest",
+    MoneyMovementType.DEBIT_INTEREST.value: "debitInterest",
+    MoneyMovementType.DIVIDEND.value: "dividend",
+    MoneyMovementType.STOCK_LENDING.value: "securitiesLendingIncome",
+}
+WIRE_DEPOSIT_TEXT = "Wire Funds Received"
+DEBIT_INTEREST_PATTERN = r".*FROM \d{2}/\d{2} THRU \d{2}/\d{2} @.*"
+CREDIT_INTEREST_TEXT = "INTEREST ON CREDIT BALANCE"
+
+
+def classify(subcodes: pd.Series, descriptions: pd.Series) -> pd.Series:
+    """The Values field for each money movement, NaN where the subcode is unknown.
+
+    Withdrawals described as "Wire Funds Received" are deposits and those
+    with a "FROM mm/dd THRU mm/dd @" period are debit interest; deposits
+    described as "INTEREST ON CREDIT BALANCE" are credit interest.
+    """
+    subcodes = pd.Series(subcodes, dtype=object)
+    descriptions = pd.Series(np.asarray(descriptions, dtype=object), index=subcodes.index)
+
+    def flags(uniques: pd.Series) -> pd.DataFrame:
+        text = uniques.where(uniques.map(type) == str)
+        return pd.DataFrame({
+            'wire': text.str.contains(WIRE_DEPOSIT_TEXT, regex=False).fillna(False).astype(bool),
+            'debit_interest': text.str.match(DEBIT_INTEREST_PATTERN).fillna(False).astype(bool),
+            'credit_interest': (text == CREDIT_INTEREST_TEXT).fillna(False),
+        })
+
+    codes, uniques = pd.factorize(descriptions, use_na_sentinel=False)
+    described = flags(pd.Series(uniques, dtype=object)).to_numpy()[codes]
+    wire, debit_interest, credit_interest = described.T
+
+    fields = subcodes.map(SUBCODE_FIELDS)
+    withdrawal = (subcodes == MoneyMovementType.WITHDRAWAL.value).to_numpy()
+    deposit = (subcodes == MoneyMovementType.DEPOSIT.value).to_numpy()
+    fields[withdrawal & debit_interest & ~wire] = "debitInterest"
+    fields[withdrawal & wire] = "deposit"
+    fields[deposit & credit_interest] = "creditInterest"
+    return fields
+
+
+def field_for(subcode: str, description) -> str | None:
+    """classify for a single row, None if the subcode is unknown"""
+    field = SUBCODE_FIELDS.get(subcode)
+    if not isinstance(description, str):
+        return field
+    if subcode == MoneyMovementType.WITHDRAWAL.value:
+        if WIRE_DEPOSIT_TEXT in description:
+            return "deposit"
+        if re.match(DEBIT_INTEREST_PATTERN, description):
+            return "debitInterest"
+    if subcode == MoneyMovementType.DEPOSIT.value and description == CREDIT_INTEREST_TEXT:
+        return "creditInterest"
+    return field
+
+
+def unknown_subcode_message(rows: pd.DataFrame, limit: int = 10) -> str:
+    subcodes = rows[Fields.TRANSACTION_SUBCODE.value].astype(object)
+    lines = [f"CRITICAL: Unknown money movement subcode(s) {sorted(set(map(str, subcodes)))} "
+             f"in {len(rows)} transaction(s). This could affect tax calculations."]
+    for date, subcode, description in list(zip(rows[Fields.DATE_TIME.value], subcodes,
+                                               rows[Fields.DESCRIPTION.value]))[:limit]:
+        lines.append(f"  {date} '{subcode}': {description}")
+    if len(rows) > limit:
+        lines.append(f"  ... and {len(rows) - limit} more")
+    return '\n'.join(lines)
@@ -0,0 +1,163 @@
+"""FIFO over independent groups of symbols in a process pool.
+
+Open lots of different symbols only interact through Symbol Change and Stock
+Merger rows: the close leg parks its lot and the next open leg, of whatever
+symbol, takes it over. Linking every open leg with all close legs since the
+previous open leg gives a graph whose connected components never share a
+lot, so each component can run through its own PositionManager.
+"""
+import heapq
+import os
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from tastyworksTaxes.constants import Fields, TransactionSubcode
+from tastyworksTaxes.position_manager import PositionManager
+from tastyworksTaxes.transaction import records
+
+LINKING_SUBCODES = [TransactionSubcode.SYMBOL_CHANGE.value, TransactionSubcode.STOCK_MERGER.value]
+
+
+def _symbols(positions: pd.DataFrame) -> pd.Series:
+    return positions[Fields.SYMBOL.value].astype(object).astype(str)
+
+
+def symbol_components(positions: pd.DataFrame, pending_symbol: str | None = None) -> dict[str, int]:
+    """Component number of every symbol of a chronological frame of position rows.
+
+    `pending_symbol` is the symbol of a lot an earlier run left waiting for
+    its open leg. Components are numbered in order of first appearance.
+    """
+    parent = {}
+
+    def find(symbol):
+        parent.setdefault(symbol, symbol)
+        while parent[symbol] != symbol:
+            parent[symbol] = parent[parent[symbol]]
+            symbol = parent[symbol]
+        return symbol
+
+    def union(symbols):
+        roots = [find(symbol) for symbol in symbols]
+        for root in roots[1:]:
+            parent[root] = roots[0]
+
+    symbols = _symbols(positions)
+    linking = positions[Fields.TRANSACTION_SUBCODE.value].isin(LINKING_SUBCODES).to_numpy()
+    candidates = [pending_symbol] if pending_symbol is not None else []
+    for symbol, is_closing in zip(symbols[linking], positions[Fields.IS_CLOSING.value].to_numpy()[linking]):
+        if is_closing:
+            candidates.append(symbol)
+        else:
+            union([symbol, *candidates])
+            candidates = []
+    union(candidates)
+
+    numbers = {}
+    components = {}
+    for symbol in ([pending_symbol] if pending_symbol is not None else []) + list(symbols.unique()):
+        components[symbol] = numbers.setdefault(find(symbol), len(numbers))
+    return components
+
+
+def assign_groups(components: pd.Series, groups: int) -> dict[int, int]:
+    """Spreads the components of the rows over `groups` groups of similar row counts.
+
+    The largest components are placed first, each into the smallest group.
+    """
+    sizes = components.value_counts()
+    order = sorted(sizes.index, key=lambda component: (-sizes[component], component))
+    loads = [(0, group) for group in range(groups)]
+    group_of = {}
+    for component in order:
+        load, group = heapq.heappop(loads)
+        group_of[component] = group
+        heapq.heappush(loads, (load + int(sizes[component]), group))
+    return group_of
+
+
+def register_positions(instruments, positions: pd.DataFrame) -> np.ndarray:
+    """Instrument ids of every position row, all handed out by `instruments`.
+
+    Rows the derived columns leave without an id are resolved one by one
+    here, so no partition ever has to add an instrument to its own copy of
+    the table.
+    """
+    instrument_ids = np.array(instruments.register(positions))
+    unregistered = np.flatnonzero(instrument_ids < 0)
+    for index, record in zip(unregistered, records(positions.iloc[unregistered])):
+        instrument_ids[index] = instruments.idFor(record)
+    return instrument_ids
+
+
+def process_partitioned(position_manager: PositionManager, positions: pd.DataFrame, workers: int | None = None) -> None:
+    """Feeds chronological position rows to `position_manager`, one process per group of symbols.
+
+    The frame needs the derived columns of History. Closed trades are merged
+    by closing time and input row, so the manager ends up with the same
+    closed trades, open lots and instrument ids as after feeding the rows in
+    order; only the open lots are keyed in instrument id order. `workers` is
+    the number of groups, all CPUs if None.
+    """
+    instruments = position_manager.instruments
+    instrument_ids = register_positions(instruments, positions)
+    pending = getattr(position_manager, "_pending_symbol_change_lot", None)
+    components = symbol_components(positions, pending.symbol if pending is not None else None)
+    row_components = _symbols(positions).map(components)
+    groups = max(1, min(workers or os.cpu_count() or 1, row_components.nunique()))
+    group_of = assign_groups(row_components, groups)
+    row_groups = row_components.map(group_of).to_numpy()
+
+    kept = {}
+    lots_by_group = defaultdict(list)
+    for key, lots in position_manager.open_lots.items():
+        group = group_of.get(components.get(instruments[key].symbol))
+        if group is None:
+            kept[key] = lots
+        else:
+            lots_by_group[group].append((key, lots))
+    pending_group = group_of.get(components.get(pending.symbol)) if pending is not None else None
+
+    row_numbers = np.arange(len(positions))
+    tasks = [
+        (positions[row_groups == group], instrument_ids[row_groups == group], row_numbers[row_groups == group],
+         instruments, lots_by_group[group], pending if group == pending_group else None,
+         position_manager.fixed_point)
+        for group in range(groups)
+    ]
+    if groups == 1:
+        results = [_run_partition(*task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=groups) as pool:
+            results = list(pool.map(_run_partition, *zip(*tasks)))
+
+    for _, lots, _ in results:
+        kept.update(lots)
+    position_manager.open_lots = defaultdict(deque, sorted(kept.items()))
+    if pending_group is not None or pending is None:
+        position_manager._pending_symbol_change_lot = next(
+            (lot for _, _, lot in results if lot is not None), None)
+    position_manager.record_trades(
+        [trade for _, _, trade in heapq.merge(*(trades for trades, _, _ in results), key=lambda item: item[:2])])
+
+
+def _run_partition(rows, instrument_ids, row_numbers, instruments, open_lots, pending, fixed_point=False):
+    """Worker: the closed trades, tagged with (closing time, row), and the final state of one group"""
+    if (instrument_ids < 0).any():
+        raise ValueError("every position row needs an instrument id before it is partitioned")
+    position_manager = PositionManager(fixed_point)
+    position_manager.instruments = instruments
+    position_manager.open_lots.update(open_lots)
+    position_manager._pending_symbol_change_lot = pending
+    closed_trades = position_manager.closed_trades
+    trades = []
+    dates = rows[Fields.DATE_TIME.value].to_numpy()
+    for record, row_number, date in zip(records(rows, instrument_ids), row_numbers, dates):
+        position_manager.add_position(record)
+        if closed_trades:
+            trades.extend((date, row_number, trade) for trade in closed_trades)
+            closed_trades.clear()
+    return trades, dict(position_manager.open_lots), position_manager._pending_symbol_change_lot
@@ -1,14 +1,16 @@
-from dataclasses import dataclass, replace
+from dataclasses import dataclass, field, replace
 from datetime import datetime
 from math import floor, ceil
 import logging
 from tastyworksTaxes.constants import Fields
+from tastyworksTaxes.fixed_point import allocate
 from tastyworksTaxes.position import PositionType
 
 logger = logging.getLogger(__name__)
 
 @dataclass
 class PositionLot:
+    """Open lot; amounts and fees are floats, or integer units with fixed point"""
     symbol: str
     position_type: PositionType
     quantity: int
@@ -20,6 +22,7 @@ class PositionLot:
     strike: float = None
     expiry: datetime = None
     call_put: str = None
+    instrument_id: int = field(default=None, compare=False)
     
     def matches(self, symbol, position_type, strike=None, expiry=None, call_put=None):
         if self.symbol != symbol or self.position_type != position_type:
@@ -38,17 +41,23 @@ class PositionLot:
     def get_closable_quantity(self, requested_quantity):
         return min(abs(requested_quantity), abs(self.quantity))
     
-    def consume(self, quantity_to_consume):
+    def consume(self, quantity_to_consume, fixed_point=False):
         if abs(quantity_to_consume) > abs(self.quantity):
             raise ValueError(f"Cannot consume {quantity_to_consume} from lot with quantity {self.quantity}")
 
         abs_original_quantity = abs(self.quantity)
-        percentage_consumed = quantity_to_consume / abs_original_quantity
+        if fixed_point:
+            consumed_amount_usd = allocate(self.amount_usd, quantity_to_consume, abs_original_quantity)
+            consumed_amount_eur = allocate(self.amount_eur, quantity_to_consume, abs_original_quantity)
+            consumed_fees_usd = allocate(self.fees_usd, quantity_to_consume, abs_original_quantity)
+            consumed_fees_eur = allocate(self.fees_eur, quantity_to_consume, abs_original_quantity)
+        else:
+            percentage_consumed = quantity_to_consume / abs_original_quantity
 
-        consumed_amount_usd = self.amount_usd * percentage_consumed
-        consumed_amount_eur = self.amount_eur * percentage_consumed
-        consumed_fees_usd = self.fees_usd * percentage_consumed
-        consumed_fees_eur = self.fees_eur * percentage_consumed
+            consumed_amount_usd = self.amount_usd * percentage_consumed
+            consumed_amount_eur = self.amount_eur * percentage_consumed
+            consumed_fees_usd = self.fees_usd * percentage_consumed
+            consumed_fees_eur = self.fees_eur * percentage_consumed
 
         consumed_values = {
             Fields.AMOUNT.value: consumed_amount_usd,
@@ -70,7 +79,7 @@ class PositionLot:
 
         return new_lot, consumed_values
     
-    def adjust_for_split(self, ratio):
+    def adjust_for_split(self, ratio, fixed_point=False):
         if self.quantity == 0:
             return
 
@@ -79,6 +88,11 @@ class PositionLot:
 
         if new_qty == 0:
             logger.warning(f"Split rounding produced 0 from {self.quantity} with ratio {ratio} for {self.symbol}. The lot will be zeroed but basis retained for reporting.")
+        elif target != 0 and fixed_point:
+            self.amount_usd = allocate(self.amount_usd, new_qty, target)
+            self.amount_eur = allocate(self.amount_eur, new_qty, target)
+            self.fees_usd = allocate(self.fees_usd, new_qty, target)
+            self.fees_eur = allocate(self.fees_eur, new_qty, target)
         elif target != 0:
             scale = new_qty / target
             self.amount_usd *= scale
@@ -41,7 +41,6 @@ Implementation:
 
 import logging
 from collections import defaultdict, deque
-from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
 import csv
@@ -53,28 +52,39 @@ from tastyworksTaxes.constants import (
     CLOSING_SUBCODES,
 )
 from tastyworksTaxes.fifo_processor import FifoProcessor, TradeResult
-from tastyworksTaxes.position import PositionType
+from tastyworksTaxes.fixed_point import to_units
+from tastyworksTaxes.instruments import InstrumentKey, InstrumentTable
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass(frozen=True)
-class InstrumentKey:
-    """Immutable key for uniquely identifying an instrument"""
-
-    symbol: str
-    position_type: PositionType
-    strike: float | None = None
-    expiry: datetime | None = None
-    call_put: str | None = None
-
-
 class PositionManager:
-    def __init__(self):
-        self.open_lots: dict[InstrumentKey, deque[PositionLot]] = defaultdict(deque)
+    """FIFO matching of the position rows.
+
+    Every match is passed to the `add` method of each of `observers`, as a
+    TradeMatch, or as the TradeResult if trades are kept. With `keep_trades`
+    off no TradeResult is built and `closed_trades` stays empty, for runs
+    that only need the observers' totals. With `fixed_point` the open lots
+    hold integer units, see tastyworksTaxes.fixed_point.
+    """
+
+    def __init__(self, fixed_point: bool = False):
+        self.fixed_point = fixed_point
+        self.instruments = InstrumentTable()
+        self.open_lots: dict[int, deque[PositionLot]] = defaultdict(deque)
         self.closed_trades = []
+        self.observers = []
+        self.keep_trades = True
         self._corporate_actions_config = self._load_corporate_actions_config()
 
+    def record_trades(self, trades) -> None:
+        """Takes closed trades matched elsewhere, e.g. by a worker process, as if matched here"""
+        for observer in self.observers:
+            for trade in trades:
+                observer.add(trade)
+        if self.keep_trades:
+            self.closed_trades.extend(trades)
+
     @staticmethod
     def _load_corporate_actions_config() -> dict:
         """
@@ -156,20 +166,9 @@ class PositionManager:
 
         return None
 
-    def _get_key_from_transaction(self, transaction) -> InstrumentKey:
-        """Generate InstrumentKey from transaction for O(1) lot lookup"""
-        position_type = transaction.getType()
-        if position_type == PositionType.stock:
-            return InstrumentKey(
-                transaction.getSymbol(), position_type, None, None, None
-            )
-        return InstrumentKey(
-            transaction.getSymbol(),
-            position_type,
-            transaction.getStrike(),
-            transaction.getExpiry(),
-            transaction.loc[Fields.CALL_PUT.value],
-        )
+    def _get_key_from_transaction(self, transaction) -> int:
+        """Id of the transaction's instrument in self.instruments, the key of open_lots"""
+        return self.instruments.idFor(transaction)
 
     def get_all_open_lots(self) -> list[PositionLot]:
         """Return flat list of all open lots (for testing/debugging)"""
@@ -180,9 +179,10 @@ class PositionManager:
 
     def add_lot_directly(self, lot: PositionLot):
         """Add a lot directly to open_lots (for testing only)"""
-        key = InstrumentKey(
+        key = self.instruments.id(InstrumentKey(
             lot.symbol, lot.position_type, lot.strike, lot.expiry, lot.call_put
-        )
+        ))
+        lot.instrument_id = key
         self.open_lots[key].append(lot)
 
     def add_position(self, transaction):
@@ -225,6 +225,9 @@ class PositionManager:
             self._open_position(transaction)
 
     def _is_closing_transaction(self, transaction):
+        is_closing = transaction.get(Fields.IS_CLOSING.value)
+        if is_closing is not None:
+            return bool(is_closing)
         subcode = transaction[Fields.TRANSACTION_SUBCODE.value]
         open_close = transaction.get(Fields.OPEN_CLOSE.value, "")
         return subcode in CLOSING_SUBCODES or open_close == OpenClose.CLOSE.value
@@ -234,28 +237,30 @@ class PositionManager:
             f"{transaction.getDateTime():<19} Adding '{transaction.getQuantity():>4}' of '{transaction.getSymbol():<6}' to positions"
         )
 
+        position_type = transaction.getType()
+        is_stock = position_type.name == "stock"
+        value = transaction.getValue()
+        fees = transaction.getFees()
+        amounts = (value.usd, value.eur, fees.usd, fees.eur)
+        if self.fixed_point:
+            amounts = tuple(to_units(amount) for amount in amounts)
+        amount_usd, amount_eur, fees_usd, fees_eur = amounts
         lot = PositionLot(
             symbol=transaction.getSymbol(),
-            position_type=transaction.getType(),
+            position_type=position_type,
             quantity=transaction.getQuantity(),
-            amount_usd=transaction.getValue().usd,
-            amount_eur=transaction.getValue().eur,
-            fees_usd=transaction.getFees().usd,
-            fees_eur=transaction.getFees().eur,
-            date=transaction.loc[Fields.DATE_TIME.value],
-            strike=transaction.getStrike()
-            if transaction.getType().name != "stock"
-            else None,
-            expiry=transaction.getExpiry()
-            if transaction.getType().name != "stock"
-            else None,
-            call_put=transaction.loc[Fields.CALL_PUT.value]
-            if transaction.getType().name != "stock"
-            else None,
+            amount_usd=amount_usd,
+            amount_eur=amount_eur,
+            fees_usd=fees_usd,
+            fees_eur=fees_eur,
+            date=transaction[Fields.DATE_TIME.value],
+            strike=transaction.getStrike() if not is_stock else None,
+            expiry=transaction.getExpiry() if not is_stock else None,
+            call_put=transaction[Fields.CALL_PUT.value] if not is_stock else None,
+            instrument_id=self._get_key_from_transaction(transaction),
         )
 
-        key = self._get_key_from_transaction(transaction)
-        self.open_lots[key].append(lot)
+        self.open_lots[lot.instrument_id].append(lot)
 
     def _open_position_from_symbol_change(self, transaction):
         old_lot = getattr(self, "_pending_symbol_change_lot", None)
@@ -281,13 +286,13 @@ class PositionManager:
             expiry=transaction.getExpiry()
             if transaction.getType().name != "stock"
             else None,
-            call_put=transaction.loc[Fields.CALL_PUT.value]
+            call_put=transaction[Fields.CALL_PUT.value]
             if transaction.getType().name != "stock"
             else None,
+            instrument_id=self._get_key_from_transaction(transaction),
         )
 
-        key = self._get_key_from_transaction(transaction)
-        self.open_lots[key].append(lot)
+        self.open_lots[lot.instrument_id].append(lot)
         logger.debug(
             f"Symbol Change: Added new lot {transaction.getSymbol()} qty={lot.quantity} basis={lot.amount_usd:.2f} (preserved from {old_lot.symbol})"
         )
@@ -315,6 +320,7 @@ class PositionManager:
         """
         quantity_to_close = abs(transaction.getQuantity())
         closing_quantity = transaction.getQuantity()
+        closed_quantity = 0
 
         key = self._get_key_from_transaction(transaction)
         matching_lots = self.open_lots.get(key)
@@ -341,7 +347,7 @@ class PositionManager:
             opening_was_long = lot_to_process.amount_usd < 0
             lot_before = f"{lot_to_process.quantity} @ {lot_to_process.amount_usd:.2f}"
 
-            new_lot, consumed_values = lot_to_process.consume(closable_quantity)
+            new_lot, consumed_values = lot_to_process.consume(closable_quantity, self.fixed_point)
 
             lot_after = (
                 f"{new_lot.quantity} @ {new_lot.amount_usd:.2f}"
@@ -349,18 +355,22 @@ class PositionManager:
                 else "empty"
             )
 
-            trade_result = FifoProcessor.create_trade_result(
-                lot_to_process,
+            trade = FifoProcessor.create_match(
                 transaction,
                 closable_quantity,
                 consumed_values,
                 opening_was_long,
+                closed_quantity,
+                self.fixed_point,
             )
-            self.closed_trades.append(trade_result)
-
-            logger.info(
-                f"{trade_result.opening_date:<19} - {trade_result.closing_date:<19} closing {trade_result.quantity:>4} {trade_result.symbol:<6}"
-            )
+            if self.keep_trades:
+                trade = FifoProcessor.trade_result(trade, lot_to_process, transaction)
+                self.closed_trades.append(trade)
+            for observer in self.observers:
+                observer.add(trade)
+
+            logger.info("%s - %s closing %4s %-6s", lot_to_process.date, transaction[Fields.DATE_TIME.value],
+                        trade.quantity, trade.symbol)
             logger.debug(
                 f"Consumed {closable_quantity} from lot: {lot_before} -> {lot_after}"
             )
@@ -369,6 +379,7 @@ class PositionManager:
                 matching_lots.appendleft(new_lot)
 
             quantity_to_close -= closable_quantity
+            closed_quantity += closable_quantity
 
         if not matching_lots:
             del self.open_lots[key]
@@ -379,7 +390,7 @@ class PositionManager:
             )
 
     def _handle_reverse_split(self, transaction):
-        description = transaction.loc["Description"]
+        description = transaction["Description"]
         import re
 
         # If description contains option symbol pattern, treat as trade (Close/Open), not position mutation
@@ -414,7 +425,7 @@ class PositionManager:
 
         if ratio is not None:
             affected_keys = [
-                key for key in self.open_lots.keys() if key.symbol == symbol_to_split
+                key for key in self.open_lots.keys() if self.instruments[key].symbol == symbol_to_split
             ]
             total_lots = sum(len(self.open_lots[key]) for key in affected_keys)
             logger.warning(
@@ -428,7 +439,7 @@ class PositionManager:
                 for lot in lots_queue:
                     old_qty = lot.quantity
                     old_strike = getattr(lot, "strike", None)
-                    lot.adjust_for_split(ratio)
+                    lot.adjust_for_split(ratio, self.fixed_point)
                     logger.debug(
                         f"Split adjusted lot: qty {old_qty} -> {lot.quantity}, strike {old_strike} -> {getattr(lot, 'strike', None)}"
                     )
@@ -436,7 +447,7 @@ class PositionManager:
             return True
         else:
             affected_keys = [
-                key for key in self.open_lots.keys() if key.symbol == symbol_to_split
+                key for key in self.open_lots.keys() if self.instruments[key].symbol == symbol_to_split
             ]
             affected_lots = sum(len(self.open_lots[key]) for key in affected_keys)
             transaction_date = transaction.get("Date/Time") or transaction.get("Date")
@@ -1,40 +1,127 @@
 from tastyworksTaxes.values import Values
-from tastyworksTaxes.transaction import Transaction
+from tastyworksTaxes.transaction import Transaction, records
 from tastyworksTaxes.money import Money
+from tastyworksTaxes.fixed_point import from_units, to_units, to_units_array
 from tastyworksTaxes.history import History
+from tastyworksTaxes.money_movement import (
+    SUBCODE_FIELDS,
+    classify as classify_money_movements,
+    field_for as money_movement_field,
+    unknown_subcode_message,
+)
 from tastyworksTaxes.asset_classifier import AssetClassifier
+from tastyworksTaxes.checkpoint import (
+    load as load_checkpoint,
+    rows_checksum,
+    save as save_checkpoint,
+)
+from tastyworksTaxes.partition import process_partitioned
 from tastyworksTaxes.position_manager import PositionManager
+from tastyworksTaxes.trade_aggregator import YearlyTradeAggregator
+from tastyworksTaxes.trade_store import TradeStore
 from tastyworksTaxes.constants import TransactionCode, Fields
-from tastyworksTaxes.trade_calculator import (
-    calculate_combined_sum,
-    calculate_option_sum,
-    calculate_long_option_profits,
-    calculate_long_option_losses,
-    calculate_long_option_total_losses,
-    calculate_short_option_profits,
-    calculate_short_option_losses,
-    calculate_option_differential,
-    calculate_stock_loss,
-    calculate_stock_fees,
-    calculate_other_fees,
-    calculate_fees_sum,
-    get_stock_trades,
-    calculate_gross_equity_etf_profits,
-    calculate_equity_etf_profits,
-    calculate_other_stock_and_bond_profits,
-)
+from tastyworksTaxes.trade_calculator import get_stock_trades
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import copy
 import logging
+import time
+
+import numpy as np
+import pandas as pd
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+MONEY_MOVEMENT_FIELDS = tuple(dict.fromkeys(SUBCODE_FIELDS.values()))
+
 
 class Tasty:
-    def __init__(self, path=None):
+    """Tax values of an export; with `fixed_point` all amounts are booked as
+    exact integer units, see tastyworksTaxes.fixed_point"""
+
+    def __init__(self, path=None, fx_provider=None, use_cache=False, fixed_point=False):
         self.yearValues = {}
-        self.history = History.fromFile(path) if path else History()
-        self.position_manager = PositionManager()
+        self.fx_provider = fx_provider
+        self.fixed_point = fixed_point
+        if isinstance(path, (list, tuple)):
+            self.history = History.fromFiles(path, fx_provider=fx_provider)
+        else:
+            self.history = History.fromFile(path, fx_provider, use_cache=use_cache) if path else History()
+        self.position_manager = PositionManager(self.fixed_point)
         self.classifier = AssetClassifier()
+        self.checkpointYear = None
+        self._consumed = (0, 0)
+        self._closedYears = set()
+
+    def useFxProvider(self, fx_provider):
+        """Switches the conversion policy, e.g. to compare ECB with BMF rates.
+
+        The parsed history is kept and only its euro columns are recomputed.
+        Results of an earlier run are discarded, so run() can be called again.
+        """
+        self.fx_provider = fx_provider
+        if not self.history.empty:
+            self.history.addEuroConversion(fx_provider)
+        self.yearValues = {}
+        self.position_manager = PositionManager(self.fixed_point)
+        self.checkpointYear = None
+        self._consumed = (0, 0)
+        self._closedYears = set()
+
+    def writeCheckpoint(self, path, year: int):
+        """Processes the rows up to the end of `year` and saves the engine state to `path`.
+
+        The values of the finished years are booked and kept; the later rows
+        stay in self.history, so run() afterwards gives the same result as
+        without the checkpoint.
+        """
+        if self.checkpointYear is not None and year <= self.checkpointYear:
+            raise ValueError(f"The rows up to the end of {self.checkpointYear} are already processed, "
+                             f"can't checkpoint {year}")
+        history = self._chronological(self.history)
+        consumed = history[Fields.DATE_TIME.value].dt.year.to_numpy() <= year
+        rows, checksum = self._consumed
+        self._consumed = (rows + int(consumed.sum()), rows_checksum(history[consumed], rows, checksum))
+        self.processTransactionHistory(history[consumed])
+        self._bookTrades()
+        self._closedYears |= set(self.yearValues)
+        self.checkpointYear = year
+        self.history = History(history[~consumed])
+        save_checkpoint(path, year, *self._consumed, self.position_manager, self.yearValues)
+
+    def resumeFrom(self, path):
+        """Restores the engine state saved by writeCheckpoint and drops the rows it consumed.
+
+        Rows of self.history up to the checkpoint year are only accepted if
+        they are exactly the consumed rows, e.g. the full history again;
+        an export with only newer rows is accepted as well.
+        """
+        state = load_checkpoint(path)
+        if state['fixed_point'] != self.fixed_point:
+            raise ValueError(f"Checkpoint {path} was written with fixed point {'on' if state['fixed_point'] else 'off'}, "
+                             f"resume it the same way")
+        history = self._chronological(self.history)
+        consumed = history[Fields.DATE_TIME.value].dt.year.to_numpy() <= state['year']
+        if consumed.any() and (consumed.sum() != state['rows']
+                               or rows_checksum(history[consumed]) != state['checksum']):
+            raise ValueError(
+                f"The {int(consumed.sum())} input rows up to the end of {state['year']} don't match the "
+                f"{state['rows']} rows consumed by checkpoint {path}. Refusing to resume."
+            )
+
+        position_manager = PositionManager(self.fixed_point)
+        for key in state['instruments']:
+            position_manager.instruments.id(key)
+        for lot in state['open_lots']:
+            position_manager.open_lots[lot.instrument_id].append(lot)
+        position_manager._pending_symbol_change_lot = state['pending_lot']
+        self.position_manager = position_manager
+        self.yearValues = state['values']
+        self._closedYears = set(state['values'])
+        self._consumed = (state['rows'], state['checksum'])
+        self.checkpointYear = state['year']
+        self.history = History(history[~consumed])
 
     def year(self, year):
         if year not in self.yearValues:
@@ -42,83 +129,158 @@ class Tasty:
         return self.yearValues[year]
 
     def moneyMovement(self, row):
-        import re
-
         t = Transaction(row)
-        m = Money(row=row)
         year_values = self.year(t.getYear())
+        subcode = t.loc["Transaction Subcode"]
         desc = t.loc["Description"]
 
-        match t.loc["Transaction Subcode"]:
-            case "Transfer":
-                year_values.transfer += m
-            case "Withdrawal":
-                if isinstance(desc, str) and "Wire Funds Received" in desc:
-                    year_values.deposit += m
-                elif isinstance(desc, str) and re.match(
-                    r".*FROM \d{2}/\d{2} THRU \d{2}/\d{2} @.*", desc
-                ):
-                    year_values.debitInterest += m
-                else:
-                    year_values.withdrawal += m
-            case "Balance Adjustment":
-                year_values.balanceAdjustment += m
-            case "Fee":
-                year_values.fee += m
-            case "Deposit":
-                if desc == "INTEREST ON CREDIT BALANCE":
-                    year_values.creditInterest += m
-                else:
-                    year_values.deposit += m
-            case "Credit Interest":
-                year_values.creditInterest += m
-            case "Debit Interest":
-                year_values.debitInterest += m
-            case "Dividend":
-                year_values.dividend += m
-            case "Fully Paid Stock Lending Income":
-                year_values.securitiesLendingIncome += m
-            case subcode:
-                raise ValueError(
-                    f"CRITICAL: Unknown money movement subcode '{subcode}' in transaction: {desc}. "
-                    f"This could affect tax calculations."
-                )
+        field = money_movement_field(subcode, desc)
+        if field is None:
+            raise ValueError(
+                f"CRITICAL: Unknown money movement subcode '{subcode}' in transaction: {desc}. "
+                f"This could affect tax calculations."
+            )
+        setattr(year_values, field, getattr(year_values, field) + Money(row=row))
+
+    def moneyMovements(self, history):
+        """Books all Money Movement rows of a chronological frame at once.
+
+        Rows are classified in one vectorized pass and summed per (year,
+        field) group. Each group is accumulated in row order onto the running
+        total, so the sums are exactly those of calling moneyMovement row by
+        row, also across the chunks of runStreaming. With fixed point the
+        groups are summed as int64 units.
+        """
+        rows = history[history[Fields.TRANSACTION_CODE.value] == TransactionCode.MONEY_MOVEMENT.value]
+        if rows.empty:
+            return
+        fields = classify_money_movements(rows[Fields.TRANSACTION_SUBCODE.value], rows[Fields.DESCRIPTION.value])
+        unknown = fields.isna().to_numpy()
+        if unknown.any():
+            raise ValueError(unknown_subcode_message(rows[unknown]))
+
+        years = rows[Fields.DATE_TIME.value].dt.year
+        if years.min() < 2010:
+            raise ValueError("Date is less than the year 2010. That's very improbable")
+        if years.max() > 2100:
+            raise ValueError("Date is bigger than 2100. That's very improbable")
+
+        usd = rows[Fields.AMOUNT.value].to_numpy(dtype=float)
+        eur = rows[Fields.AMOUNT_EURO.value].to_numpy(dtype=float)
+        groups = pd.Series(usd).groupby([years.to_numpy(), fields.to_numpy()]).indices
+        fixed = self.fixed_point
+        if fixed:
+            usd, eur = to_units_array(usd), to_units_array(eur)
+        for (year, field), index in sorted(groups.items()):
+            year_values = self.year(int(year))
+            total = getattr(year_values, field)
+            m = Money(fixed=fixed)
+            if fixed:
+                m.usd = from_units(to_units(total.usd) + int(usd[index].sum()))
+                m.eur = from_units(to_units(total.eur) + int(eur[index].sum()))
+            else:
+                m.usd = float(np.add.accumulate(np.concatenate([[total.usd], usd[index]]))[-1])
+                m.eur = float(np.add.accumulate(np.concatenate([[total.eur], eur[index]]))[-1])
+            setattr(year_values, field, m)
 
     def print(self):
         for key, value in self.yearValues.items():
             print("Year " + str(key) + ":")
             print(value)
 
-    def processTransactionHistory(self):
-        chronological_history = self.history.sort_values(
-            by=Fields.DATE_TIME.value, ascending=True, kind="stable"
-        )
-        for _, row in chronological_history.iterrows():
-            transaction_code = row.loc["Transaction Code"]
-            if transaction_code == TransactionCode.MONEY_MOVEMENT.value:
-                self.moneyMovement(row)
-            elif transaction_code in {
-                TransactionCode.TRADE.value,
-                TransactionCode.RECEIVE_DELIVER.value,
-            }:
-                self.position_manager.add_position(Transaction(row))
+    def processTransactionHistory(self, history=None, workers: int | None = 1):
+        """Feeds the rows to the money movement and position handlers in time order.
 
-    def getYearlyTrades(self):
-        if not self.position_manager.closed_trades:
-            return {}
+        Every History loader returns chronological frames, so sorting is only
+        done when the frame is not already in order. Money movements are booked
+        in one vectorized pass; position rows are read as plain tuples into the
+        lighter TransactionRecord. Frames with derived columns register their
+        instruments up front, so each record already carries its instrument id.
+        `workers` is passed on to processPositions.
+        """
+        history = self._chronological(self.history if history is None else history)
+        self.moneyMovements(history)
+        self.processPositions(self._positionRows(history), workers)
 
-        from datetime import datetime
-        from collections import defaultdict
+    @staticmethod
+    def _chronological(history):
+        if history[Fields.DATE_TIME.value].is_monotonic_increasing:
+            return history
+        return history.sort_values(by=Fields.DATE_TIME.value, ascending=True, kind="stable")
 
-        trades_by_year = defaultdict(list)
-        for trade in self.position_manager.closed_trades:
-            if isinstance(trade.closing_date, str):
-                year = datetime.strptime(trade.closing_date, "%Y-%m-%d %H:%M:%S").year
-            else:
-                year = trade.closing_date.year
-            trades_by_year[year].append(trade)
+    @staticmethod
+    def _positionRows(history):
+        return history[history[Fields.TRANSACTION_CODE.value].isin([
+            TransactionCode.TRADE.value,
+            TransactionCode.RECEIVE_DELIVER.value,
+        ]).to_numpy()]
+
+    def processPositions(self, positions, workers: int | None = 1):
+        """Feeds chronological Trade and Receive Deliver rows to the position manager.
 
-        return dict(trades_by_year)
+        With more than one worker, frames with derived columns are split into
+        groups of symbols that never share lots and processed in a process
+        pool, with the same closed trades as feeding them one by one.
+        """
+        if Fields.INSTRUMENT_KEY.value not in positions.columns:
+            instrument_ids = None
+        elif workers != 1:
+            process_partitioned(self.position_manager, positions, workers)
+            return
+        else:
+            instrument_ids = self.position_manager.instruments.register(positions)
+        for record in records(positions, instrument_ids):
+            self.position_manager.add_position(record)
+
+    def runStreaming(self, path, chunksize=50_000, presorted=False, trade_sink=None):
+        """Processes an export chunk by chunk with memory bounded by the open lots.
+
+        The history is never held in full. Every FIFO match is folded into
+        the per-year values as it happens. `trade_sink`, if given, receives
+        each chunk's closed trades, e.g. to append them to a file, which are
+        then dropped; without it no TradeResult is built at all. Returns the
+        same per-year values as run().
+        """
+        aggregator = YearlyTradeAggregator(self.classifier, self.fixed_point)
+        with self._aggregating(aggregator, keep_trades=trade_sink is not None):
+            for chunk in History.iterChunks(path, chunksize=chunksize, presorted=presorted,
+                                            fx_provider=self.fx_provider):
+                self.processTransactionHistory(chunk)
+                closed_trades = self.position_manager.closed_trades
+                if closed_trades:
+                    trade_sink(closed_trades)
+                    closed_trades.clear()
+        return self._bookTotals(aggregator)
+
+    def runTotals(self, workers: int | None = 1):
+        """run() without keeping the closed trades.
+
+        A YearlyTradeAggregator observes the position manager and folds each
+        FIFO match into its year as it happens, so no TradeResult is built.
+        The values are the same as those of run().
+        """
+        aggregator = YearlyTradeAggregator(self.classifier, self.fixed_point)
+        aggregator.add_all(self.position_manager.closed_trades)
+        with self._aggregating(aggregator, keep_trades=False):
+            self.processTransactionHistory(workers=workers)
+        return self._bookTotals(aggregator)
+
+    @contextmanager
+    def _aggregating(self, aggregator, keep_trades: bool):
+        position_manager = self.position_manager
+        position_manager.observers.append(aggregator)
+        position_manager.keep_trades = keep_trades
+        try:
+            yield aggregator
+        finally:
+            position_manager.observers.remove(aggregator)
+            position_manager.keep_trades = True
+
+    def getYearlyTrades(self):
+        trades_by_year = {}
+        for trade in self.position_manager.closed_trades:
+            trades_by_year.setdefault(trade.tax_year, []).append(trade)
+        return trades_by_year
 
     def _checkAssetClassifications(self, trades):
         stock_trades = get_stock_trades(trades)
@@ -128,65 +290,101 @@ class Tasty:
         unique_symbols = list(set(trade.symbol for trade in stock_trades))
         self.classifier.check_unsupported_assets(unique_symbols)
 
-    def run(self):
-        self.processTransactionHistory()
+    def run(self, workers: int | None = 1):
+        self.processTransactionHistory(workers=workers)
+        return self._bookTrades()
 
-        trades_by_year = self.getYearlyTrades()
-        fees = {
-            year: -calculate_fees_sum(trades) for year, trades in trades_by_year.items()
-        }
+    def runPipeline(self, workers: int | None = 2):
+        """run() with the money movements booked while the positions are processed.
 
-        years = set(self.yearValues.keys()) | set(trades_by_year.keys())
+        The history is split into its Money Movement rows and its Trade and
+        Receive Deliver rows, which are independent until the per-year values
+        are filled in. The positions go through processPositions with
+        `workers`, i.e. in a process pool for groups of symbols that never
+        share lots, and the money movements are booked in a thread of this
+        process while it waits for the pool. The money movement contributions
+        are then added per year and the trade statistics computed as in run(),
+        with identical results. `workers=1` processes both streams one after
+        the other in this process. The seconds spent per stage are kept in
+        `self.timings`.
+        """
+        timings = {}
+        start = time.perf_counter()
+        history = self._chronological(self.history)
+        money_rows = history[history[Fields.TRANSACTION_CODE.value] == TransactionCode.MONEY_MOVEMENT.value]
+        position_rows = self._positionRows(history)
+        timings['split'] = time.perf_counter() - start
 
-        for key in sorted(years):
-            values_obj = self.year(key)
-            m = Money()
-            if key in fees:
-                m.usd = fees[key].usd
-                m.eur = fees[key].eur
-            values_obj.fee += m
+        overlap_start = time.perf_counter()
+        if workers == 1:
+            year_values, timings['money movements'] = _book_money_movements(money_rows, self.fixed_point)
+            timings['positions'] = self._timedPositions(position_rows, workers)
+        else:
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                money = pool.submit(_book_money_movements, money_rows, self.fixed_point)
+                timings['positions'] = self._timedPositions(position_rows, workers)
+                year_values, timings['money movements'] = money.result()
+        timings['concurrent'] = time.perf_counter() - overlap_start
+
+        for year, contribution in sorted(year_values.items()):
+            values_obj = self.year(year)
+            for field in MONEY_MOVEMENT_FIELDS:
+                setattr(values_obj, field, getattr(values_obj, field) + getattr(contribution, field))
+
+        with_trades = time.perf_counter()
+        ret = self._bookTrades()
+        timings['trade statistics'] = time.perf_counter() - with_trades
+        timings['total'] = time.perf_counter() - start
+        self.timings = timings
+        logger.info("Pipeline stages: " + ", ".join(f"{name} {seconds:.3f} s" for name, seconds in timings.items()))
+        return ret
+
+    def _timedPositions(self, positions, workers):
+        """Pipeline stage: processPositions, returning its seconds"""
+        start = time.perf_counter()
+        self.processPositions(positions, workers)
+        return time.perf_counter() - start
+
+    def bookedValues(self):
+        """The per-year values run() would return for the rows processed so far.
+
+        Only a copy is booked, so more rows can be processed afterwards.
+        """
+        money_movements = self.yearValues
+        self.yearValues = copy.deepcopy(money_movements)
+        try:
+            return self._bookTrades()
+        finally:
+            self.yearValues = money_movements
+
+    def _bookTrades(self):
+        return self._bookTotals(TradeStore(self.position_manager.closed_trades, self.classifier,
+                                           fixed_point=self.fixed_point))
+
+    def _bookTotals(self, store):
+        """Books the per-year trade totals of a TradeStore or an aggregator into the values"""
+        years = (set(self.yearValues.keys()) | store.years()) - self._closedYears
 
         ret = dict()
         for key in sorted(years):
-            yearly_trades = trades_by_year.get(key, [])
-            self._checkAssetClassifications(yearly_trades)
-            values_obj = self.year(key)
+            ret[key] = self._bookYear(self.year(key), store, key)
 
-            values_obj.stockAndOptionsSum = calculate_combined_sum(yearly_trades)
-            values_obj.equityEtfGrossProfits = calculate_gross_equity_etf_profits(
-                yearly_trades, self.classifier
-            )
-            values_obj.equityEtfProfits = calculate_equity_etf_profits(
-                yearly_trades, self.classifier
-            )
-            values_obj.otherStockAndBondProfits = (
-                calculate_other_stock_and_bond_profits(yearly_trades, self.classifier)
-            )
-            values_obj.stockAndEtfLosses = calculate_stock_loss(yearly_trades)
+        for key in self._closedYears:
+            ret[key] = self.yearValues[key]
+        ret = dict(sorted(ret.items()))
 
-            values_obj.totalTaxableStockAndEtfProfits = Money(
-                usd=values_obj.equityEtfProfits.usd
-                + values_obj.otherStockAndBondProfits.usd,
-                eur=values_obj.equityEtfProfits.eur
-                + values_obj.otherStockAndBondProfits.eur,
-            )
+        return ret
 
-            values_obj.optionSum = calculate_option_sum(yearly_trades)
-            values_obj.longOptionProfits = calculate_long_option_profits(yearly_trades)
-            values_obj.longOptionLosses = calculate_long_option_losses(yearly_trades)
-            values_obj.longOptionTotalLosses = calculate_long_option_total_losses(
-                yearly_trades
-            )
-            values_obj.shortOptionProfits = calculate_short_option_profits(
-                yearly_trades
-            )
-            values_obj.shortOptionLosses = calculate_short_option_losses(yearly_trades)
-            values_obj.grossOptionDifferential = calculate_option_differential(
-                yearly_trades
-            )
-            values_obj.stockFees = -calculate_stock_fees(yearly_trades)
-            values_obj.otherFees = -calculate_other_fees(yearly_trades)
+    @staticmethod
+    def _bookYear(values_obj, store, year):
+        """Adds the fees and the trade statistics of one year of a TradeStore or an aggregator to its values"""
+        values_obj.fee += store.fees(year)
+        return store.apply(year, values_obj)
 
-            ret[key] = values_obj
 
-        return ret
+def _book_money_movements(rows, fixed_point=False):
+    """Pipeline stage: the per-year values of the money movements alone"""
+    start = time.perf_counter()
+    t = Tasty(fixed_point=fixed_point)
+    t.moneyMovements(rows)
+    return t.yearValues, time.perf_counter() - start
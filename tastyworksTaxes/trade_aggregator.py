@@ -0,0 +1,163 @@
+from collections import defaultdict
+import logging
+from tastyworksTaxes.fixed_point import allocate, from_units, to_units
+from tastyworksTaxes.money import Money
+from tastyworksTaxes.position import PositionType
+from tastyworksTaxes.fifo_processor import TradeResult
+
+logger = logging.getLogger(__name__)
+
+TRADE_FIELDS = [
+    'combined', 'option', 'longOptionProfits', 'longOptionLosses', 'longOptionTotalLosses',
+    'shortOptionProfits', 'shortOptionLosses', 'optionLosses', 'optionProfits',
+    'stockLoss', 'stockFees', 'otherFees', 'fees',
+    'equityEtfGross', 'equityEtf', 'otherStock',
+]
+
+
+class YearlyTotals:
+    """Per-year sums of the TRADE_FIELDS and how they are booked into Values.
+
+    With `fixed_point` the sums are integer units, converted to fixed Money
+    only when they are booked.
+    """
+
+    def __init__(self, classifier, fixed_point: bool = False):
+        self.classifier = classifier
+        self.fixed = fixed_point
+        self.totals: dict[int, dict[str, list]] = {}
+        self.option_trade_count: dict[int, int] = defaultdict(int)
+        self.stock_symbols: dict[int, dict[str, None]] = defaultdict(dict)
+
+    def years(self) -> set:
+        return set(self.totals.keys())
+
+    def fees(self, year) -> Money:
+        """Trade fees of a year, with the sign Tasty.run books into Values.fee"""
+        if year not in self.totals:
+            return Money(fixed=self.fixed)
+        usd, eur = self.totals[year]['fees']
+        return self._money(-usd, -eur)
+
+    def _money(self, usd, eur) -> Money:
+        if self.fixed:
+            return Money(usd=from_units(usd), eur=from_units(eur), fixed=True)
+        return Money(usd=usd, eur=eur)
+
+    def _zero(self):
+        return [0, 0] if self.fixed else [0.0, 0.0]
+
+    def apply(self, year, values_obj):
+        """Writes the trade derived fields of a year into a Values object"""
+        if year not in self.totals:
+            totals = {field: self._zero() for field in TRADE_FIELDS}
+        else:
+            totals = self.totals[year]
+            if self.classifier is not None:
+                self.classifier.check_unsupported_assets(list(self.stock_symbols[year]))
+
+        def money(field):
+            return self._money(*totals[field])
+
+        values_obj.stockAndOptionsSum = money('combined')
+        values_obj.equityEtfGrossProfits = money('equityEtfGross')
+        values_obj.equityEtfProfits = money('equityEtf')
+        values_obj.otherStockAndBondProfits = money('otherStock')
+        values_obj.stockAndEtfLosses = money('stockLoss')
+        values_obj.totalTaxableStockAndEtfProfits = self._money(
+            *(etf + other for etf, other in zip(totals['equityEtf'], totals['otherStock'])))
+        values_obj.optionSum = money('option')
+        values_obj.longOptionProfits = money('longOptionProfits')
+        values_obj.longOptionLosses = money('longOptionLosses')
+        values_obj.longOptionTotalLosses = money('longOptionTotalLosses')
+        values_obj.shortOptionProfits = money('shortOptionProfits')
+        values_obj.shortOptionLosses = money('shortOptionLosses')
+        if self.option_trade_count[year]:
+            losses, profits = money('optionLosses'), money('optionProfits')
+            values_obj.grossOptionDifferential = Money(
+                usd=min(abs(losses.usd), abs(profits.usd)),
+                eur=min(abs(losses.eur), abs(profits.eur)),
+                fixed=self.fixed,
+            )
+        else:
+            values_obj.grossOptionDifferential = Money(fixed=self.fixed)
+        values_obj.stockFees = -money('stockFees')
+        values_obj.otherFees = -money('otherFees')
+        return values_obj
+
+
+class YearlyTradeAggregator(YearlyTotals):
+    """Folds closed trades into per-year running sums as they are produced.
+
+    Gives the same numbers as running the trade_calculator functions over the
+    full per-year trade lists, without keeping the trades around.
+    """
+
+    @staticmethod
+    def trade_year(trade: TradeResult) -> int:
+        return trade.tax_year
+
+    def _add(self, totals, field, usd, eur):
+        totals[field][0] += usd
+        totals[field][1] += eur
+
+    def add(self, trade: TradeResult):
+        year = self.trade_year(trade)
+        if year not in self.totals:
+            self.totals[year] = {field: self._zero() for field in TRADE_FIELDS}
+        totals = self.totals[year]
+        profit_usd, profit_eur, fees_usd, fees_eur = trade.profit_usd, trade.profit_eur, trade.fees_usd, trade.fees_eur
+        if self.fixed:
+            profit_usd, profit_eur = to_units(profit_usd), to_units(profit_eur)
+            fees_usd, fees_eur = to_units(fees_usd), to_units(fees_eur)
+        profitable = profit_eur > 0
+
+        self._add(totals, 'combined', profit_usd, profit_eur)
+        self._add(totals, 'fees', fees_usd, fees_eur)
+
+        if trade.position_type in [PositionType.call, PositionType.put]:
+            self.option_trade_count[year] += 1
+            self._add(totals, 'option', profit_usd, profit_eur)
+            self._add(totals, 'otherFees', fees_usd, fees_eur)
+            self._add(totals, 'optionProfits' if profitable else 'optionLosses',
+                      profit_usd, profit_eur)
+            if trade.quantity > 0:
+                if trade.worthless_expiry:
+                    if not profitable:
+                        self._add(totals, 'longOptionTotalLosses', profit_usd, profit_eur)
+                else:
+                    self._add(totals, 'longOptionProfits' if profitable else 'longOptionLosses',
+                              profit_usd, profit_eur)
+            elif trade.quantity < 0:
+                self._add(totals, 'shortOptionProfits' if profitable else 'shortOptionLosses',
+                          profit_usd, profit_eur)
+
+        elif trade.position_type == PositionType.stock:
+            self.stock_symbols[year][trade.symbol] = None
+            self._add(totals, 'stockFees', fees_usd, fees_eur)
+            if not profitable:
+                self._add(totals, 'stockLoss', profit_usd - fees_usd,
+                          profit_eur - fees_eur)
+                return
+
+            classification = self.classifier.classify(trade.symbol, trade.position_type)
+            if classification == 'EQUITY_ETF':
+                self._add(totals, 'equityEtfGross', profit_usd, profit_eur)
+                exemption_pct = self.classifier.get_exemption_percentage(classification)
+                if self.fixed:
+                    self._add(totals, 'equityEtf',
+                              allocate(profit_usd - fees_usd, 100 - exemption_pct, 100),
+                              allocate(profit_eur - fees_eur, 100 - exemption_pct, 100))
+                else:
+                    taxable_portion = 1.0 - (exemption_pct / 100.0)
+                    self._add(totals, 'equityEtf',
+                              (profit_usd - fees_usd) * taxable_portion,
+                              (profit_eur - fees_eur) * taxable_portion)
+            else:
+                self._add(totals, 'otherStock', profit_usd - fees_usd,
+                          profit_eur - fees_eur)
+
+    def add_all(self, trades):
+        for trade in trades:
+            self.add(trade)
+
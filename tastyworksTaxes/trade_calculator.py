@@ -1,8 +1,11 @@
 from typing import List
 import logging
+import numpy as np
 from tastyworksTaxes.money import Money
 from tastyworksTaxes.position import PositionType
 from tastyworksTaxes.fifo_processor import TradeResult
+from tastyworksTaxes.trade_store import TradeStore
+from tastyworksTaxes.values import Values
 
 logger = logging.getLogger(__name__)
 
@@ -46,148 +49,58 @@ def get_worthless_expiry_trades(trades: List[TradeResult]) -> List[TradeResult]:
 def get_non_worthless_expiry_trades(trades: List[TradeResult]) -> List[TradeResult]:
     return [t for t in trades if not t.worthless_expiry]
 
-def calculate_combined_sum(trades: List[TradeResult]) -> Money:
-    return sum_money_from_trades(trades)
+def _store(trades: List[TradeResult], classifier=None, fixed_point=False) -> TradeStore:
+    """All `trades` as a single group of a TradeStore"""
+    return TradeStore(trades, classifier, years=np.zeros(len(trades), dtype=int), fixed_point=fixed_point)
 
-def calculate_option_sum(trades: List[TradeResult]) -> Money:
-    option_trades = get_option_trades(trades)
-    return sum_money_from_trades(option_trades)
+def _sum_field(trades: List[TradeResult], field: str, classifier=None, fixed_point=False) -> Money:
+    """One field of the totals of `trades`; with `fixed_point` summed as units, as Tasty(fixed_point=True) books it"""
+    store = _store(trades, classifier, fixed_point)
+    if not store.totals:
+        return Money(fixed=fixed_point)
+    return store._money(*store.totals[0][field])
 
-def calculate_long_option_profits(trades: List[TradeResult]) -> Money:
-    filtered_trades = get_long_trades(
-        get_profitable_trades(
-            get_non_worthless_expiry_trades(
-                get_option_trades(trades)
-            )
-        )
-    )
-    return sum_money_from_trades(filtered_trades)
-
-def calculate_long_option_losses(trades: List[TradeResult]) -> Money:
-    filtered_trades = get_long_trades(
-        get_loss_trades(
-            get_non_worthless_expiry_trades(
-                get_option_trades(trades)
-            )
-        )
-    )
-    return sum_money_from_trades(filtered_trades)
-
-def calculate_long_option_total_losses(trades: List[TradeResult]) -> Money:
-    filtered_trades = get_long_trades(
-        get_loss_trades(
-            get_worthless_expiry_trades(
-                get_option_trades(trades)
-            )
-        )
-    )
-    return sum_money_from_trades(filtered_trades)
-
-def calculate_short_option_profits(trades: List[TradeResult]) -> Money:
-    filtered_trades = get_short_trades(
-        get_profitable_trades(
-            get_option_trades(trades)
-        )
-    )
-    return sum_money_from_trades(filtered_trades)
-
-def calculate_short_option_losses(trades: List[TradeResult]) -> Money:
-    filtered_trades = get_short_trades(
-        get_loss_trades(
-            get_option_trades(trades)
-        )
-    )
-    return sum_money_from_trades(filtered_trades)
-
-def calculate_option_differential(trades: List[TradeResult]) -> Money:
-    option_trades = get_option_trades(trades)
-    
-    if not option_trades:
-        return Money()
-    
-    negative_sum = sum_money_from_trades(get_loss_trades(option_trades))
-    positive_sum = sum_money_from_trades(get_profitable_trades(option_trades))
-    
-    return Money(
-        usd=min(abs(negative_sum.usd), abs(positive_sum.usd)),
-        eur=min(abs(negative_sum.eur), abs(positive_sum.eur))
-    )
-
-def calculate_stock_loss(trades: List[TradeResult]) -> Money:
-    filtered_trades = get_loss_trades(get_stock_trades(trades))
-    if not filtered_trades:
-        return Money()
-    return Money(
-        usd=sum(t.profit_usd - t.fees_usd for t in filtered_trades),
-        eur=sum(t.profit_eur - t.fees_eur for t in filtered_trades)
-    )
+def calculate_combined_sum(trades: List[TradeResult], fixed_point=False) -> Money:
+    return _sum_field(trades, 'combined', fixed_point=fixed_point)
 
-def calculate_stock_fees(trades: List[TradeResult]) -> Money:
-    stock_trades = get_stock_trades(trades)
-    return sum_fees_from_trades(stock_trades)
+def calculate_option_sum(trades: List[TradeResult], fixed_point=False) -> Money:
+    return _sum_field(trades, 'option', fixed_point=fixed_point)
 
-def calculate_other_fees(trades: List[TradeResult]) -> Money:
-    option_trades = get_option_trades(trades)
-    return sum_fees_from_trades(option_trades)
+def calculate_long_option_profits(trades: List[TradeResult], fixed_point=False) -> Money:
+    return _sum_field(trades, 'longOptionProfits', fixed_point=fixed_point)
 
-def calculate_fees_sum(trades: List[TradeResult]) -> Money:
-    return sum_fees_from_trades(trades)
+def calculate_long_option_losses(trades: List[TradeResult], fixed_point=False) -> Money:
+    return _sum_field(trades, 'longOptionLosses', fixed_point=fixed_point)
 
-def calculate_gross_equity_etf_profits(trades: List[TradeResult], classifier) -> Money:
-    profitable_stock_trades = get_profitable_trades(get_stock_trades(trades))
-    if not profitable_stock_trades:
-        return Money()
-    
-    total_eur = 0.0
-    total_usd = 0.0
-    
-    for trade in profitable_stock_trades:
-        classification = classifier.classify(trade.symbol, trade.position_type)
-        
-        if classification == 'EQUITY_ETF':
-            total_eur += trade.profit_eur
-            total_usd += trade.profit_usd
-    
-    return Money(usd=total_usd, eur=total_eur)
-
-def calculate_equity_etf_profits(trades: List[TradeResult], classifier) -> Money:
-    profitable_stock_trades = get_profitable_trades(get_stock_trades(trades))
-    if not profitable_stock_trades:
-        return Money()
-
-    total_taxable_eur = 0.0
-    total_taxable_usd = 0.0
+def calculate_long_option_total_losses(trades: List[TradeResult], fixed_point=False) -> Money:
+    return _sum_field(trades, 'longOptionTotalLosses', fixed_point=fixed_point)
 
-    for trade in profitable_stock_trades:
-        classification = classifier.classify(trade.symbol, trade.position_type)
+def calculate_short_option_profits(trades: List[TradeResult], fixed_point=False) -> Money:
+    return _sum_field(trades, 'shortOptionProfits', fixed_point=fixed_point)
 
-        if classification == 'EQUITY_ETF':
-            exemption_pct = classifier.get_exemption_percentage(classification)
-            taxable_portion = 1.0 - (exemption_pct / 100.0)
+def calculate_short_option_losses(trades: List[TradeResult], fixed_point=False) -> Money:
+    return _sum_field(trades, 'shortOptionLosses', fixed_point=fixed_point)
 
-            net_profit_eur = trade.profit_eur - trade.fees_eur
-            net_profit_usd = trade.profit_usd - trade.fees_usd
+def calculate_option_differential(trades: List[TradeResult], fixed_point=False) -> Money:
+    return _store(trades, fixed_point=fixed_point).apply(0, Values()).grossOptionDifferential
 
-            total_taxable_eur += net_profit_eur * taxable_portion
-            total_taxable_usd += net_profit_usd * taxable_portion
+def calculate_stock_loss(trades: List[TradeResult], fixed_point=False) -> Money:
+    return _sum_field(trades, 'stockLoss', fixed_point=fixed_point)
 
-            logger.debug(f"Applied {exemption_pct}% Teilfreistellung to {trade.symbol}")
+def calculate_stock_fees(trades: List[TradeResult], fixed_point=False) -> Money:
+    return _sum_field(trades, 'stockFees', fixed_point=fixed_point)
 
-    return Money(usd=total_taxable_usd, eur=total_taxable_eur)
-
-def calculate_other_stock_and_bond_profits(trades: List[TradeResult], classifier) -> Money:
-    profitable_stock_trades = get_profitable_trades(get_stock_trades(trades))
-    if not profitable_stock_trades:
-        return Money()
+def calculate_other_fees(trades: List[TradeResult], fixed_point=False) -> Money:
+    return _sum_field(trades, 'otherFees', fixed_point=fixed_point)
 
-    total_eur = 0.0
-    total_usd = 0.0
+def calculate_fees_sum(trades: List[TradeResult], fixed_point=False) -> Money:
+    return _sum_field(trades, 'fees', fixed_point=fixed_point)
 
-    for trade in profitable_stock_trades:
-        classification = classifier.classify(trade.symbol, trade.position_type)
+def calculate_gross_equity_etf_profits(trades: List[TradeResult], classifier, fixed_point=False) -> Money:
+    return _sum_field(trades, 'equityEtfGross', classifier, fixed_point)
 
-        if classification not in ['EQUITY_ETF']:
-            total_eur += trade.profit_eur - trade.fees_eur
-            total_usd += trade.profit_usd - trade.fees_usd
+def calculate_equity_etf_profits(trades: List[TradeResult], classifier, fixed_point=False) -> Money:
+    return _sum_field(trades, 'equityEtf', classifier, fixed_point)
 
-    return Money(usd=total_usd, eur=total_eur)
\ No newline at end of file
+def calculate_other_stock_and_bond_profits(trades: List[TradeResult], classifier, fixed_point=False) -> Money:
+    return _sum_field(trades, 'otherStock', classifier, fixed_point)
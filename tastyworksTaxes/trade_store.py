@@ -0,0 +1,123 @@
+"""Closed trades as columns, with all per-year statistics from one grouped sum.
+
+Every trade-derived field of Values is a sum over the trades selected by a
+few flags (option or stock, long or short, profitable, worthless expiry,
+equity ETF). TradeStore keeps those flags and the amounts as NumPy arrays,
+turns each field into a boolean mask and sums all (year, field) groups with
+a single bincount. bincount adds the weights in input order, so every sum
+is bit-identical to the left-to-right sums of the trade_calculator loops.
+With fixed point the amounts are int64 units and the groups are summed
+exactly with np.add.at.
+"""
+import numpy as np
+import pandas as pd
+
+from tastyworksTaxes.fixed_point import allocate_array, to_units_array
+from tastyworksTaxes.position import PositionType
+from tastyworksTaxes.trade_aggregator import TRADE_FIELDS, YearlyTotals
+
+
+class TradeStore(YearlyTotals):
+    """Columnar closed trades and their per-year totals.
+
+    `years` overrides the year of each trade, e.g. a single 0 group for the
+    totals of a plain list. Without a classifier no trade counts as an equity
+    ETF. `fixed_point` sums the amounts as integer units.
+    """
+
+    def __init__(self, trades, classifier=None, years=None, fixed_point: bool = False):
+        super().__init__(classifier, fixed_point)
+        self.trades = trades
+        count = len(trades)
+
+        def column(attribute, dtype=float):
+            return np.fromiter((getattr(trade, attribute) for trade in trades), dtype=dtype, count=count)
+
+        self.symbol = np.array([trade.symbol for trade in trades], dtype=object)
+        position_types = np.array([trade.position_type for trade in trades], dtype=object)
+        self.option = (position_types == PositionType.call) | (position_types == PositionType.put)
+        self.stock = position_types == PositionType.stock
+        self.quantity = column('quantity')
+        self.profit_usd = column('profit_usd')
+        self.profit_eur = column('profit_eur')
+        self.fees_usd = column('fees_usd')
+        self.fees_eur = column('fees_eur')
+        self.worthless_expiry = column('worthless_expiry', bool)
+        self.year = np.fromiter((trade.tax_year for trade in trades), dtype=int, count=count) if years is None else np.asarray(years, dtype=int)
+        self.classification = np.array([trade.position_type.name.upper() for trade in trades], dtype=object)
+        self.classification[self.stock] = 'INDIVIDUAL_STOCK'
+        self.taxable_portion = np.ones(count)
+        self.taxable_percent = np.full(count, 100, dtype=np.int64)
+        if classifier is not None and self.stock.any():
+            classifications = classifier.classify_many(self.symbol[self.stock])
+            codes, categories = pd.factorize(classifications)
+            exemptions = np.array([classifier.get_exemption_percentage(category) for category in categories],
+                                  dtype=np.int64)
+            portions = np.array([1.0 - (exemption / 100.0) for exemption in exemptions.tolist()])
+            self.classification[self.stock] = classifications
+            self.taxable_portion[self.stock] = portions[codes]
+            self.taxable_percent[self.stock] = 100 - exemptions[codes]
+        if self.fixed:
+            self.profit_usd, self.profit_eur, self.fees_usd, self.fees_eur = (
+                to_units_array(amounts) for amounts in (self.profit_usd, self.profit_eur, self.fees_usd, self.fees_eur))
+        self._sum()
+
+    def _masks(self) -> dict:
+        """Per field: the trades it sums and whether it is of profits, fees, or profits net of fees"""
+        profitable = self.profit_eur > 0
+        long, short = self.quantity > 0, self.quantity < 0
+        option, stock, worthless = self.option, self.stock, self.worthless_expiry
+        equity_etf = stock & profitable & (self.classification == 'EQUITY_ETF')
+        return {
+            'combined': (np.ones_like(option), 'profit'),
+            'option': (option, 'profit'),
+            'longOptionProfits': (option & ~worthless & profitable & long, 'profit'),
+            'longOptionLosses': (option & ~worthless & ~profitable & long, 'profit'),
+            'longOptionTotalLosses': (option & worthless & ~profitable & long, 'profit'),
+            'shortOptionProfits': (option & profitable & short, 'profit'),
+            'shortOptionLosses': (option & ~profitable & short, 'profit'),
+            'optionLosses': (option & ~profitable, 'profit'),
+            'optionProfits': (option & profitable, 'profit'),
+            'stockLoss': (stock & ~profitable, 'net'),
+            'stockFees': (stock, 'fees'),
+            'otherFees': (option, 'fees'),
+            'fees': (np.ones_like(option), 'fees'),
+            'equityEtfGross': (equity_etf, 'profit'),
+            'equityEtf': (equity_etf, 'taxable'),
+            'otherStock': (stock & profitable & ~equity_etf, 'net'),
+        }
+
+    def _sum(self) -> None:
+        net = (self.profit_usd - self.fees_usd, self.profit_eur - self.fees_eur)
+        if self.fixed:
+            taxable = tuple(allocate_array(amounts, self.taxable_percent, 100) for amounts in net)
+        else:
+            taxable = tuple(amounts * self.taxable_portion for amounts in net)
+        amounts = {
+            'profit': (self.profit_usd, self.profit_eur),
+            'fees': (self.fees_usd, self.fees_eur),
+            'net': net,
+            'taxable': taxable,
+        }
+        years, year_codes = np.unique(self.year, return_inverse=True)
+        masks = self._masks()
+        groups = np.concatenate([year_codes[masks[field][0]] * len(TRADE_FIELDS) + number
+                                 for number, field in enumerate(TRADE_FIELDS)])
+        size = len(years) * len(TRADE_FIELDS)
+        sums = []
+        for currency in (0, 1):
+            weights = np.concatenate([amounts[masks[field][1]][currency][masks[field][0]] for field in TRADE_FIELDS])
+            if self.fixed:
+                currency_sums = np.zeros(size, dtype=np.int64)
+                np.add.at(currency_sums, groups, weights)
+            else:
+                currency_sums = np.bincount(groups, minlength=size, weights=weights)
+            sums.append(currency_sums.reshape(len(years), len(TRADE_FIELDS)).tolist())
+
+        option_counts = np.bincount(year_codes, weights=self.option, minlength=len(years))
+        for code, year in enumerate(years.tolist()):
+            self.totals[year] = {field: [sums[0][code][number], sums[1][code][number]]
+                                 for number, field in enumerate(TRADE_FIELDS)}
+            self.option_trade_count[year] = int(option_counts[code])
+            self.stock_symbols[year] = dict.fromkeys(self.symbol[self.stock & (year_codes == code)])
+
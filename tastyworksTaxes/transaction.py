@@ -1,9 +1,30 @@
+import itertools
 from datetime import datetime
 import pandas as pd
 from io import StringIO
-from tastyworksTaxes.money import Money, convert_usd_to_eur
+from tastyworksTaxes.money import Money
 from tastyworksTaxes.position import PositionType
 
+QUANTITY_SIGNS = {
+    "Buy to Open": 1,
+    "Buy to Close": 1,
+    "Sell to Open": -1,
+    "Sell to Close": -1,
+    "Assignment": 1,
+    "Expiration": 1
+}
+
+
+def _quantity_sign(subcode: str, buy_sell: str) -> int:
+    if subcode in ["Reverse Split", "Symbol Change", "Stock Merger"]:
+        return 1 if buy_sell == "Buy" else -1
+
+    try:
+        return QUANTITY_SIGNS[subcode]
+    except KeyError as exc:
+        raise ValueError(f"Invalid Transaction Subcode: {subcode}") from exc
+
+
 class Transaction(pd.core.series.Series):
 
     def __init__(self, *args, **kwargs):
@@ -31,13 +52,6 @@ class Transaction(pd.core.series.Series):
     def fromString(cls, line: str):
         from tastyworksTaxes.history import History
 
-        def addEuroConversion(df):
-            df['Date/Time'] = pd.to_datetime(df['Date/Time'])
-            df['Expiration Date'] = pd.to_datetime(df['Expiration Date'])
-
-            df['AmountEuro'] = df.apply(lambda row: convert_usd_to_eur(row['Amount'], row['Date/Time']), axis=1)
-            df['FeesEuro'] = df.apply(lambda row: convert_usd_to_eur(row['Fees'], row['Date/Time']), axis=1)
-
         header = "Date,Type,Sub Type,Action,Symbol,Instrument Type,Description,Value,Quantity,Average Price,Commissions,Fees,Multiplier,Root Symbol,Underlying Symbol,Expiration Date,Strike Price,Call or Put,Order #,Currency"
         csv = header + "\n" + line
 
@@ -46,10 +60,10 @@ class Transaction(pd.core.series.Series):
         except pd.errors.ParserError as e:
             raise ValueError(f"Could not parse '{line}' as Transaction. Original error: {str(e)}") from e
 
-        df = History._transform(df_raw)
+        df = History(History._transform(df_raw))
         df['Amount'] = df['Amount'].replace('', '0').astype(float)
 
-        addEuroConversion(df)
+        df.addEuroConversion()
         return Transaction(df.squeeze())
 
     def getYear(self) -> str:
@@ -99,31 +113,13 @@ class Transaction(pd.core.series.Series):
             raise ValueError(f"Couldn't identify if it is stock, call or put. Entry was '{self}")
 
     def getQuantity(self) -> int:
-        def get_sign_based_on_subcode(subcode: str, buy_sell: str) -> int:
-            sign_mapping = {
-                "Buy to Open": 1,
-                "Buy to Close": 1,
-                "Sell to Open": -1,
-                "Sell to Close": -1,
-                "Assignment": 1,
-                "Expiration": 1
-            }
-
-            if subcode in ["Reverse Split", "Symbol Change", "Stock Merger"]:
-                return 1 if buy_sell == "Buy" else -1
-
-            try:
-                return sign_mapping[subcode]
-            except KeyError as exc:
-                raise ValueError(f"Invalid Transaction Subcode: {subcode}") from exc
-
         valid_transaction_codes = ["Trade", "Receive Deliver"]
         if self.loc["Transaction Code"] not in valid_transaction_codes:
             raise KeyError(f"Invalid Transaction Code: {self.loc['Transaction Code']}")
 
         subcode = self.loc["Transaction Subcode"]
         buy_sell = self.loc["Buy/Sell"]
-        sign = get_sign_based_on_subcode(subcode, buy_sell)
+        sign = _quantity_sign(subcode, buy_sell)
         quantity = self.loc["Quantity"]
 
         return int(sign * quantity)
@@ -181,3 +177,223 @@ class Transaction(pd.core.series.Series):
         return strike
 
 
+RECORD_FIELDS = {
+    "Date/Time": "date_time",
+    "Transaction Code": "transaction_code",
+    "Transaction Subcode": "transaction_subcode",
+    "Symbol": "symbol",
+    "Buy/Sell": "buy_sell",
+    "Open/Close": "open_close",
+    "Quantity": "quantity",
+    "Expiration Date": "expiration_date",
+    "Strike": "strike",
+    "Call/Put": "call_put",
+    "Price": "price",
+    "Fees": "fees",
+    "Amount": "amount",
+    "Description": "description",
+    "AmountEuro": "amount_euro",
+    "FeesEuro": "fees_euro",
+    "Position Type": "position_type",
+    "Signed Quantity": "signed_quantity",
+    "Is Closing": "is_closing",
+    "Instrument Key": "instrument_key",
+    "Instrument Id": "instrument_id",
+}
+# Filled from History.addDerivedColumns and the InstrumentTable of the run;
+# dropped when a column they derive from changes
+DERIVED_FIELDS = ("position_type", "signed_quantity", "is_closing", "instrument_key", "instrument_id")
+
+
+class TransactionRecord:
+    """A transaction as plain attributes with the API of Transaction.
+
+    Building one costs a few microseconds instead of a Series construction, and
+    the getters read attributes instead of doing label lookups. Where the row
+    carries the derived columns of History.addDerivedColumns, getType and
+    getQuantity return them instead of deriving them again. Item access with
+    the History column names works like on Transaction; columns outside
+    RECORD_FIELDS are kept in a small dict.
+    """
+
+    __slots__ = tuple(RECORD_FIELDS.values()) + ("_extra",)
+
+    def __init__(self, values, columns=None):
+        """Takes a row Series or dict, or the values of a row with their `columns`"""
+        self._extra = None
+        pairs = values.items() if columns is None else zip(columns, values)
+        for column, value in pairs:
+            name = RECORD_FIELDS.get(column)
+            if name is not None:
+                setattr(self, name, value)
+            else:
+                self[column] = value
+
+    @classmethod
+    def fromString(cls, line: str):
+        return cls(Transaction.fromString(line))
+
+    def __getitem__(self, column):
+        name = RECORD_FIELDS.get(column)
+        try:
+            if name is not None:
+                return getattr(self, name)
+            if self._extra is not None:
+                return self._extra[column]
+        except AttributeError:
+            pass
+        raise KeyError(column)
+
+    def __setitem__(self, column, value):
+        name = RECORD_FIELDS.get(column)
+        if name is not None:
+            if name not in DERIVED_FIELDS:
+                self._dropDerived()
+            setattr(self, name, value)
+            return
+        if self._extra is None:
+            self._extra = {}
+        self._extra[column] = value
+
+    def _dropDerived(self):
+        for name in DERIVED_FIELDS:
+            if hasattr(self, name):
+                delattr(self, name)
+
+    def __contains__(self, column):
+        try:
+            self[column]
+        except KeyError:
+            return False
+        return True
+
+    def get(self, column, default=None):
+        try:
+            return self[column]
+        except KeyError:
+            return default
+
+    def keys(self) -> list:
+        columns = [column for column, name in RECORD_FIELDS.items() if hasattr(self, name)]
+        return columns + list(self._extra or ())
+
+    def to_dict(self) -> dict:
+        return {column: self[column] for column in self.keys()}
+
+    def __eq__(self, other):
+        if not isinstance(other, TransactionRecord):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "TransactionRecord" + repr(Transaction(self.to_dict()))[len("Transaction"):]
+
+    def getYear(self) -> int:
+        temp = self.date_time.year
+        if temp < 2010:
+            raise ValueError("Date is less than the year 2010. That's very improbable")
+        if temp > 2100:
+            raise ValueError("Date is bigger than 2100. That's very improbable")
+        return temp
+
+    def getDate(self) -> str:
+        return str(self.date_time.date())
+
+    def getDateTime(self) -> str:
+        return str(self.date_time)
+
+    def isType(self, type_column: str, valid_values: set) -> bool:
+        return self[type_column] in valid_values
+
+    def isOption(self) -> bool:
+        valid_subcodes = {"Sell to Open", "Buy to Open", "Sell to Close", "Buy to Close", "Assignment", "Expiration"}
+        return self.call_put in {"P", "C"} and self.transaction_subcode in valid_subcodes
+
+    def isStock(self) -> bool:
+        return bool(self.getSymbol()) and (pd.isnull(self.strike) or self.strike == 0.0)
+
+    def getSymbol(self) -> str:
+        symbol = str(self.symbol)
+        if 'nan' == symbol or symbol == '':
+            raise ValueError("This transaction doesn't have a symbol. That's wrong")
+        return symbol
+
+    def getType(self) -> PositionType:
+        try:
+            return PositionType(self.position_type)
+        except (AttributeError, ValueError):
+            pass
+        if self.isStock():
+            return PositionType.stock
+        elif self.call_put == "C":
+            return PositionType.call
+        elif self.call_put == "P":
+            return PositionType.put
+        else:
+            raise ValueError(f"Couldn't identify if it is stock, call or put. Entry was '{self}")
+
+    def getQuantity(self) -> int:
+        if self.transaction_code not in ("Trade", "Receive Deliver"):
+            raise KeyError(f"Invalid Transaction Code: {self.transaction_code}")
+        signed_quantity = getattr(self, "signed_quantity", None)
+        if signed_quantity is not None and signed_quantity == signed_quantity:
+            return int(signed_quantity)
+        return int(_quantity_sign(self.transaction_subcode, self.buy_sell) * self.quantity)
+
+    def setQuantity(self, quantity: int):
+        valid_transaction_codes = ["Trade", "Receive Deliver"]
+        if self.transaction_code not in valid_transaction_codes:
+            raise KeyError(f"Transaction Code is '{self.transaction_code}' and not in '{valid_transaction_codes}'.")
+
+        self._dropDerived()
+        if self.transaction_code == "Receive Deliver" and self.transaction_subcode in ["Assignment", "Expiration"]:
+            self.quantity = int(quantity)
+            return
+
+        self.quantity = int(abs(quantity))
+        self.buy_sell = "Sell" if quantity < 0 else "Buy"
+
+        if self.open_close in ("Open", "Close"):
+            self.transaction_subcode = f"{self.buy_sell} to {self.open_close}"
+        else:
+            raise ValueError(f"Unexpected value in 'Open/Close': {self.open_close}")
+
+    def getValue(self) -> Money:
+        return Money(row=self)
+
+    def setValue(self, money: Money):
+        self.amount = money.usd
+        self.amount_euro = money.eur
+
+    def getFees(self) -> Money:
+        v = Money()
+        v.usd = self.fees
+        v.eur = self.fees_euro
+        return v
+
+    def setFees(self, money: Money):
+        self.fees = money.usd
+        self.fees_euro = money.eur
+
+    def getExpiry(self) -> datetime:
+        return self.expiration_date
+
+    def getStrike(self) -> float:
+        return self.strike
+
+
+def records(frame: pd.DataFrame, instrument_ids=None):
+    """TransactionRecords for the rows of a frame, read as plain tuples.
+
+    `instrument_ids`, one per row, are attached where they are not negative.
+    """
+    column_names = tuple(frame.columns)
+    if instrument_ids is None:
+        instrument_ids = itertools.repeat(-1)
+    for values, instrument_id in zip(frame.itertuples(index=False, name=None), instrument_ids):
+        record = TransactionRecord(values, column_names)
+        if instrument_id >= 0:
+            record.instrument_id = instrument_id
+        yield record
@@ -0,0 +1,155 @@
+"""Validation of a parsed export, run once before any position is processed.
+
+The parsers record every value they cannot read in a ValidationReport instead
+of stopping at the first one, and check_history adds the rule checks the
+processing code would otherwise only hit row by row. All checks are column
+operations over the whole export.
+"""
+import logging
+
+import pandas as pd
+
+from tastyworksTaxes.constants import (
+    MoneyMovementType,
+    POSITION_SUBCODES,
+    TransactionCode,
+    VALID_OPTION_TYPES,
+    VALID_TRANSACTION_CODES,
+)
+
+logger = logging.getLogger(__name__)
+
+REPORT_COLUMNS = ['row', 'column', 'value', 'reason']
+MIN_YEAR = 2010
+MAX_YEAR = 2100
+
+
+class ValidationReport:
+    """Every problem found in an export, one entry per offending cell.
+
+    `row` is the line of the CSV file, counting the header as line 1.
+    Warnings are rows that are skipped, e.g. of an unknown transaction code;
+    they are listed separately and don't make the export invalid.
+    """
+
+    def __init__(self, source=None, header_lines: int = 1):
+        self.source = source
+        self.header_lines = header_lines
+        self._parts = []
+        self._warning_parts = []
+
+    def add(self, labels, column: str, values, reasons) -> None:
+        """Records problems for the rows with index `labels` of the parsed export.
+
+        `reasons` is a single text for all rows or one text per row.
+        """
+        self._record(self._parts, labels, column, values, reasons)
+
+    def warn(self, labels, column: str, values, reasons) -> None:
+        """Like add, for rows that are skipped instead of rejected"""
+        self._record(self._warning_parts, labels, column, values, reasons)
+
+    def _record(self, parts, labels, column, values, reasons) -> None:
+        labels = pd.Index(labels)
+        if len(labels) == 0:
+            return
+        parts.append(pd.DataFrame({
+            'row': labels.to_numpy() + self.header_lines + 1,
+            'column': column,
+            'value': pd.Series(values, dtype=object).astype(str).to_numpy(),
+            'reason': reasons,
+        }))
+
+    @staticmethod
+    def _frame(parts) -> pd.DataFrame:
+        if not parts:
+            return pd.DataFrame(columns=REPORT_COLUMNS)
+        return pd.concat(parts, ignore_index=True).sort_values('row', kind='stable', ignore_index=True)
+
+    @property
+    def issues(self) -> pd.DataFrame:
+        return self._frame(self._parts)
+
+    @property
+    def warnings(self) -> pd.DataFrame:
+        return self._frame(self._warning_parts)
+
+    def __len__(self):
+        return sum(len(part) for part in self._parts)
+
+    @property
+    def ok(self) -> bool:
+        return len(self) == 0
+
+    def to_csv(self, path) -> None:
+        self.issues.to_csv(path, index=False)
+
+    def summary(self, limit: int = 10) -> str:
+        issues = self.issues
+        prefix = f"{self.source}: " if self.source else ""
+        lines = [f"{prefix}{len(issues)} problem(s) in {issues['row'].nunique()} row(s)"]
+        for issue in issues.head(limit).itertuples():
+            lines.append(f"  row {issue.row}, {issue.column}: {issue.reason}")
+        if len(issues) > limit:
+            lines.append(f"  ... and {len(issues) - limit} more")
+        return '\n'.join(lines)
+
+    def raiseIfInvalid(self) -> None:
+        """Raises ValidationError if there are problems, otherwise logs the warnings"""
+        if not self.ok:
+            raise ValidationError(self)
+        warnings = self.warnings
+        prefix = f"{self.source}: " if self.source else ""
+        for (column, reason, value), rows in warnings.groupby(['column', 'reason', 'value'], sort=False)['row']:
+            logger.warning(f"{prefix}{reason} '{value}' in {len(rows)} row(s), e.g. row {rows.iloc[0]}; "
+                           f"these rows are skipped")
+
+
+class ValidationError(ValueError):
+    """Raised with the complete report when an export has problems"""
+
+    def __init__(self, report: ValidationReport):
+        super().__init__(report)
+        self.report = report
+
+    def __str__(self):
+        return self.report.summary()
+
+
+def check_history(df: pd.DataFrame, report: ValidationReport) -> None:
+    """Rule checks on a parsed export that still has its file row order as index.
+
+    Values the parsers already rejected (NaN, NaT) are not reported again.
+    Rows of an unknown transaction code are only warned about; the engine
+    skips them.
+    """
+    code = df['Transaction Code']
+    subcode = df['Transaction Subcode']
+    call_put = df['Call/Put'].fillna('').astype(str)
+    is_position = code.isin([TransactionCode.TRADE.value, TransactionCode.RECEIVE_DELIVER.value])
+    is_money_movement = code == TransactionCode.MONEY_MOVEMENT.value
+
+    def add(mask, column, reason):
+        labels = df.index[mask.to_numpy()]
+        report.add(labels, column, df.loc[labels, column], reason)
+
+    known = code.isin(VALID_TRANSACTION_CODES)
+    unknown = df.index[~known.to_numpy()]
+    report.warn(unknown, 'Transaction Code', code[unknown], "Unknown Transaction Code")
+
+    year = df['Date/Time'].dt.year
+    add(known & (year < MIN_YEAR), 'Date/Time', f"Date is less than the year {MIN_YEAR}. That's very improbable")
+    add(known & (year > MAX_YEAR), 'Date/Time', f"Date is bigger than {MAX_YEAR}. That's very improbable")
+    add(is_money_movement & ~subcode.isin([t.value for t in MoneyMovementType]), 'Transaction Subcode',
+        "Unknown money movement subcode")
+    add(is_position & ~subcode.isin(POSITION_SUBCODES), 'Transaction Subcode', "Invalid Transaction Subcode")
+
+    symbol = df['Symbol'].fillna('').astype(str)
+    add(is_position & symbol.isin(['', 'nan']), 'Symbol', "This transaction doesn't have a symbol")
+
+    is_option = call_put.isin(VALID_OPTION_TYPES)
+    strike = df['Strike']
+    is_stock = (call_put == '') & (strike.isna() | (strike == 0.0))
+    add(is_position & ~is_option & ~is_stock, 'Call/Put', "Couldn't identify if it is stock, call or put")
+    add(is_position & is_option & df['Expiration Date'].isna(), 'Expiration Date', "Option without expiration date")
+    add(is_position & is_option & strike.notna() & (strike <= 0.0), 'Strike', "Option without a positive strike")
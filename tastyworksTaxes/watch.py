@@ -0,0 +1,184 @@
+"""Watch mode: keeps the results for a folder of exports up to date.
+
+The merged history, the exchange rates and the engine state stay in memory
+between polls. A new export is parsed on its own and only its rows that no
+earlier export had are added. Rows later than everything processed so far
+are simply fed on; otherwise the engine goes back to its state at the start
+of the earliest affected year and replays from there. The per-year reports
+and the closed trades are then rewritten atomically.
+"""
+import copy
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from tastyworksTaxes.constants import Fields
+from tastyworksTaxes.fifo_processor import closed_trades_frame
+from tastyworksTaxes.history import History
+from tastyworksTaxes.money import fx_provider as current_fx_provider
+from tastyworksTaxes.printer import Printer
+from tastyworksTaxes.tasty import Tasty
+from tastyworksTaxes.validation import ValidationError
+
+logger = logging.getLogger(__name__)
+
+CLOSED_TRADES_FILE = "closed-trades.csv"
+
+
+def write_atomically(path: Path, text: str) -> None:
+    """Replaces `path` with `text` so readers see either the old or the new file"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class FolderWatcher:
+    """Processes the exports of `directory` as they arrive and writes the results to `output`.
+
+    A file is picked up once its size and modification time are the same in
+    two consecutive polls, so exports still being copied are not read half
+    written. Files that change later are read again; rows seen before are
+    skipped. `fixed_point` is passed on to Tasty.
+    """
+
+    def __init__(self, directory, output, fx_provider=None, pattern: str = "*.csv", fixed_point=False):
+        self.directory = Path(directory)
+        self.output = Path(output)
+        self.pattern = pattern
+        self.fx_provider = fx_provider or current_fx_provider()
+        self.fixed_point = fixed_point
+        self.history = None
+        self.tasty = Tasty(fx_provider=self.fx_provider, fixed_point=self.fixed_point)
+        self._processed = 0
+        self._files = {}
+        self._pending = {}
+        self._row_counts = {}
+        self._snapshots = {}
+        self._dirty_year = None
+        self._reports = {}
+
+    def poll(self) -> list[Path]:
+        """Processes the new and changed files that are complete; returns their paths"""
+        ready = []
+        for path in sorted(self.directory.glob(self.pattern)):
+            stat = path.stat()
+            signature = (stat.st_size, stat.st_mtime_ns)
+            if self._files.get(path) == signature:
+                continue
+            if self._pending.get(path) == signature:
+                ready.append(path)
+                self._files[path] = self._pending.pop(path)
+            else:
+                self._pending[path] = signature
+
+        changed = False
+        for path in ready:
+            try:
+                changed |= self.addFile(path)
+            except (ValidationError, OSError, ValueError) as e:
+                logger.error(f"Skipping {path}: {e}")
+        if changed:
+            self.writeResults()
+        return ready
+
+    def run(self, interval: float = 60.0) -> None:
+        """Polls every `interval` seconds until interrupted"""
+        logger.info(f"Watching {self.directory / self.pattern}, writing results to {self.output}")
+        while True:
+            self.poll()
+            time.sleep(interval)
+
+    def addFile(self, path) -> bool:
+        """Adds the rows of one export that are not known yet; returns whether there were any"""
+        df = History._parseFile(path, self.fx_provider)
+        new = df[History._unseenRows(df.pop('_row_key'), self._row_counts)]
+        new = new.drop(columns='_file_row')
+        logger.info(f"{path}: {len(df)} rows, {len(new)} new")
+        if new.empty:
+            return False
+
+        first_new = new[Fields.DATE_TIME.value].min()
+        previous = self.history
+        if previous is None:
+            merged = new
+        else:
+            merged = pd.concat([previous, new]).sort_values(Fields.DATE_TIME.value, kind='stable')
+        merged = History(merged.reset_index(drop=True))
+        merged._applySchema()
+        merged.addDerivedColumns()
+        merged._selfTest()
+        self.history = merged
+
+        if (previous is not None and self._dirty_year is None
+                and previous[Fields.DATE_TIME.value].iloc[-1] < first_new):
+            start = self._processed
+        else:
+            start = self._rewind(min(first_new.year, self._dirty_year or first_new.year))
+        try:
+            self._process(start)
+        except ValueError as e:
+            logger.error(f"Can't process the history with {path}: {e}. "
+                         f"The results are not updated until the missing exports arrive.")
+            return False
+        return True
+
+    def _rewind(self, year: int) -> int:
+        """Restores the state before the first row of `year` or an earlier year.
+
+        Returns the first row to replay from.
+        """
+        year = max([known for known in self._snapshots if known <= year], default=None)
+        if year is None:
+            self.tasty = Tasty(fx_provider=self.fx_provider, fixed_point=self.fixed_point)
+            self._snapshots.clear()
+            return 0
+        position_manager, closed_trades, year_values = copy.deepcopy(self._snapshots[year])
+        position_manager.closed_trades = self.tasty.position_manager.closed_trades[:closed_trades]
+        self.tasty.position_manager = position_manager
+        self.tasty.yearValues = year_values
+        for later in [known for known in self._snapshots if known > year]:
+            del self._snapshots[later]
+        return int((self.history[Fields.DATE_TIME.value].dt.year < year).sum())
+
+    def _snapshot(self) -> tuple:
+        position_manager = self.tasty.position_manager
+        closed_trades = position_manager.closed_trades
+        position_manager.closed_trades = []
+        try:
+            return copy.deepcopy((position_manager, len(closed_trades), self.tasty.yearValues))
+        finally:
+            position_manager.closed_trades = closed_trades
+
+    def _process(self, start: int) -> None:
+        rows = self.history.iloc[start:]
+        self._dirty_year = None
+        for year, part in rows.groupby(rows[Fields.DATE_TIME.value].dt.year, sort=True):
+            if year not in self._snapshots:
+                self._snapshots[year] = self._snapshot()
+            try:
+                self.tasty.processTransactionHistory(part)
+            except ValueError:
+                self._dirty_year = year
+                raise
+        self._processed = len(self.history)
+
+    def writeResults(self) -> None:
+        """Rewrites the reports of the years that changed and the closed trades"""
+        closed_trades = self.tasty.position_manager.closed_trades
+        for year, values in self.tasty.bookedValues().items():
+            text = f"Values for year {year} in Euro:\n" + Printer(values, closed_trades).generateDummyReport()
+            if self._reports.get(year) != text:
+                write_atomically(self.output / f"{year}.txt", text)
+                self._reports[year] = text
+        write_atomically(self.output / CLOSED_TRADES_FILE, closed_trades_frame(closed_trades).to_csv(index=False))
+        logger.info(f"Wrote the results for {len(self._reports)} year(s) and {len(closed_trades)} closed trades")
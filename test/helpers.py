@@ -0,0 +1,105 @@
+"""Comparisons and known results of the bundled export, shared by the tests of the run variants."""
+import pandas as pd
+import pytest
+
+EXPORT = "test/tastytrade_transactions_history_180201_to_240817.csv"
+
+# some per-year values of EXPORT as (usd, eur), to the cent, with the bundled ECB rates
+EXPORT_VALUES = {
+    2018: {
+        "stockAndOptionsSum": (-1668.00, -1390.81),
+        "optionSum": (3728.00, 3010.31),
+        "stockAndEtfLosses": (-5401.32, -4405.44),
+        "otherStockAndBondProfits": (0.00, 0.00),
+        "fee": (-67.08, -54.93),
+    },
+    2019: {
+        "stockAndOptionsSum": (-272.00, -223.91),
+        "optionSum": (2655.00, 2377.48),
+        "stockAndEtfLosses": (-2932.43, -2606.24),
+        "otherStockAndBondProfits": (0.00, 0.00),
+        "fee": (-26.13, -23.43),
+    },
+    2020: {
+        "stockAndOptionsSum": (380.50, 98.80),
+        "optionSum": (9653.00, 8522.12),
+        "stockAndEtfLosses": (-9497.09, -8626.03),
+        "otherStockAndBondProfits": (187.69, 171.04),
+        "fee": (-420.94, -371.89),
+    },
+    2021: {
+        "stockAndOptionsSum": (978.48, 1300.38),
+        "optionSum": (22709.00, 19014.44),
+        "stockAndEtfLosses": (-25002.59, -20753.03),
+        "otherStockAndBondProfits": (3195.44, 2974.51),
+        "fee": (-368.30, -308.99),
+    },
+    2022: {
+        "stockAndOptionsSum": (696.46, 1421.80),
+        "optionSum": (5380.00, 5132.62),
+        "stockAndEtfLosses": (-5904.62, -5013.84),
+        "otherStockAndBondProfits": (1203.88, 1287.43),
+        "fee": (-196.58, -185.12),
+    },
+    2023: {
+        "stockAndOptionsSum": (-715.72, -612.76),
+        "optionSum": (841.00, 795.37),
+        "stockAndEtfLosses": (-1645.25, -1648.83),
+        "otherStockAndBondProfits": (82.34, 235.07),
+        "fee": (-46.25, -42.78),
+    },
+    2024: {
+        "stockAndOptionsSum": (780.86, 751.17),
+        "optionSum": (655.00, 604.01),
+        "stockAndEtfLosses": (-5.85, -124.52),
+        "otherStockAndBondProfits": (60.02, 186.02),
+        "fee": (-6.89, -6.36),
+    },
+}
+
+# (symbol, opening date, quantity, profit in USD) of the closed trades of EXPORT
+# whose lot was taken over from another symbol by a symbol change or merger
+TRANSFERRED_LOTS = [
+    ("PSFE", "2021-03-18 20:19:22", -1, 52.0),
+    ("ME", "2021-03-19 22:00:00", 100, -750.0),
+    ("ME", "2021-05-13 16:11:27", -1, 45.0),
+    ("GREE1", "2021-09-09 17:31:56", -6, 3360.0),
+    ("PARA", "2022-02-16 18:33:48", -2, 80.0),
+]
+
+
+def money_fields(values):
+    """The (usd, eur) pair of every field of a Values object; Money has no __eq__"""
+    return {name: (money.usd, money.eur) for name, money in vars(values).items()}
+
+
+def assert_same_values(result, expected):
+    """Two per-year results of Tasty.run have the same years and exactly the same amounts"""
+    assert list(result) == list(expected)
+    for year in expected:
+        assert money_fields(result[year]) == money_fields(expected[year]), year
+
+
+def open_lots(position_manager):
+    return {key: list(lots) for key, lots in position_manager.open_lots.items()}
+
+
+def assert_export_values(result):
+    """`result` has the years of EXPORT and its values of EXPORT_VALUES"""
+    assert list(result) == list(EXPORT_VALUES)
+    for year, fields in EXPORT_VALUES.items():
+        for name, pair in fields.items():
+            money = getattr(result[year], name)
+            assert (money.usd, money.eur) == pytest.approx(pair, abs=0.005), (year, name)
+
+
+def transferred_trades(closed_trades, symbol, opening_date):
+    """(quantity, profit in USD) of the closed trades of `symbol` opened at `opening_date`"""
+    return [(trade.quantity, trade.profit_usd) for trade in closed_trades
+            if trade.symbol == symbol and trade.opening_date == pd.Timestamp(opening_date)]
+
+
+def assert_transferred_lots(closed_trades):
+    """Each lot of TRANSFERRED_LOTS closed once, with the basis of the symbol it came from"""
+    for symbol, opening_date, quantity, profit_usd in TRANSFERRED_LOTS:
+        assert transferred_trades(closed_trades, symbol, opening_date) == [(quantity, profit_usd)], symbol
@@ -1,5 +1,6 @@
 import pytest
 import logging
+from tastyworksTaxes import asset_classifier
 from tastyworksTaxes.asset_classifier import AssetClassifier
 from tastyworksTaxes.position import PositionType
 from tastyworksTaxes.asset_definitions import ASSET_DEFINITIONS
@@ -95,4 +96,80 @@ class TestAssetClassifier:
         with caplog.at_level(logging.WARNING):
             classifier.check_unsupported_assets(['SCHG', 'PULS'])
         
-        assert len(caplog.records) == 0
\ No newline at end of file
+        assert len(caplog.records) == 0
+
+@pytest.fixture
+def classifier():
+    return AssetClassifier()
+
+
+REFERENCE = """# comment
+symbol,category,isin,source
+VWRL,EQUITY_ETF,IE00B3RBWM25,prospectus
+QQQ,BOND_ETF,,test override
+"""
+
+
+@pytest.fixture
+def reference(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASTYWORKS_TAXES_CACHE_DIR", str(tmp_path / "cache"))
+    path = tmp_path / "asset_classes.csv"
+    path.write_text(REFERENCE)
+    return path
+
+
+def test_reference_file_extends_and_overrides_the_builtin_sets(reference):
+    classifier = AssetClassifier(reference)
+
+    assert classifier.classify('VWRL', PositionType.stock) == 'EQUITY_ETF'
+    assert classifier.classify('QQQ', PositionType.stock) == 'BOND_ETF'
+    assert classifier.classify('SCHG', PositionType.stock) == 'EQUITY_ETF'
+    assert classifier.classify_isin('IE00B3RBWM25') == 'EQUITY_ETF'
+    assert classifier.classify_isin('US0000000000') == 'INDIVIDUAL_STOCK'
+    assert 'VWRL' in classifier.get_all_symbols_by_type('EQUITY_ETF')
+
+
+def test_compiled_index_is_cached_until_the_file_changes(reference, tmp_path, monkeypatch):
+    AssetClassifier(reference)
+    assert len(list((tmp_path / "cache").glob("asset-index-*.npz"))) == 1
+
+    def fail(path):
+        raise AssertionError("recompiled")
+    with monkeypatch.context() as m:
+        m.setattr(asset_classifier, "compile_index", fail)
+        asset_classifier._cached_index.cache_clear()
+        assert AssetClassifier(reference).classify('VWRL', PositionType.stock) == 'EQUITY_ETF'
+
+    reference.write_text(REFERENCE + "XYZ,REAL_ESTATE_ETF,,\n")
+    assert AssetClassifier(reference).classify('XYZ', PositionType.stock) == 'REAL_ESTATE_ETF'
+    assert len(list((tmp_path / "cache").glob("asset-index-*.npz"))) == 2
+
+
+def test_unknown_category_in_reference_file(reference):
+    reference.write_text("symbol,category\nXYZ,GOLD\n")
+
+    with pytest.raises(ValueError, match="GOLD"):
+        AssetClassifier(reference)
+
+
+def test_missing_reference_file_uses_builtin_sets(tmp_path):
+    classifier = AssetClassifier(tmp_path / "missing.csv")
+
+    assert classifier.classify('SPY', PositionType.stock) == 'EQUITY_ETF'
+
+
+def test_rules_are_memoized_per_symbol(classifier):
+    classifier.classify('BTC/USD', PositionType.stock)
+    classifier.classify('AAPL', PositionType.stock)
+    classifier.classify('SCHG', PositionType.stock)
+
+    assert classifier._rule_memo == {'BTC/USD': 'CRYPTO', 'AAPL': 'INDIVIDUAL_STOCK'}
+
+
+def test_classify_many(classifier):
+    symbols = ['SCHG', 'AAPL', 'BTC/USD', 'SCHG', 'VNQ', 'AAPL']
+
+    categories = classifier.classify_many(symbols)
+
+    assert list(categories) == [classifier.classify(symbol, PositionType.stock) for symbol in symbols]
+    assert len(classifier.classify_many([])) == 0
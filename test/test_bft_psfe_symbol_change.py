@@ -3,6 +3,7 @@ from pathlib import Path
 from tastyworksTaxes.tasty import Tasty
 from tastyworksTaxes.position_manager import PositionManager
 from tastyworksTaxes.transaction import Transaction
+from test.helpers import EXPORT, TRANSFERRED_LOTS, transferred_trades
 
 # Skip tests that require the full dataset if it's not available (CI environment)
 FULL_DATASET = Path("test/transactions_2018_to_2025.csv")
@@ -67,3 +68,13 @@ class TestBftPsfeSymbolChange:
         result = t.run()
 
         assert len(result) > 0
+
+
+@pytest.mark.parametrize("symbol, opening_date, quantity, profit_usd", TRANSFERRED_LOTS)
+def test_bundled_export_transfers_each_lot_to_its_successor(symbol, opening_date, quantity, profit_usd):
+    """The lots keep the opening date and basis of the symbol they were renamed from"""
+    t = Tasty(EXPORT)
+    t.run()
+
+    assert transferred_trades(t.position_manager.closed_trades, symbol, opening_date) == [(quantity, profit_usd)]
+    assert t.position_manager._pending_symbol_change_lot is None
@@ -0,0 +1,138 @@
+import gzip
+import json
+
+import pandas as pd
+import pytest
+
+from tastyworksTaxes.checkpoint import rows_checksum
+from tastyworksTaxes.history import History
+from tastyworksTaxes.tasty import Tasty
+from test.helpers import EXPORT, assert_export_values, assert_same_values, assert_transferred_lots, open_lots
+
+
+def closing_year(trade):
+    return pd.Timestamp(trade.closing_date).year
+
+
+@pytest.fixture(scope="module")
+def full():
+    tasty = Tasty(EXPORT)
+    tasty.run()
+    return tasty
+
+
+def assert_same_result(result, tasty, full, year):
+    assert_same_values(result, full.yearValues)
+    later_trades = [trade for trade in full.position_manager.closed_trades if closing_year(trade) > year]
+    assert tasty.position_manager.closed_trades == later_trades
+    assert [trade.instrument_id for trade in tasty.position_manager.closed_trades] == \
+        [trade.instrument_id for trade in later_trades]
+    assert open_lots(tasty.position_manager) == open_lots(full.position_manager)
+
+
+@pytest.mark.parametrize("year", [2018, 2021, 2023])
+def test_resume_from_full_history_matches_full_run(tmp_path, full, year):
+    checkpoint = tmp_path / "state.json.gz"
+    Tasty(EXPORT).writeCheckpoint(checkpoint, year)
+
+    resumed = Tasty(EXPORT)
+    resumed.resumeFrom(checkpoint)
+
+    assert resumed.checkpointYear == year
+    assert_same_result(resumed.run(), resumed, full, year)
+
+
+def test_resume_books_the_known_values_of_the_bundled_export(tmp_path):
+    checkpoint = tmp_path / "state.json.gz"
+    # all symbol changes of the export come after the checkpoint
+    Tasty(EXPORT).writeCheckpoint(checkpoint, 2020)
+
+    resumed = Tasty(EXPORT)
+    resumed.resumeFrom(checkpoint)
+
+    assert_export_values(resumed.run())
+    assert_transferred_lots(resumed.position_manager.closed_trades)
+
+
+def test_run_after_checkpoint_matches_full_run(tmp_path, full):
+    tasty = Tasty(EXPORT)
+    tasty.writeCheckpoint(tmp_path / "state.json.gz", 2021)
+
+    result = tasty.run()
+
+    assert_same_values(result, full.yearValues)
+    assert tasty.position_manager.closed_trades == full.position_manager.closed_trades
+
+
+def test_resume_with_only_the_new_rows(tmp_path, full):
+    checkpoint = tmp_path / "state.json.gz"
+    Tasty(EXPORT).writeCheckpoint(checkpoint, 2021)
+    history = History.fromFile(EXPORT)
+
+    resumed = Tasty()
+    resumed.history = History(history[history["Date/Time"].dt.year > 2021])
+    resumed.resumeFrom(checkpoint)
+
+    assert_same_result(resumed.run(), resumed, full, 2021)
+
+
+def test_chained_checkpoints_match_full_run(tmp_path, full):
+    first, second = tmp_path / "2019.json.gz", tmp_path / "2022.json.gz"
+    Tasty(EXPORT).writeCheckpoint(first, 2019)
+    tasty = Tasty(EXPORT)
+    tasty.resumeFrom(first)
+    tasty.writeCheckpoint(second, 2022)
+
+    resumed = Tasty(EXPORT)
+    resumed.resumeFrom(second)
+
+    assert_same_result(resumed.run(), resumed, full, 2022)
+
+
+def test_resume_refuses_changed_rows(tmp_path):
+    checkpoint = tmp_path / "state.json.gz"
+    Tasty(EXPORT).writeCheckpoint(checkpoint, 2021)
+
+    changed = Tasty(EXPORT)
+    changed.history.loc[10, "Amount"] += 0.01
+    with pytest.raises(ValueError, match="Refusing to resume"):
+        changed.resumeFrom(checkpoint)
+
+
+def test_resume_refuses_partly_overlapping_rows(tmp_path):
+    checkpoint = tmp_path / "state.json.gz"
+    Tasty(EXPORT).writeCheckpoint(checkpoint, 2021)
+    history = History.fromFile(EXPORT)
+
+    partial = Tasty()
+    partial.history = History(history[history["Date/Time"] >= pd.Timestamp(2021, 7, 1)])
+    with pytest.raises(ValueError, match="Refusing to resume"):
+        partial.resumeFrom(checkpoint)
+
+
+def test_resume_refuses_other_versions(tmp_path):
+    checkpoint = tmp_path / "state.json.gz"
+    Tasty(EXPORT).writeCheckpoint(checkpoint, 2021)
+    with gzip.open(checkpoint, "rt") as f:
+        state = json.load(f)
+    state["version"] += 1
+    with gzip.open(checkpoint, "wt") as f:
+        json.dump(state, f)
+
+    with pytest.raises(ValueError, match="version"):
+        Tasty(EXPORT).resumeFrom(checkpoint)
+
+
+def test_checkpoint_year_must_increase(tmp_path):
+    tasty = Tasty(EXPORT)
+    tasty.writeCheckpoint(tmp_path / "a.json.gz", 2021)
+    with pytest.raises(ValueError, match="already processed"):
+        tasty.writeCheckpoint(tmp_path / "b.json.gz", 2020)
+
+
+def test_rows_checksum_continues_over_parts():
+    history = History.fromFile(EXPORT)
+    head, tail = history.iloc[:300], history.iloc[300:]
+
+    assert rows_checksum(tail, len(head), rows_checksum(head)) == rows_checksum(history)
+    assert rows_checksum(history.iloc[::-1]) != rows_checksum(history)
@@ -1,4 +1,7 @@
+import pandas as pd
 import pytest
+from tastyworksTaxes.fifo_processor import CLOSED_TRADE_COLUMNS, TradeResult, closed_trades_frame
+from tastyworksTaxes.position import PositionType
 from tastyworksTaxes.position_manager import PositionManager
 from tastyworksTaxes.transaction import Transaction
 
@@ -25,4 +28,42 @@ def test_true_fifo_stock_logic():
     assert remaining_lot.quantity == 5
 
     remaining_cost_basis = remaining_lot.amount_usd
-    assert round(remaining_cost_basis, 2) == -100.00
\ No newline at end of file
+    assert round(remaining_cost_basis, 2) == -100.00
+
+def test_trade_result_dates_are_timestamps():
+    pm = PositionManager()
+    pm.add_position(Transaction.fromString("2024-12-30T10:00:00+0000,Trade,Buy to Open,BUY_TO_OPEN,FIFO,Equity,Bought 10 FIFO @ 10,-100.00,10,,-1.00,9.0,,FIFO,FIFO,,,,123456,USD"))
+    pm.add_position(Transaction.fromString("2025-01-02T10:00:00+0000,Trade,Sell to Close,SELL_TO_CLOSE,FIFO,Equity,Sold 10 FIFO @ 25,250.00,10,,-1.00,9.0,,FIFO,FIFO,,,,123456,USD"))
+
+    trade = pm.closed_trades[0]
+
+    assert isinstance(trade.opening_date, pd.Timestamp)
+    assert isinstance(trade.closing_date, pd.Timestamp)
+    assert trade.tax_year == 2025
+
+
+def test_trade_result_parses_text_dates():
+    trade = TradeResult(symbol='SPY', position_type=PositionType.call, opening_date='2021-03-01 10:00:00',
+                        closing_date='2022-01-03 15:30:00', quantity=1, profit_usd=1.0, profit_eur=1.0,
+                        fees_usd=0.0, fees_eur=0.0, worthless_expiry=False, strike=400.0, expiry='2022-01-21')
+
+    assert trade.closing_date == pd.Timestamp('2022-01-03 15:30:00')
+    assert trade.expiry == pd.Timestamp('2022-01-21')
+    assert trade.tax_year == 2022
+
+
+def test_closed_trades_frame_formats_dates_as_text():
+    trades = [
+        TradeResult('SPY', PositionType.call, pd.Timestamp('2021-03-01 10:00:00'), pd.Timestamp('2022-01-03 15:30:00'),
+                    1, 1.0, 1.0, 0.0, 0.0, False, 400.0, pd.Timestamp('2022-01-21')),
+        TradeResult('SPY', PositionType.stock, pd.Timestamp('2021-03-01 10:00:00'), pd.Timestamp('2021-03-02 09:00:05'),
+                    10, 1.0, 1.0, 0.0, 0.0, False),
+    ]
+
+    df = closed_trades_frame(trades)
+
+    assert list(df.columns) == CLOSED_TRADE_COLUMNS
+    assert 'tax_year' not in df.columns
+    assert list(df['closing_date']) == ['2022-01-03 15:30:00', '2021-03-02 09:00:05']
+    assert df['expiry'].iloc[0] == '2022-01-21'
+    assert pd.isna(df['expiry'].iloc[1])
@@ -0,0 +1,188 @@
+from functools import cache
+
+import pytest
+
+from tastyworksTaxes import trade_calculator
+from tastyworksTaxes.fixed_point import SCALE, allocate, from_units, to_units
+from tastyworksTaxes.money import Money
+from tastyworksTaxes.position_manager import PositionManager
+from tastyworksTaxes.tasty import Tasty
+from tastyworksTaxes.trade_aggregator import YearlyTradeAggregator
+from tastyworksTaxes.trade_store import TradeStore
+from tastyworksTaxes.transaction import Transaction
+from test.helpers import EXPORT, assert_same_values, money_fields
+
+
+def trade(date, subcode, description, value, quantity):
+    action = subcode.upper().replace(" ", "_")
+    return Transaction.fromString(f"{date}T10:00:00+0000,Trade,{subcode},{action},FIFO,Equity,{description},"
+                                  f"{value},{quantity},,-1.00,0.13,,FIFO,FIFO,,,,123456,USD")
+
+
+def test_allocate_rounds_half_to_even():
+    assert allocate(5, 1, 2) == 2
+    assert allocate(15, 1, 2) == 8
+    assert allocate(-5, 1, 2) == -2
+    assert allocate(7, 1, -2) == -4
+    assert allocate(10, 1, 3) == 3
+    assert allocate(20, 2, 3) == 13
+
+
+def test_allocate_fractional_quantities_exactly():
+    assert allocate(10, 0.25, 0.5) == 5
+    assert allocate(10_001, 1.5, 1.5) == 10_001
+    assert allocate(30_000, 0.1, 0.3) == 10_000
+    assert allocate(10_000, 0.5, 1.5) == 3333
+
+
+def test_partial_fills_conserve_the_lot():
+    pm = PositionManager(fixed_point=True)
+    buy = trade("2024-01-02", "Buy to Open", "Bought 7 FIFO @ 14.29", "-100.01", 7)
+    sell = trade("2024-01-03", "Sell to Close", "Sold 1 FIFO @ 15", "15.00", 1)
+    pm.add_position(buy)
+    for _ in range(7):
+        pm.add_position(sell)
+
+    profits = [to_units(t.profit_usd) for t in pm.closed_trades]
+    fees = [to_units(t.fees_usd) for t in pm.closed_trades]
+    assert sum(profits) == to_units(-100.01) + 7 * to_units(15.00)
+    assert sum(fees) == to_units(buy.getFees().usd) + 7 * to_units(sell.getFees().usd)
+    assert max(profits) - min(profits) == 1
+    assert not pm.open_lots
+
+
+def test_one_close_over_several_lots_conserves_its_amounts():
+    pm = PositionManager(fixed_point=True)
+    for day in ("2024-01-02", "2024-01-03", "2024-01-04"):
+        pm.add_position(trade(day, "Buy to Open", "Bought 3 FIFO @ 3.33", "-10.00", 3))
+    pm.add_position(trade("2024-01-05", "Sell to Close", "Sold 9 FIFO @ 11.11", "100.01", 9))
+
+    profits = [to_units(t.profit_usd) for t in pm.closed_trades]
+    assert len(profits) == 3
+    assert sum(profits) == 3 * to_units(-10.00) + to_units(100.01)
+    assert max(profits) - min(profits) <= 1
+
+
+@cache
+def fixed_run():
+    return Tasty(EXPORT, fixed_point=True).run()
+
+
+ENGINES = {
+    "totals in 2 processes": lambda: Tasty(EXPORT, fixed_point=True).runTotals(workers=2),
+    "partitioned": lambda: Tasty(EXPORT, fixed_point=True).run(workers=2),
+    "streaming": lambda: Tasty(fixed_point=True).runStreaming(EXPORT, chunksize=500),
+    "pipeline": lambda: Tasty(EXPORT, fixed_point=True).runPipeline(),
+}
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_fixed_point_engines_match_run(engine):
+    assert_same_values(ENGINES[engine](), fixed_run())
+
+
+def test_fixed_point_matches_the_float_path():
+    floats = Tasty(EXPORT).run()
+    result = fixed_run()
+
+    assert list(result) == list(floats)
+    for year, values in result.items():
+        for name, pair in money_fields(values).items():
+            assert all(round(amount * SCALE) / SCALE == amount for amount in pair), (year, name)
+            assert pair == pytest.approx(money_fields(floats[year])[name], abs=0.01), (year, name)
+
+
+def test_modes_of_two_runs_in_one_process_are_independent():
+    floats = Tasty(EXPORT).run()
+    fixed = Tasty(EXPORT, fixed_point=True)
+    fixed.processTransactionHistory()
+    after = Tasty(EXPORT)
+    after_values = after.run()
+
+    assert all(isinstance(lot.amount_usd, int) for lots in fixed.position_manager.open_lots.values()
+               for lot in lots)
+    assert all(isinstance(lot.amount_usd, float) for lots in after.position_manager.open_lots.values()
+               for lot in lots)
+    assert_same_values(after_values, floats)
+
+
+def test_units_survive_the_float_boundary():
+    for units in (0, 1, -1, 3, 12_345_678, -987_654_321_0, 10**15 - 1):
+        assert to_units(from_units(units)) == units
+
+    assert (Money(usd=0.1, eur=0.1) + Money(usd=0.2, eur=0.2)).usd != 0.3
+    exact = Money(usd=0.1, eur=0.1, fixed=True) + Money(usd=0.2, eur=0.2)
+    assert (exact.usd, exact.eur, exact.fixed) == (0.3, 0.3, True)
+    assert (exact - Money(usd=0.1, eur=0.1)).usd == 0.2
+    assert (-exact).fixed
+
+
+@pytest.mark.parametrize("name, field", [
+    ("calculate_combined_sum", "stockAndOptionsSum"),
+    ("calculate_option_sum", "optionSum"),
+    ("calculate_long_option_profits", "longOptionProfits"),
+    ("calculate_long_option_losses", "longOptionLosses"),
+    ("calculate_long_option_total_losses", "longOptionTotalLosses"),
+    ("calculate_short_option_profits", "shortOptionProfits"),
+    ("calculate_short_option_losses", "shortOptionLosses"),
+    ("calculate_option_differential", "grossOptionDifferential"),
+    ("calculate_stock_loss", "stockAndEtfLosses"),
+])
+def test_calculators_book_units_like_the_run(name, field):
+    tasty = Tasty(EXPORT, fixed_point=True)
+    result = tasty.run()
+    floats = Tasty(EXPORT).run()
+
+    for year, trades in tasty.getYearlyTrades().items():
+        money = getattr(trade_calculator, name)(trades, fixed_point=True)
+        expected = getattr(result[year], field)
+        assert (money.usd, money.eur) == (expected.usd, expected.eur), year
+        assert (money.usd, money.eur) == pytest.approx(money_fields(floats[year])[field], abs=0.01), year
+        assert money.fixed
+
+
+def test_fee_calculators_book_units_like_the_run():
+    tasty = Tasty(EXPORT, fixed_point=True)
+    tasty.processTransactionHistory()
+    store = TradeStore(tasty.position_manager.closed_trades, tasty.classifier, fixed_point=True)
+
+    for year, trades in tasty.getYearlyTrades().items():
+        for name, field in (("calculate_stock_fees", "stockFees"), ("calculate_other_fees", "otherFees"),
+                            ("calculate_fees_sum", "fees")):
+            money = getattr(trade_calculator, name)(trades, fixed_point=True)
+            assert (money.usd, money.eur) == tuple(from_units(units) for units in store.totals[year][field])
+        for name, field in (("calculate_gross_equity_etf_profits", "equityEtfGross"),
+                            ("calculate_equity_etf_profits", "equityEtf"),
+                            ("calculate_other_stock_and_bond_profits", "otherStock")):
+            money = getattr(trade_calculator, name)(trades, tasty.classifier, fixed_point=True)
+            assert (money.usd, money.eur) == tuple(from_units(units) for units in store.totals[year][field])
+
+
+def test_trade_store_sums_units():
+    tasty = Tasty(EXPORT, fixed_point=True)
+    tasty.processTransactionHistory()
+    trades = tasty.position_manager.closed_trades
+    aggregator = YearlyTradeAggregator(tasty.classifier, fixed_point=True)
+    aggregator.add_all(trades)
+
+    store = TradeStore(trades, tasty.classifier, fixed_point=True)
+
+    assert store.profit_usd.dtype.kind == 'i'
+    for year in store.years():
+        assert store.totals[year] == aggregator.totals[year]
+        assert all(isinstance(amount, int) for pair in store.totals[year].values() for amount in pair)
+
+
+def test_checkpoint_keeps_the_mode(tmp_path):
+    checkpoint = tmp_path / "state.json.gz"
+    full = Tasty(EXPORT, fixed_point=True).run()
+    Tasty(EXPORT, fixed_point=True).writeCheckpoint(checkpoint, 2021)
+
+    resumed = Tasty(EXPORT, fixed_point=True)
+    resumed.resumeFrom(checkpoint)
+    assert all(isinstance(lot.amount_usd, int) for lots in resumed.position_manager.open_lots.values()
+               for lot in lots)
+    assert_same_values(resumed.run(), full)
+
+    with pytest.raises(ValueError, match="fixed point on"):
+        Tasty(EXPORT).resumeFrom(checkpoint)
@@ -2,6 +2,7 @@ import pytest
 import pandas as pd
 import tempfile
 import os
+import re
 from pathlib import Path
 from tastyworksTaxes.history import History
 
@@ -151,3 +152,233 @@ def test_new_format_csv_sorting():
         assert hist["Transaction Subcode"].iloc[1] == "Sell to Close"
     finally:
         os.unlink(temp_file.name)
+
+
+def _new_format_frame():
+    return pd.DataFrame({
+        "Date": ["2020-05-07T14:00:00-04:00", "2020-05-08T09:30:00+0000"],
+        "Type": ["Trade", "Trade"],
+        "Sub Type": ["Sell to Open", "Buy to Open"],
+        "Action": ["SELL_TO_OPEN", "BUY_TO_OPEN"],
+        "Symbol": ["SVXY  200619P00030000", "SVXY"],
+        "Value": ["240.0", "-1,200.00"],
+        "Quantity": [3, 100],
+        "Average Price": ["80", "12.00"],
+        "Commissions": ["-1.00", "--"],
+        "Fees": [-0.15, -0.08],
+        "Expiration Date": ["6/19/20", None],
+        "Strike Price": [30, None],
+        "Call or Put": ["PUT", None],
+        "Description": ["Sold 3 SVXY 06/19/20 Put 30.00 @ 0.80", "Bought 100 SVXY @ 12.00"],
+    })
+
+
+def test_transform_parses_columns_vectorized():
+    internal = History._transform(_new_format_frame())
+
+    assert internal["Date/Time"].tolist() == [
+        pd.Timestamp("2020-05-07 20:00:00"), pd.Timestamp("2020-05-08 11:30:00")]
+    assert internal["Expiration Date"].tolist()[0] == pd.Timestamp("2020-06-19")
+    assert pd.isna(internal["Expiration Date"].tolist()[1])
+    assert internal["Symbol"].tolist() == ["SVXY", "SVXY"]
+    assert internal["Buy/Sell"].tolist() == ["Sell", "Buy"]
+    assert internal["Open/Close"].tolist() == ["Open", "Open"]
+    assert internal["Call/Put"].tolist() == ["P", ""]
+    assert internal["Strike"].tolist() == [30.0, 0.0]
+    assert internal["Price"].tolist() == [0.80, 12.0]
+    assert internal["Fees"].tolist() == [1.15, 0.08]
+    assert internal["Amount"].tolist() == [240.0, -1200.0]
+
+
+@pytest.mark.parametrize("raw,berlin", [
+    ("2021-12-31T22:59:59+0000", "2021-12-31 23:59:59"),
+    ("2021-12-31T23:30:00+0000", "2022-01-01 00:30:00"),
+    ("2021-12-31T23:30:00Z", "2022-01-01 00:30:00"),
+    ("2022-01-01T00:30:00+0100", "2022-01-01 00:30:00"),
+    ("2022-01-01T00:30:00+01:00", "2022-01-01 00:30:00"),
+    ("2021-12-31T18:30:00-0500", "2022-01-01 00:30:00"),
+    ("2021-12-31T18:30:00-05:00:00", "2022-01-01 00:30:00"),
+    ("2022-12-31T23:00:00+0000", "2023-01-01 00:00:00"),
+    ("2021-07-01T22:30:00+0000", "2021-07-02 00:30:00"),
+])
+def test_parse_dates_converts_offsets_to_berlin_time(raw, berlin):
+    parsed = History._parse_dates(pd.Series([raw], dtype=object))
+
+    assert parsed.tolist() == [pd.Timestamp(berlin)]
+
+
+def test_trade_after_midnight_berlin_counts_in_the_new_tax_year():
+    from tastyworksTaxes.tasty import Tasty
+    from tastyworksTaxes.transaction import Transaction
+
+    t = Tasty()
+    t.moneyMovement(Transaction.fromString(
+        "2021-12-31T23:30:00+0000,Money Movement,Credit Interest,,,,INTEREST ON CREDIT BALANCE,1.00,0,,0,0.00,,,,,,,123456,USD"))
+    t.moneyMovement(Transaction.fromString(
+        "2021-12-31T22:30:00+0000,Money Movement,Credit Interest,,,,INTEREST ON CREDIT BALANCE,2.00,0,,0,0.00,,,,,,,123456,USD"))
+
+    assert t.year(2022).creditInterest.usd == 1.0
+    assert t.year(2021).creditInterest.usd == 2.0
+
+
+@pytest.mark.parametrize("column,value,message", [
+    ("Date", "2020-05-07 14:00", "Failed to parse date '2020-05-07 14:00'"),
+    ("Strike Price", "thirty", "Failed to parse strike 'thirty'"),
+    ("Average Price", "n/a", "Failed to parse price 'n/a' for symbol 'SVXY'"),
+    ("Commissions", "free", "Failed to parse fees - commissions: 'free'"),
+    ("Value", "1.2.3", "Failed to parse amount '1.2.3'"),
+])
+def test_transform_reports_unparseable_values(column, value, message):
+    df = _new_format_frame()
+    df[column] = df[column].astype(object)
+    df.loc[1, column] = value
+
+    with pytest.raises(ValueError, match=re.escape(message)):
+        History._transform(df)
+
+
+EXPORT = "test/tastytrade_transactions_history_180201_to_240817.csv"
+
+
+def test_from_files_drops_overlapping_rows(tmp_path, caplog):
+    raw = pd.read_csv(EXPORT)
+    raw.iloc[:600].to_csv(tmp_path / "newer.csv", index=False)
+    raw.iloc[400:].to_csv(tmp_path / "older.csv", index=False)
+
+    with caplog.at_level("INFO", logger="tastyworksTaxes.history"):
+        merged = History.fromFiles([tmp_path / "newer.csv", tmp_path / "older.csv"], workers=1)
+
+    pd.testing.assert_frame_equal(pd.DataFrame(merged), pd.DataFrame(History.fromFile(EXPORT)))
+    assert "older.csv: 682 rows, 200 overlapping rows dropped" in caplog.text
+
+
+def test_from_files_keeps_repeated_rows_within_one_file(tmp_path):
+    # the first two rows are two identical fills of the same order
+    path = "test/2020-05 - 2020-12.csv"
+    single = History.fromFile(path)
+
+    merged = History.fromFiles([path, path], workers=1)
+
+    assert len(merged) == len(single) == 248
+    assert merged["Date/Time"].is_monotonic_increasing
+
+
+def test_from_files_accepts_glob_and_parses_in_parallel(tmp_path):
+    raw = pd.read_csv(EXPORT)
+    for i in range(3):
+        raw.iloc[i * 360:(i + 1) * 360 + 10].to_csv(tmp_path / f"export-{i}.csv", index=False)
+
+    merged = History.fromFiles(str(tmp_path / "export-*.csv"), workers=2)
+
+    pd.testing.assert_frame_equal(pd.DataFrame(merged), pd.DataFrame(History.fromFile(EXPORT)))
+
+
+def test_from_files_without_matches_raises(tmp_path):
+    with pytest.raises(FileNotFoundError, match="No input files match"):
+        History.fromFiles(str(tmp_path / "*.csv"))
+
+
+def test_from_file_cache_hit_skips_parsing(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASTYWORKS_TAXES_CACHE_DIR", str(tmp_path / "cache"))
+    parsed = History.fromFile("test/uso.csv", use_cache=True)
+
+    monkeypatch.setattr(pd, "read_csv", lambda *args, **kwargs: pytest.fail("export was parsed again"))
+    cached = History.fromFile("test/uso.csv", use_cache=True)
+
+    assert isinstance(cached, History)
+    pd.testing.assert_frame_equal(cached, parsed, check_exact=True)
+
+
+def test_from_file_cache_is_keyed_by_contents_and_fx_policy(tmp_path, monkeypatch):
+    from tastyworksTaxes.fx_rates import FxProvider
+
+    monkeypatch.setenv("TASTYWORKS_TAXES_CACHE_DIR", str(tmp_path / "cache"))
+    export = tmp_path / "export.csv"
+    export.write_bytes(Path("test/uso.csv").read_bytes())
+    (tmp_path / "rates.csv").write_text("date,usd_per_eur\n2010-01-01,2.0\n")
+    custom = FxProvider("csv", tmp_path / "rates.csv")
+
+    ecb = History.fromFile(export, use_cache=True)
+    converted = History.fromFile(export, custom, use_cache=True)
+    assert (converted["AmountEuro"] == converted["Amount"] / 2.0).all()
+    assert not ecb["AmountEuro"].equals(converted["AmountEuro"])
+
+    lines = Path("test/uso.csv").read_text().splitlines(keepends=True)
+    export.write_text("".join(lines[:-1]))
+    assert len(History.fromFile(export, use_cache=True)) == len(ecb) - 1
+
+    assert History.clearCache() == 3
+    assert not list((tmp_path / "cache").glob("history-*"))
+
+
+def test_from_file_ignores_a_corrupt_cache_entry(tmp_path, monkeypatch, caplog):
+    monkeypatch.setenv("TASTYWORKS_TAXES_CACHE_DIR", str(tmp_path / "cache"))
+    parsed = History.fromFile("test/uso.csv", use_cache=True)
+    (entry,) = (tmp_path / "cache").glob("history-*.npz")
+    entry.write_bytes(b"garbage")
+
+    reloaded = History.fromFile("test/uso.csv", use_cache=True)
+
+    assert "Ignoring unreadable history cache" in caplog.text
+    pd.testing.assert_frame_equal(reloaded, parsed, check_exact=True)
+
+
+def test_from_file_applies_the_compact_schema():
+    from tastyworksTaxes.history import CATEGORY_COLUMNS
+
+    hist = History.fromFile("test/tastytrade_transactions_history_180201_to_240817.csv")
+
+    for column in CATEGORY_COLUMNS:
+        assert isinstance(hist[column].dtype, pd.CategoricalDtype), column
+    for column in ["Strike", "Price", "Fees", "Amount", "AmountEuro", "FeesEuro"]:
+        assert hist[column].dtype == "float64"
+    trades = hist["Transaction Code"] == "Trade"
+    assert hist.loc[trades, "Description"].isna().all()
+    assert (hist.loc[~trades, "Description"].notna()).any()
+    assert "Wire Funds Received" in set(hist["Description"].dropna())
+
+
+@pytest.mark.parametrize("path", ["test/2018 - 2020-05.csv", "test/uso.csv",
+                                  "test/tastytrade_transactions_history_180201_to_240817.csv"])
+def test_derived_columns_match_the_transaction_getters(path):
+    from tastyworksTaxes.history import DERIVED_COLUMNS
+    from tastyworksTaxes.instruments import InstrumentKey
+    from tastyworksTaxes.position_manager import PositionManager
+    from tastyworksTaxes.transaction import Transaction
+
+    hist = History.fromFile(path)
+    positions = hist[hist["Transaction Code"].isin(["Trade", "Receive Deliver"])]
+    keys_by_instrument = {}
+    for _, row in positions.iterrows():
+        plain = Transaction(row.drop(DERIVED_COLUMNS))
+        assert row["Position Type"] == plain.getType().value
+        assert row["Signed Quantity"] == plain.getQuantity()
+        assert row["Is Closing"] == PositionManager._is_closing_transaction(None, plain)
+        keys_by_instrument.setdefault(InstrumentKey.fromTransaction(plain), set()).add(row["Instrument Key"])
+    assert all(len(keys) == 1 for keys in keys_by_instrument.values())
+    assert len({key for keys in keys_by_instrument.values() for key in keys}) == len(keys_by_instrument)
+    assert (hist.loc[hist["Position Type"].isna(), "Instrument Key"] == 0).all()
+
+
+EXPORT = "test/tastytrade_transactions_history_180201_to_240817.csv"
+
+
+@pytest.mark.parametrize("load", [
+    History.fromFile,
+    lambda path: History(pd.concat(History.iterChunks(path, chunksize=100))),
+    lambda path: History.fromFiles([path]),
+])
+def test_same_timestamp_symbol_change_closes_before_it_opens(load):
+    history = load(EXPORT).reset_index(drop=True)
+    legs = history[history["Transaction Subcode"].isin(["Symbol Change", "Stock Merger"])]
+
+    pairs = [(group["Symbol"].tolist(), group["Open/Close"].tolist())
+             for _, group in legs.groupby("Date/Time", sort=True)]
+
+    assert pairs == [
+        (["BFT", "PSFE"], ["Close", "Open"]),
+        (["VGAC", "ME"], ["Close", "Open"]),
+        (["VGAC", "ME"], ["Close", "Open"]),
+        (["SPRT", "GREE1"], ["Close", "Open"]),
+        (["VIAC", "PARA"], ["Close", "Open"]),
+    ]
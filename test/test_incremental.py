@@ -0,0 +1,100 @@
+import pandas as pd
+import pytest
+
+from tastyworksTaxes.history import History
+from tastyworksTaxes.incremental import IncrementalRun
+from tastyworksTaxes.position_manager import PositionManager
+from tastyworksTaxes.tasty import Tasty
+from test.helpers import EXPORT, assert_export_values, assert_same_values, assert_transferred_lots, open_lots
+
+
+@pytest.fixture(scope="module")
+def history():
+    return History.fromFile(EXPORT)
+
+
+@pytest.fixture
+def incremental(history):
+    run = IncrementalRun(history)
+    run.run()
+    return run
+
+
+def assert_matches_full_recompute(run, history):
+    tasty = Tasty()
+    tasty.history = history
+    expected = tasty.run()
+    assert_same_values(run.yearValues, expected)
+    assert run.closed_trades == tasty.position_manager.closed_trades
+    assert {key: list(lots) for key, lots in run.open_lots.items()} == open_lots(tasty.position_manager)
+
+
+def chain_of(run, symbol):
+    return next(chain for key, chain in run.chains.items() if symbol in key)
+
+
+def test_run_matches_full_run(incremental, history):
+    assert_matches_full_recompute(incremental, history)
+    assert len(incremental.dependencies) == len(incremental.closed_trades)
+    for trade, dependency in zip(incremental.closed_trades, incremental.dependencies):
+        assert trade.symbol in dependency.chain
+        assert dependency.closing_year == pd.Timestamp(trade.closing_date).year
+        assert dependency.opening_year <= dependency.closing_year
+
+
+def test_run_books_the_known_values_of_the_bundled_export(incremental):
+    assert_export_values(incremental.yearValues)
+    assert_transferred_lots(incremental.closed_trades)
+
+
+def test_corrected_trade_replays_only_its_chain(incremental, history):
+    corrected = History(history.copy())
+    row = corrected.index[(corrected["Symbol"] == "PLTR") & (corrected["Transaction Code"] == "Trade")][0]
+    corrected.loc[row, ["Amount", "AmountEuro"]] += 10.0
+    untouched = chain_of(incremental, "TSLA")
+    replayed = chain_of(incremental, "PLTR")
+
+    years = incremental.correct(corrected)
+
+    assert years == {2020}
+    assert chain_of(incremental, "TSLA") is untouched
+    assert chain_of(incremental, "PLTR") is not replayed
+    assert_matches_full_recompute(incremental, corrected)
+
+
+def test_corrected_money_movement_books_only_its_year(incremental, history):
+    corrected = History(history.copy())
+    row = corrected.index[(corrected["Transaction Code"] == "Money Movement")
+                          & (corrected["Date/Time"].dt.year == 2019)][0]
+    corrected.loc[row, ["Amount", "AmountEuro"]] -= 1.0
+
+    years = incremental.correct(corrected)
+
+    assert years == {2019}
+    assert_matches_full_recompute(incremental, corrected)
+
+
+def test_removed_and_added_rows(incremental, history):
+    money = history.index[history["Transaction Code"] == "Money Movement"]
+    corrected = History(pd.concat([history.drop(money[:3]), history.loc[money[-1:]]])
+                        .sort_values("Date/Time", kind="stable").reset_index(drop=True))
+
+    incremental.correct(corrected)
+
+    assert_matches_full_recompute(incremental, corrected)
+
+
+def test_changed_corporate_action_replays_the_split_symbol(incremental, history, monkeypatch):
+    config = PositionManager._load_corporate_actions_config()
+    config = {"reverse_splits": config["reverse_splits"] + [
+        {"date": "2021-05-05", "symbol": "PLTR", "ratio": 0.1, "source": "test"}]}
+    monkeypatch.setattr(PositionManager, "_load_corporate_actions_config", staticmethod(lambda: config))
+    untouched = chain_of(incremental, "TSLA")
+    replayed = chain_of(incremental, "PLTR")
+
+    years = incremental.correct()
+
+    assert years == set()
+    assert chain_of(incremental, "TSLA") is untouched
+    assert chain_of(incremental, "PLTR") is not replayed
+    assert_matches_full_recompute(incremental, history)
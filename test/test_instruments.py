@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+from tastyworksTaxes.history import History
+from tastyworksTaxes.instruments import InstrumentKey, InstrumentTable
+from tastyworksTaxes.position import PositionType
+from tastyworksTaxes.tasty import Tasty
+
+EXPORT = "test/tastytrade_transactions_history_180201_to_240817.csv"
+
+
+def test_register_gives_dense_ids_in_order_of_first_appearance():
+    hist = History.fromFile(EXPORT)
+    table = InstrumentTable()
+
+    ids = table.register(hist)
+
+    positions = hist["Instrument Key"].to_numpy() != 0
+    assert (ids[~positions] == -1).all()
+    assert sorted(set(ids[positions])) == list(range(len(table)))
+    assert list(pd.unique(ids[positions])) == list(range(len(table)))
+    assert len(table) == hist.loc[positions, "Instrument Key"].nunique()
+    np.testing.assert_array_equal(table.register(hist), ids)
+
+
+def test_register_is_stable_across_chunks():
+    full = InstrumentTable()
+    full_ids = full.register(History.fromFile("test/2018 - 2020-05.csv"))
+
+    chunked = InstrumentTable()
+    chunk_ids = np.concatenate([chunked.register(chunk)
+                                for chunk in History.iterChunks("test/2018 - 2020-05.csv", chunksize=7)])
+
+    np.testing.assert_array_equal(chunk_ids, full_ids)
+    pd.testing.assert_frame_equal(chunked.to_frame(), full.to_frame())
+
+
+def test_trades_and_lots_join_back_to_their_instrument():
+    t = Tasty(EXPORT)
+    t.processTransactionHistory()
+    instruments = t.position_manager.instruments.to_frame().set_index("instrument_id")
+
+    for trade in t.position_manager.closed_trades:
+        instrument = instruments.loc[trade.instrument_id]
+        assert instrument.symbol == trade.symbol
+        assert instrument.position_type == trade.position_type.value
+    for instrument_id, lots in t.position_manager.open_lots.items():
+        assert all(lot.instrument_id == instrument_id for lot in lots)
+        assert {lot.symbol for lot in lots} == {instruments.loc[instrument_id, "symbol"]}
+
+
+def test_id_for_transactions_without_derived_columns():
+    table = InstrumentTable()
+    stock = table.id(InstrumentKey("THCB", PositionType.stock))
+    put = table.id(InstrumentKey("PLTR", PositionType.put, 26.0, pd.Timestamp("2021-01-15"), "P"))
+
+    assert (stock, put) == (0, 1)
+    assert table.id(InstrumentKey("THCB", PositionType.stock)) == stock
+    assert table[put].strike == 26.0
+
+    frame = table.to_frame()
+    assert list(frame.columns) == ["instrument_id", "symbol", "position_type", "strike", "expiry", "call_put"]
+    assert frame["expiry"].isna().tolist() == [True, False]
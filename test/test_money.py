@@ -6,7 +6,14 @@ from pathlib import Path
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from tastyworksTaxes.money import Money
+from datetime import date, datetime
+import numpy as np
+from currency_converter import CurrencyConverter
+
+import pickle
+
+from tastyworksTaxes.fx_rates import FxProvider, RateTable
+from tastyworksTaxes.money import Money, convert_usd_to_eur_many
 from tastyworksTaxes.tasty import Tasty
 from tastyworksTaxes.transaction import Transaction
 from tastyworksTaxes.position import PositionType
@@ -51,6 +58,128 @@ def test_money_fromUsdToEur():
     assert 73 <= c.eur <= 74
 
 
+def test_convert_usd_to_eur_many_is_bit_identical_to_currency_converter():
+    converter = CurrencyConverter(fallback_on_missing_rate=True, fallback_on_wrong_date=True)
+    dates = [
+        datetime(2021, 3, 1, 23, 0),
+        datetime(2021, 3, 1, 9, 30),
+        datetime(2021, 3, 6, 12, 0),  # Saturday
+        date(1990, 1, 1),  # before the first ECB rate
+        date(2100, 1, 1),  # after the last ECB rate
+    ]
+    amounts = [4770.4, -0.87, 1e6 / 3, 100.0, 0.2]
+
+    result = convert_usd_to_eur_many(amounts, dates)
+
+    expected = [
+        converter.convert(amount, "USD", "EUR", date=d)
+        for amount, d in zip(amounts, dates)
+    ]
+    assert result.tolist() == expected
+
+
+def test_rate_table_round_trips_through_memory_mapped_file(tmp_path):
+    table = RateTable(date(2021, 3, 1).toordinal(), np.array([1.2, 1.25, 1.3]))
+    table.save(tmp_path / "rates.bin")
+
+    loaded = RateTable.load(tmp_path / "rates.bin")
+
+    assert isinstance(loaded.rates, np.memmap)
+    assert loaded.lookup([date(2021, 2, 1), date(2021, 3, 2), date(2022, 1, 1)]).tolist() == [1.2, 1.25, 1.3]
+
+
+def test_rate_table_rejects_foreign_files(tmp_path):
+    (tmp_path / "rates.bin").write_bytes(b"x" * 64)
+
+    with pytest.raises(ValueError, match="not a compiled rate table"):
+        RateTable.load(tmp_path / "rates.bin")
+
+
+def test_monthly_average_rates_apply_to_every_day_of_the_month(tmp_path):
+    (tmp_path / "bmf.csv").write_text("month,usd_per_eur\n2021-01,1.2\n2021-02,1.25\n2021-04,1.3\n")
+    provider = FxProvider("bmf-monthly", tmp_path / "bmf.csv")
+
+    rates = provider.usd_per_eur([
+        date(2020, 12, 31), date(2021, 1, 1), date(2021, 1, 31), date(2021, 2, 28),
+        date(2021, 3, 15), date(2021, 4, 30), date(2021, 5, 1),
+    ])
+
+    assert rates.tolist() == [1.2, 1.2, 1.2, 1.25, 1.25, 1.3, 1.3]
+
+
+def test_custom_daily_rates_carry_the_last_rate_forward(tmp_path):
+    (tmp_path / "rates.csv").write_text("date,usd_per_eur\n2021-03-05,1.19\n2021-03-08,1.18\n")
+    provider = FxProvider("csv", tmp_path / "rates.csv")
+
+    result = provider.convert([119.0, 119.0, 118.0], [date(2021, 3, 5), date(2021, 3, 7), date(2021, 3, 8)])
+
+    assert result.tolist() == [100.0, 100.0, 100.0]
+
+
+def test_convert_shares_one_rate_lookup_across_columns():
+    provider = FxProvider()
+    dates = [date(2021, 3, 1), date(2021, 3, 2)]
+    amounts = np.array([[10.0, 1.0], [20.0, 2.0]])
+
+    result = provider.convert(amounts, dates)
+
+    assert result[:, 0].tolist() == provider.convert(amounts[:, 0], dates).tolist()
+    assert result[:, 1].tolist() == provider.convert(amounts[:, 1], dates).tolist()
+
+
+@pytest.mark.parametrize("policy, path, message", [
+    ("daily", None, "Unknown FX policy"),
+    ("ecb", "rates.csv", "takes no rate file"),
+    ("bmf-monthly", None, "needs a rate file"),
+])
+def test_fx_provider_rejects_invalid_policies(policy, path, message):
+    with pytest.raises(ValueError, match=message):
+        FxProvider(policy, path)
+
+
+def test_rate_file_errors_name_the_file(tmp_path):
+    (tmp_path / "rates.csv").write_text("date,usd_per_eur\n2021-03-05,1.19\n2021-03-05,1.18\n")
+
+    with pytest.raises(ValueError, match="rates.csv lists the rate for 2021-03-05 twice"):
+        FxProvider("csv", tmp_path / "rates.csv").table
+
+
+def test_fx_provider_pickles_without_its_table(tmp_path):
+    (tmp_path / "rates.csv").write_text("date,usd_per_eur\n2021-03-05,1.19\n")
+    provider = FxProvider("csv", tmp_path / "rates.csv")
+    provider.table
+
+    copy = pickle.loads(pickle.dumps(provider))
+
+    assert copy._table is None
+    assert copy.usd_per_eur([date(2021, 3, 5)]).tolist() == [1.19]
+
+
+def test_switching_fx_policy_keeps_the_parsed_history(tmp_path):
+    (tmp_path / "rates.csv").write_text("date,usd_per_eur\n2010-01-01,2.0\n")
+
+    def euro_values(t):
+        return {(year, name): money.eur for year, values in t.yearValues.items()
+                for name, money in vars(values).items() if isinstance(money, Money)}
+
+    t = Tasty("test/uso.csv")
+    t.run()
+    ecb = euro_values(t)
+    history = t.history
+
+    t.useFxProvider(FxProvider("csv", tmp_path / "rates.csv"))
+    t.run()
+
+    assert t.history is history
+    assert (history["AmountEuro"] == history["Amount"] / 2.0).all()
+    assert (history["FeesEuro"] == history["Fees"] / 2.0).all()
+    assert euro_values(t) != ecb
+
+    t.useFxProvider(FxProvider())
+    t.run()
+    assert euro_values(t) == ecb
+
+
 def test_debit_interest():
     t = Tasty()
     debit_interest_tx = Transaction.fromString(
@@ -59,7 +188,7 @@ def test_debit_interest():
     t.moneyMovement(debit_interest_tx)
     assert (
         clean_numpy_str(str(t.year(2021).debitInterest))
-        == "{'eur': -0.7175849554602441, 'usd': -0.87}"
+        == "{'eur': -0.7288263382759488, 'usd': -0.87}"
     )
 
 
@@ -71,7 +200,7 @@ def test_dividend():
     t.moneyMovement(dividend_tx)
     assert (
         clean_numpy_str(str(t.year(2021).dividend))
-        == "{'eur': -2.5342118601115056, 'usd': -3.0}"
+        == "{'eur': -2.5357112670103965, 'usd': -3.0}"
     )
 
 
@@ -83,7 +212,7 @@ def test_deposit():
     t.moneyMovement(deposit_tx)
     assert (
         clean_numpy_str(str(t.year(2021).deposit))
-        == "{'eur': 3957.8528167261256, 'usd': 4770.4}"
+        == "{'eur': 3966.079148653142, 'usd': 4770.4}"
     )
 
 
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tastyworksTaxes.history import History
+from tastyworksTaxes.money_movement import classify, field_for
+from tastyworksTaxes.tasty import Tasty
+from test.helpers import EXPORT, assert_same_values
+
+
+@pytest.mark.parametrize("subcode,description,field", [
+    ("Transfer", "Wire Funds Received", "transfer"),
+    ("Withdrawal", "Wire Funds Received", "deposit"),
+    ("Withdrawal", "FROM 07/16 THRU 08/15 @ 8    %", "debitInterest"),
+    ("Withdrawal", "Wire Funds Sent", "withdrawal"),
+    ("Withdrawal", np.nan, "withdrawal"),
+    ("Balance Adjustment", "Regulatory fee adjustment", "balanceAdjustment"),
+    ("Fee", "LONGFIN CORP", "fee"),
+    ("Deposit", "INTEREST ON CREDIT BALANCE", "creditInterest"),
+    ("Deposit", "ACH DEPOSIT", "deposit"),
+    ("Credit Interest", "INTEREST ON CREDIT BALANCE", "creditInterest"),
+    ("Debit Interest", "FROM 07/16 THRU 08/15 @ 8    %", "debitInterest"),
+    ("Dividend", "SPDR S&P 500", "dividend"),
+    ("Fully Paid Stock Lending Income", "FULLYPAID LENDING REBATE", "securitiesLendingIncome"),
+])
+def test_classify_follows_the_row_rules(subcode, description, field):
+    fields = classify(pd.Series([subcode, "Fee"]), [description, "x"])
+    assert fields.tolist() == [field, "fee"]
+    assert field_for(subcode, description) == field
+
+
+@pytest.mark.parametrize("path", ["test/2018 - 2020-05.csv",
+                                  EXPORT])
+def test_money_movements_sum_exactly_like_row_by_row(path):
+    hist = History.fromFile(path)
+    rows = hist[hist["Transaction Code"] == "Money Movement"]
+
+    expected = Tasty()
+    for _, row in rows.iterrows():
+        expected.moneyMovement(row)
+    actual = Tasty()
+    actual.moneyMovements(hist)
+
+    assert_same_values(actual.yearValues, expected.yearValues)
+
+
+def test_unknown_subcodes_are_reported_with_their_rows():
+    hist = History.fromFile("test/2018 - 2020-05.csv")
+    money = hist.index[hist["Transaction Code"] == "Money Movement"][:3]
+    hist["Transaction Subcode"] = hist["Transaction Subcode"].astype(object)
+    hist.loc[money[1:], "Transaction Subcode"] = "Mystery Credit"
+
+    with pytest.raises(ValueError) as excinfo:
+        Tasty().moneyMovements(hist)
+
+    message = str(excinfo.value)
+    assert "Unknown money movement subcode(s) ['Mystery Credit'] in 2 transaction(s)" in message
+    for label in money[1:]:
+        assert str(hist.at[label, "Date/Time"]) in message
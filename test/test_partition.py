@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tastyworksTaxes.constants import Fields
+from tastyworksTaxes.partition import _run_partition, symbol_components
+from tastyworksTaxes.tasty import Tasty
+from test.helpers import EXPORT, assert_export_values, assert_same_values, assert_transferred_lots, open_lots
+
+EXPORTS = [
+    EXPORT,
+    "test/2018 - 2020-05.csv",
+    "test/uso.csv",
+]
+# these start with positions opened before the export, so both engines reject them
+PARTIAL_EXPORTS = ["test/2020-05 - 2020-12.csv", "test/2021.csv", "test/2021-2022.csv"]
+
+
+def positions(rows):
+    return pd.DataFrame(rows, columns=["Symbol", "Transaction Subcode", "Is Closing"])
+
+
+@pytest.mark.parametrize("path", EXPORTS)
+@pytest.mark.parametrize("workers", [2, 4])
+def test_partitioned_run_matches_sequential_run(path, workers):
+    sequential = Tasty(path)
+    expected = sequential.run()
+
+    partitioned = Tasty(path)
+    result = partitioned.run(workers=workers)
+
+    assert partitioned.position_manager.closed_trades == sequential.position_manager.closed_trades
+    assert [trade.instrument_id for trade in partitioned.position_manager.closed_trades] == \
+        [trade.instrument_id for trade in sequential.position_manager.closed_trades]
+    assert open_lots(partitioned.position_manager) == open_lots(sequential.position_manager)
+    assert partitioned.position_manager._pending_symbol_change_lot == \
+        getattr(sequential.position_manager, "_pending_symbol_change_lot", None)
+    assert_same_values(result, expected)
+
+
+@pytest.mark.parametrize("workers", [2, 4])
+def test_partitioned_run_books_the_known_values_of_the_bundled_export(workers):
+    tasty = Tasty(EXPORT)
+
+    assert_export_values(tasty.run(workers=workers))
+    # the symbol change chains must each stay within one group
+    assert_transferred_lots(tasty.position_manager.closed_trades)
+    assert tasty.position_manager._pending_symbol_change_lot is None
+
+
+def test_rows_without_instrument_key_get_their_ids_before_partitioning():
+    sequential = Tasty(EXPORTS[0])
+    sequential.processTransactionHistory()
+
+    partitioned = Tasty(EXPORTS[0])
+    history = partitioned._chronological(partitioned.history)
+    positions = partitioned._positionRows(history).copy()
+    # every third instrument loses its derived key, as if read without derived columns
+    keys = positions[Fields.INSTRUMENT_KEY.value]
+    positions.loc[keys.isin(keys.unique()[::3]), Fields.INSTRUMENT_KEY.value] = 0
+    partitioned.processPositions(positions, workers=4)
+
+    def instruments(trades):
+        return [partitioned.position_manager.instruments[trade.instrument_id] for trade in trades]
+
+    assert len(partitioned.position_manager.instruments) == len(sequential.position_manager.instruments)
+    assert instruments(partitioned.position_manager.closed_trades) == \
+        [sequential.position_manager.instruments[trade.instrument_id]
+         for trade in sequential.position_manager.closed_trades]
+    assert {partitioned.position_manager.instruments[key] for key in partitioned.position_manager.open_lots} == \
+        {sequential.position_manager.instruments[key] for key in sequential.position_manager.open_lots}
+
+
+def test_partition_rejects_rows_without_instrument_id():
+    tasty = Tasty(EXPORTS[0])
+    positions = tasty._positionRows(tasty._chronological(tasty.history))
+    instrument_ids = tasty.position_manager.instruments.register(positions).copy()
+    instrument_ids[0] = -1
+
+    with pytest.raises(ValueError, match="instrument id"):
+        _run_partition(positions, instrument_ids, np.arange(len(positions)),
+                       tasty.position_manager.instruments, [], None)
+
+
+@pytest.mark.parametrize("path", PARTIAL_EXPORTS)
+def test_partitioned_run_rejects_what_sequential_run_rejects(path):
+    with pytest.raises(ValueError, match="no previous position found"):
+        Tasty(path).run()
+    with pytest.raises(ValueError, match="no previous position found"):
+        Tasty(path).run(workers=2)
+
+
+def test_symbol_change_links_old_and_new_symbol():
+    components = symbol_components(positions([
+        ["AAA", "Buy to Open", False],
+        ["OLD", "Buy to Open", False],
+        ["OLD", "Symbol Change", True],
+        ["NEW", "Symbol Change", False],
+    ]))
+
+    assert components["OLD"] == components["NEW"]
+    assert components["AAA"] != components["OLD"]
+
+
+def test_open_leg_before_close_leg_links_to_the_next_open_leg():
+    # the close leg parks its lot until the next open leg, whatever its symbol
+    components = symbol_components(positions([
+        ["NEW", "Symbol Change", False],
+        ["OLD", "Symbol Change", True],
+        ["OTHER", "Stock Merger", False],
+        ["GONE", "Stock Merger", True],
+    ]))
+
+    assert components["OLD"] == components["OTHER"]
+    assert components["NEW"] != components["OLD"]
+    assert components["GONE"] not in (components["NEW"], components["OLD"])
+
+
+def test_pending_lot_links_to_the_first_open_leg():
+    components = symbol_components(positions([["NEW", "Symbol Change", False]]), pending_symbol="OLD")
+
+    assert components["OLD"] == components["NEW"]
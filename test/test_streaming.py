@@ -0,0 +1,157 @@
+from functools import cache, partial
+
+import pytest
+import pandas as pd
+
+from tastyworksTaxes.history import History
+from tastyworksTaxes.tasty import Tasty
+from test.helpers import EXPORT, assert_export_values, assert_same_values
+
+EXPORTS = ["test/uso.csv", "test/2018 - 2020-05.csv"]
+
+
+@cache
+def reference(path):
+    """The Tasty of a plain run() of `path` and its values"""
+    tasty = Tasty(path)
+    return tasty, tasty.run()
+
+
+def run_streaming(path, chunksize):
+    tasty = Tasty()
+    return tasty, tasty.runStreaming(path, chunksize=chunksize)
+
+
+def run_method(method, **kwargs):
+    def run(path):
+        tasty = Tasty(path)
+        return tasty, getattr(tasty, method)(**kwargs)
+    return run
+
+
+ENGINES = {
+    "streaming by 50": partial(run_streaming, chunksize=50),
+    "streaming by 1000": partial(run_streaming, chunksize=1000),
+    "pipeline": run_method("runPipeline", workers=1),
+    "pipeline in 2 processes": run_method("runPipeline", workers=2),
+    "totals": run_method("runTotals", workers=1),
+    "totals in 2 processes": run_method("runTotals", workers=2),
+}
+KEEPS_TRADES = {"pipeline", "pipeline in 2 processes"}
+
+
+@pytest.mark.parametrize("path", EXPORTS)
+def test_iter_chunks_matches_from_file(path):
+    expected = History.fromFile(path)
+
+    chunks = list(History.iterChunks(path, chunksize=16))
+    merged = pd.concat(chunks).reset_index(drop=True)
+
+    assert all(isinstance(chunk["Symbol"].dtype, pd.CategoricalDtype) for chunk in chunks)
+    pd.testing.assert_frame_equal(merged, pd.DataFrame(expected), check_exact=True, check_categorical=False,
+                                  check_dtype=False)
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("path", EXPORTS + [EXPORT])
+def test_engine_matches_run(path, engine):
+    full, expected = reference(path)
+
+    tasty, result = ENGINES[engine](path)
+
+    assert_same_values(result, expected)
+    if engine in KEEPS_TRADES:
+        assert tasty.position_manager.closed_trades == full.position_manager.closed_trades
+    else:
+        assert tasty.position_manager.closed_trades == []
+    assert tasty.position_manager.observers == []
+    assert tasty.position_manager.keep_trades
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_engine_books_the_known_values_of_the_bundled_export(engine):
+    _, result = ENGINES[engine](EXPORT)
+
+    assert_export_values(result)
+
+
+def test_run_pipeline_times_its_stages():
+    pipeline = Tasty(EXPORTS[0])
+    pipeline.runPipeline()
+
+    assert set(pipeline.timings) >= {"money movements", "positions", "trade statistics", "total"}
+
+
+def iterrows_tasty(frame):
+    """Runs the row loop processTransactionHistory used before the tuple fast path"""
+    from tastyworksTaxes.constants import TransactionCode
+    from tastyworksTaxes.transaction import Transaction
+
+    t = Tasty()
+    for _, row in frame.sort_values(by="Date/Time", kind="stable").iterrows():
+        if row["Transaction Code"] == TransactionCode.MONEY_MOVEMENT.value:
+            t.moneyMovement(row)
+        elif row["Transaction Code"] in {TransactionCode.TRADE.value, TransactionCode.RECEIVE_DELIVER.value}:
+            t.position_manager.add_position(Transaction(row))
+    return t
+
+
+@pytest.mark.parametrize("path", EXPORTS)
+@pytest.mark.parametrize("reverse", [False, True])
+def test_process_transaction_history_matches_iterrows(path, reverse):
+    history = History.fromFile(path)
+    frame = history.iloc[::-1] if reverse else history
+    expected = iterrows_tasty(frame)
+
+    t = Tasty()
+    t.processTransactionHistory(frame)
+
+    assert t.position_manager.closed_trades == expected.position_manager.closed_trades
+    assert_same_values(t.yearValues, expected.yearValues)
+
+
+def test_run_streaming_passes_closed_trades_to_sink():
+    received = []
+    Tasty().runStreaming("test/uso.csv", chunksize=3, trade_sink=received.extend)
+
+    full = Tasty("test/uso.csv")
+    full.run()
+    assert received == full.position_manager.closed_trades
+
+
+def test_presorted_accepts_ascending_input(tmp_path):
+    ascending = tmp_path / "ascending.csv"
+    pd.read_csv("test/uso.csv").iloc[::-1].to_csv(ascending, index=False)
+
+    chunks = list(History.iterChunks(ascending, chunksize=3, presorted=True))
+
+    assert sum(len(chunk) for chunk in chunks) == 8
+    assert pd.concat(chunks)["Date/Time"].is_monotonic_increasing
+
+
+def test_presorted_rejects_unsorted_input():
+    with pytest.raises(ValueError, match="not sorted by ascending Date/Time"):
+        list(History.iterChunks("test/uso.csv", chunksize=3, presorted=True))
+
+
+def test_position_manager_notifies_observers():
+    class Recorder:
+        def __init__(self):
+            self.trades = []
+
+        def add(self, trade):
+            self.trades.append(trade)
+
+    tasty = Tasty(EXPORTS[0])
+    kept, matched = Recorder(), Recorder()
+    tasty.position_manager.observers.append(kept)
+    tasty.processTransactionHistory()
+    reference = Tasty(EXPORTS[0])
+    reference.position_manager.observers.append(matched)
+    reference.position_manager.keep_trades = False
+    reference.processTransactionHistory()
+
+    assert kept.trades == tasty.position_manager.closed_trades
+    assert reference.position_manager.closed_trades == []
+    assert [(m.symbol, m.quantity, m.profit_eur, m.fees_eur, m.tax_year) for m in matched.trades] == \
+        [(t.symbol, t.quantity, t.profit_eur, t.fees_eur, t.tax_year) for t in kept.trades]
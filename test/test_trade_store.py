@@ -0,0 +1,73 @@
+import pytest
+
+from tastyworksTaxes.position import PositionType
+from tastyworksTaxes.tasty import Tasty
+from tastyworksTaxes.trade_aggregator import TRADE_FIELDS, YearlyTradeAggregator
+from tastyworksTaxes.trade_calculator import (
+    get_loss_trades, get_option_trades, get_profitable_trades, get_stock_trades, sum_money_from_trades,
+)
+from tastyworksTaxes.trade_store import TradeStore
+
+
+@pytest.fixture(scope="module")
+def tasty():
+    tasty = Tasty("test/tastytrade_transactions_history_180201_to_240817.csv")
+    tasty.processTransactionHistory()
+    return tasty
+
+
+def test_totals_match_the_running_sums(tasty):
+    trades = tasty.position_manager.closed_trades
+    aggregator = YearlyTradeAggregator(tasty.classifier)
+    aggregator.add_all(trades)
+
+    store = TradeStore(trades, tasty.classifier)
+
+    assert store.years() == aggregator.years()
+    for year in store.years():
+        assert store.totals[year] == aggregator.totals[year]
+        assert store.option_trade_count[year] == aggregator.option_trade_count[year]
+        assert list(store.stock_symbols[year]) == list(aggregator.stock_symbols[year])
+    assert set(TRADE_FIELDS) == set(store.totals[2020])
+
+
+def test_totals_match_the_list_filters(tasty):
+    trades = tasty.getYearlyTrades()[2021]
+
+    totals = TradeStore(trades, tasty.classifier).totals[2021]
+
+    options = get_option_trades(trades)
+    for field, selected in [('combined', trades), ('option', options),
+                            ('optionProfits', get_profitable_trades(options)),
+                            ('optionLosses', get_loss_trades(options))]:
+        money = sum_money_from_trades(selected)
+        assert totals[field] == [money.usd, money.eur]
+
+
+def test_columns(tasty):
+    trades = tasty.position_manager.closed_trades
+
+    store = TradeStore(trades, tasty.classifier)
+
+    assert len(store.year) == len(trades)
+    assert store.stock.sum() == len(get_stock_trades(trades))
+    assert set(store.classification[store.option]) == {'CALL', 'PUT'}
+    assert (store.taxable_portion[store.classification == 'EQUITY_ETF'] == 0.7).all()
+    assert (store.taxable_portion[store.classification != 'EQUITY_ETF'] == 1.0).all()
+
+
+def test_empty():
+    store = TradeStore([])
+
+    assert store.years() == set()
+    assert store.fees(2020).usd == 0.0
+    assert store.apply(2020, Tasty().year(2020)).optionSum.eur == 0.0
+
+
+def test_years_override(tasty):
+    trades = tasty.position_manager.closed_trades[:10]
+
+    store = TradeStore(trades, years=[0] * len(trades))
+
+    assert store.years() == {0}
+    assert store.stock[0] == (trades[0].position_type == PositionType.stock)
@@ -6,7 +6,7 @@ import pandas as pd
 from datetime import datetime
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from tastyworksTaxes.transaction import Transaction
+from tastyworksTaxes.transaction import Transaction, TransactionRecord
 from tastyworksTaxes.money import Money
 from tastyworksTaxes.history import History
 from tastyworksTaxes.position import PositionType
@@ -43,7 +43,7 @@ class TestTransaction:
         
         assert t.getDate() == "2020-12-29"
         
-        assert t.getDateTime() == "2020-12-29 15:36:00"
+        assert t.getDateTime() == "2020-12-29 16:36:00"  # 15:36 UTC in Berlin
         
         assert t.getExpiry().strftime("%Y-%m-%d") == "2021-01-15"
         
@@ -196,4 +196,80 @@ class TestTransaction:
         
         merger = Transaction.fromString("2021-09-15T12:36:00+0000,Receive Deliver,Stock Merger,SELL_TO_OPEN,GREE  210917P00022000,Equity Option,Stock merger Open 6.0 GREE1 210917P00022000,3360,6,,0,0.00,100,GREE,GREE,9/17/21,22,PUT,123456,USD")
         assert merger.getQuantity() == -6
-        assert merger.getSymbol() == "GREE"
\ No newline at end of file
+        assert merger.getSymbol() == "GREE"
+
+
+RECORD_LINES = [
+    "2020-12-15T20:38:00+0000,Trade,Buy to Open,BUY_TO_OPEN,THCB,Equity,Bought 200 THCB @ 13.60,-2720,200,13.6,-1.00,0.16,,THCB,THCB,,,,123456,USD",
+    "2019-08-08T19:59:00+0000,Trade,Sell to Close,SELL_TO_CLOSE,BABA,Equity,Sold 100 BABA @ 160.73,16073,100,160.73,-1.00,0.432,,BABA,BABA,,,,123456,USD",
+    "2020-12-29T15:36:00+0000,Trade,Sell to Open,SELL_TO_OPEN,PLTR  210115P00026000,Equity Option,Sold 1 PLTR 01/15/21 Put 26.00 @ 2.46,246,1,246.0,-1.00,0.1519999999999999,100,PLTR,PLTR,1/15/21,26,PUT,123456,USD",
+    "2018-07-20T22:00:00+0000,Receive Deliver,Expiration,,DERM  180720C00011000,Equity Option,Removal of 2 DERM 07/20/18 Call 11.00 due to expiration.,0,2,,0,0.00,100,DERM,DERM,7/20/18,11,CALL,123456,USD",
+    "2021-09-15T12:36:00+0000,Receive Deliver,Stock Merger,SELL_TO_OPEN,GREE  210917P00022000,Equity Option,Stock merger Open 6.0 GREE1 210917P00022000,3360,6,,0,0.00,100,GREE,GREE,9/17/21,22,PUT,123456,USD",
+]
+
+
+class TestTransactionRecord:
+    """TransactionRecord must answer exactly like Transaction"""
+
+    @pytest.mark.parametrize("line", RECORD_LINES)
+    def test_getters_match_transaction(self, line):
+        t = Transaction.fromString(line)
+        r = TransactionRecord.fromString(line)
+
+        for getter in ["getYear", "getDate", "getDateTime", "isOption", "getSymbol", "getType",
+                       "getQuantity", "getExpiry", "getStrike"]:
+            expected = getattr(t, getter)()
+            actual = getattr(r, getter)()
+            assert actual == expected or (pd.isnull(actual) and pd.isnull(expected)), getter
+        assert (r.getValue().usd, r.getValue().eur) == (t.getValue().usd, t.getValue().eur)
+        assert (r.getFees().usd, r.getFees().eur) == (t.getFees().usd, t.getFees().eur)
+        assert r.keys() == list(t.keys())
+        assert all(r[column] is t[column] or r[column] == t[column] for column in t.keys() if not pd.isnull(t[column]))
+
+    @pytest.mark.parametrize("line", RECORD_LINES[:3])
+    @pytest.mark.parametrize("quantity", [-3, 0, 5])
+    def test_set_quantity_matches_transaction(self, line, quantity):
+        t = Transaction.fromString(line)
+        r = TransactionRecord.fromString(line)
+        t.setQuantity(quantity)
+        r.setQuantity(quantity)
+        for column in ["Quantity", "Buy/Sell", "Transaction Subcode"]:
+            assert r[column] == t[column]
+
+    def test_item_access(self):
+        r = TransactionRecord({"Symbol": "THCB", "Order #": 123456})
+        assert r["Order #"] == 123456
+        assert "Symbol" in r and "Strike" not in r
+        assert r.get("Open/Close", "") == ""
+        with pytest.raises(KeyError):
+            r["Strike"]
+        r["Strike"] = 0.0
+        assert r.isStock()
+        with pytest.raises(ValueError, match="This transaction doesn't have a symbol"):
+            TransactionRecord({"Symbol": ""}).getSymbol()
+
+    def test_position_manager_accepts_records(self):
+        from tastyworksTaxes.position_manager import PositionManager
+
+        opening = "2018-03-12T17:08:00+0000,Trade,Buy to Open,BUY_TO_OPEN,LFIN  180615C00040000,Equity Option,Bought 2 LFIN 06/15/18 Call 40.00 @ 2.20,-440,2,220.00000000000003,-1.00,1.2799999999999998,100,LFIN,LFIN,6/15/18,40,CALL,123456,USD"
+        closing = "2018-03-19T22:00:00+0000,Trade,Sell to Close,SELL_TO_CLOSE,LFIN  180615C00040000,Equity Option,Sold 1 LFIN 06/15/18 Call 40.00 @ 3.00,300,1,300.0,-1.00,0.14,100,LFIN,LFIN,6/15/18,40,CALL,123456,USD"
+        results = []
+        for make in (Transaction.fromString, TransactionRecord.fromString):
+            manager = PositionManager()
+            manager.add_position(make(opening))
+            manager.add_position(make(closing))
+            results.append((manager.closed_trades, manager.get_all_open_lots()))
+        assert results[0] == results[1]
+        assert len(results[0][0]) == 1
+
+    def test_derived_values_are_used_until_a_source_column_changes(self):
+        r = TransactionRecord.fromString(RECORD_LINES[2])
+        r["Position Type"] = "call"
+        r["Signed Quantity"] = -7.0
+        assert r.getType() == PositionType.call
+        assert r.getQuantity() == -7
+
+        r.setQuantity(4)
+        assert r.getQuantity() == 4
+        assert r.getType() == PositionType.put
+        assert "Position Type" not in r
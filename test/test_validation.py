@@ -0,0 +1,97 @@
+import pickle
+
+import pandas as pd
+import pytest
+
+from tastyworksTaxes.history import History
+from tastyworksTaxes.tasty import Tasty
+from tastyworksTaxes.validation import ValidationError, ValidationReport
+from test.helpers import EXPORT, assert_same_values
+
+
+def _broken_export(tmp_path):
+    df = pd.read_csv(EXPORT, dtype=str)
+    df.loc[3, "Value"] = "12,3x"
+    df.loc[4, "Date"] = "yesterday"
+    df.loc[5, "Date"] = "2009-06-01T12:00:00+0000"
+    trade = df.index[df["Type"] == "Trade"][0]
+    df.loc[trade, "Symbol"] = None
+    money_movement = df.index[df["Type"] == "Money Movement"][0]
+    df.loc[money_movement, "Sub Type"] = "Mystery Credit"
+    option = df.index[df["Call or Put"].isin(["CALL", "PUT"])][0]
+    df.loc[option, "Expiration Date"] = "soon"
+    path = tmp_path / "broken.csv"
+    df.to_csv(path, index=False)
+    return path, trade, money_movement, option
+
+
+def test_validation_reports_every_problem_in_one_pass(tmp_path):
+    path, trade, money_movement, option = _broken_export(tmp_path)
+
+    issues = History.validate(path).issues
+
+    found = set(zip(issues["row"], issues["column"]))
+    assert found == {
+        (5, "Value"),
+        (6, "Date"),
+        (7, "Date/Time"),
+        (trade + 2, "Symbol"),
+        (money_movement + 2, "Transaction Subcode"),
+        (option + 2, "Expiration Date"),
+    }
+    value = issues[issues["column"] == "Value"].iloc[0]
+    assert value["value"] == "12,3x"
+    assert value["reason"].startswith("Failed to parse amount '12,3x'")
+    assert list(issues.columns) == ["row", "column", "value", "reason"]
+
+
+def test_from_file_raises_with_the_full_report_before_processing(tmp_path):
+    path, *_ = _broken_export(tmp_path)
+
+    with pytest.raises(ValidationError, match="6 problem\\(s\\) in 5 row\\(s\\)") as excinfo:
+        History.fromFile(path)
+
+    excinfo.value.report.to_csv(tmp_path / "report.csv")
+    exported = pd.read_csv(tmp_path / "report.csv")
+    assert len(exported) == 6
+    assert exported["row"].is_monotonic_increasing
+
+
+def test_streaming_validates_all_chunks_before_yielding(tmp_path):
+    path, *_ = _broken_export(tmp_path)
+
+    chunks = History.iterChunks(path, chunksize=100)
+    with pytest.raises(ValidationError) as excinfo:
+        next(chunks)
+
+    assert len(excinfo.value.report) == 6
+
+
+def test_bundled_exports_are_valid():
+    assert History.validate(EXPORT).ok
+
+
+def test_validation_error_survives_worker_processes():
+    report = ValidationReport("a.csv")
+    report.add([0], "Value", ["x"], "Failed to parse amount 'x'")
+
+    error = pickle.loads(pickle.dumps(ValidationError(report)))
+
+    assert "a.csv: 1 problem(s) in 1 row(s)" in str(error)
+    assert error.report.issues["row"].tolist() == [2]
+
+
+def test_unknown_transaction_codes_are_warned_about_and_skipped(tmp_path, caplog):
+    df = pd.read_csv(EXPORT, dtype=str)
+    unknown = df.iloc[[10]].assign(**{"Type": "Futures Adjustment", "Sub Type": "Mark to Market"})
+    path = tmp_path / "unknown.csv"
+    pd.concat([df.iloc[:12], unknown, df.iloc[12:]]).to_csv(path, index=False)
+
+    report = History.validate(path)
+    assert report.ok
+    assert report.warnings[["row", "column", "value"]].values.tolist() == [[14, "Transaction Code", "Futures Adjustment"]]
+
+    with caplog.at_level("WARNING"):
+        result = Tasty(str(path)).run()
+    assert "Unknown Transaction Code 'Futures Adjustment' in 1 row(s), e.g. row 14" in caplog.text
+    assert_same_values(result, Tasty(EXPORT).run())
@@ -0,0 +1,105 @@
+import pandas as pd
+import pytest
+
+from tastyworksTaxes.tasty import Tasty
+from tastyworksTaxes.watch import CLOSED_TRADES_FILE, FolderWatcher
+from test.helpers import EXPORT, assert_export_values, assert_same_values, assert_transferred_lots
+
+
+@pytest.fixture(scope="module")
+def raw():
+    df = pd.read_csv(EXPORT)
+    return df, pd.to_datetime(df["Date"], utc=True)
+
+
+@pytest.fixture(scope="module")
+def full():
+    tasty = Tasty(EXPORT)
+    return tasty, tasty.run()
+
+
+def drop(folder, name, rows):
+    rows.to_csv(folder / name, index=False)
+
+
+def poll_until_processed(watcher):
+    watcher.poll()
+    return watcher.poll()
+
+
+def assert_matches_full_run(watcher, full):
+    tasty, expected = full
+    result = watcher.tasty.bookedValues()
+    assert_same_values(result, expected)
+    assert_export_values(result)
+    assert_transferred_lots(watcher.tasty.position_manager.closed_trades)
+    assert watcher.tasty.position_manager.closed_trades == tasty.position_manager.closed_trades
+
+
+def test_newer_export_is_appended(tmp_path, raw, full):
+    df, dates = raw
+    inbox, output = tmp_path / "inbox", tmp_path / "out"
+    inbox.mkdir()
+    watcher = FolderWatcher(inbox, output)
+
+    drop(inbox, "1.csv", df[dates.dt.year <= 2021])
+    assert len(poll_until_processed(watcher)) == 1
+    processed = watcher._processed
+    drop(inbox, "2.csv", df[dates.dt.year > 2021])
+    poll_until_processed(watcher)
+
+    assert watcher._processed > processed
+    assert sorted(watcher._snapshots) == list(range(2018, 2025))
+    assert_matches_full_run(watcher, full)
+    assert sorted(path.name for path in output.iterdir()) == \
+        sorted([CLOSED_TRADES_FILE] + [f"{year}.txt" for year in range(2018, 2025)])
+    assert len(pd.read_csv(output / CLOSED_TRADES_FILE)) == len(full[0].position_manager.closed_trades)
+
+
+def test_older_rows_replay_from_the_affected_year(tmp_path, raw, full):
+    df, dates = raw
+    late = (df["Type"] == "Money Movement") & (dates.dt.year == 2022)
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    watcher = FolderWatcher(inbox, tmp_path / "out")
+
+    drop(inbox, "1.csv", df[~late])
+    poll_until_processed(watcher)
+    report_2021 = (tmp_path / "out" / "2021.txt").stat().st_mtime_ns
+    drop(inbox, "2.csv", df[late])
+    poll_until_processed(watcher)
+
+    assert_matches_full_run(watcher, full)
+    assert (tmp_path / "out" / "2021.txt").stat().st_mtime_ns == report_2021
+
+
+def test_missing_history_recovers_when_it_arrives(tmp_path, raw, full):
+    df, dates = raw
+    inbox, output = tmp_path / "inbox", tmp_path / "out"
+    inbox.mkdir()
+    watcher = FolderWatcher(inbox, output)
+
+    drop(inbox, "2.csv", df[dates.dt.year > 2021])
+    poll_until_processed(watcher)
+    assert not output.exists()
+    drop(inbox, "1.csv", df[dates.dt.year <= 2021])
+    poll_until_processed(watcher)
+
+    assert_matches_full_run(watcher, full)
+
+
+def test_files_are_read_once_complete_and_rows_only_once(tmp_path, raw, full):
+    df, _ = raw
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    watcher = FolderWatcher(inbox, tmp_path / "out")
+
+    drop(inbox, "1.csv", df)
+    assert watcher.poll() == []
+    assert watcher.poll() == [inbox / "1.csv"]
+    assert watcher.poll() == []
+    drop(inbox, "copy.csv", df)
+    poll_until_processed(watcher)
+
+    assert len(watcher.history) == len(full[0].history)
+    assert_matches_full_run(watcher, full)